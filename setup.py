@@ -4,34 +4,59 @@ One-click setup script for Playwright UI test suite
 Run this once to set up everything needed for testing
 """
 
+import hashlib
+import json
 import os
+import re
+import shutil
 import sys
 import subprocess
 import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Packages used when requirements.txt is missing
+DEFAULT_PACKAGES = ["playwright==1.55.0", "pytest-playwright==0.7.1", "pytest==8.4.2", "pytest-html==4.1.1", "pytest-xdist==3.8.0", "requests==2.31.0", "aiohttp==3.12.15"]
+
+# Wheels, venv and browser archives are kept here between runs and machines that share it (CI cache, Docker layer)
+CACHE_DIR = os.environ.get("BOOTSTRAP_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "booking-bootstrap")
+
+# Written into the venv once a step succeeded for a bootstrap key
+STAMP_FILE = ".bootstrap.json"
 
 
 def run_command(command, description):
-    """Run a command and handle errors"""
+    """Run a command (string or argument list) and handle errors"""
     print(f"\n{description}...")
-    print(f"Running: {command}")
+    print(f"Running: {command if isinstance(command, str) else ' '.join(command)}")
     
+    start = time.perf_counter()
     try:
-        if platform.system() == "Windows":
+        if isinstance(command, list):
+            result = subprocess.run(command, check=True, capture_output=True, text=True)
+        elif platform.system() == "Windows":
             result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
         else:
             result = subprocess.run(command.split(), check=True, capture_output=True, text=True)
         
-        print(f"✓ {description} completed successfully")
+        print(f"✓ {description} completed successfully ({time.perf_counter() - start:.1f} s)")
         return True
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, OSError) as e:
         print(f"✗ {description} failed: {e}")
-        if e.stdout:
+        if getattr(e, "stdout", None):
             print(f"Output: {e.stdout}")
-        if e.stderr:
+        if getattr(e, "stderr", None):
             print(f"Error: {e.stderr}")
         return False
 
 
+def run_parallel(*steps):
+    """Run independent (function, args) steps at the same time; True when all succeeded"""
+    with ThreadPoolExecutor(max_workers=len(steps)) as pool:
+        futures = [pool.submit(func, *args) for func, args in steps]
+        return all(future.result() for future in futures)
+
+
 def check_python():
     """Check Python version"""
     version = sys.version_info
@@ -43,6 +68,115 @@ def check_python():
         return False
 
 
+def read_packages(requirements_path):
+    """Pinned packages from requirements.txt, or the defaults when it is missing"""
+    if not os.path.exists(requirements_path):
+        return DEFAULT_PACKAGES
+    with open(requirements_path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def bootstrap_key(packages, browser):
+    """
+    Hash of everything the environment depends on
+    
+    Same requirements, Playwright version, browser, Python version and
+    platform give the same key, so a finished step never has to run again.
+    """
+    playwright = next((p for p in packages if re.match(r"playwright==", p)), "playwright")
+    parts = sorted(packages) + [playwright, browser, platform.python_version(), sys.platform, platform.machine()]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def read_stamp(venv_path):
+    try:
+        with open(os.path.join(venv_path, STAMP_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_stamp(venv_path, stamp):
+    with open(os.path.join(venv_path, STAMP_FILE), "w", encoding="utf-8") as f:
+        json.dump(stamp, f, indent=2)
+
+
+def fill_wheelhouse(wheelhouse, packages):
+    """Build wheels for every package once per key so later installs work offline"""
+    if os.path.exists(os.path.join(wheelhouse, ".complete")):
+        print(f"✓ Wheels already cached in {wheelhouse}")
+        return True
+    os.makedirs(wheelhouse, exist_ok=True)
+    if not run_command([sys.executable, "-m", "pip", "wheel", "--quiet", "-w", wheelhouse, *packages],
+                       "Caching package wheels"):
+        return False
+    open(os.path.join(wheelhouse, ".complete"), "w").close()
+    return True
+
+
+def default_browsers_path():
+    """Where Playwright keeps its browsers, or None when they live inside the venv"""
+    configured = os.environ.get("PLAYWRIGHT_BROWSERS_PATH")
+    if configured == "0":
+        return None
+    if configured:
+        return configured
+    if platform.system() == "Windows":
+        return os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "ms-playwright")
+    if platform.system() == "Darwin":
+        return os.path.join(os.path.expanduser("~"), "Library", "Caches", "ms-playwright")
+    return os.path.join(os.path.expanduser("~"), ".cache", "ms-playwright")
+
+
+def browser_executable(python_cmd, browser):
+    """Path of the browser executable if Playwright has it on disk, else None"""
+    code = f"from playwright.sync_api import sync_playwright\nwith sync_playwright() as p: print(p.{browser}.executable_path)"
+    try:
+        result = subprocess.run([python_cmd, "-c", code], check=True, capture_output=True, text=True)
+    except (subprocess.CalledProcessError, OSError):
+        return None
+    path = result.stdout.strip()
+    return path if path and os.path.exists(path) else None
+
+
+def save_archive(archive, root_dir, base_dir, description):
+    """Pack root_dir/base_dir into archive (.tar.gz) unless it is already there"""
+    if os.path.exists(archive):
+        return True
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(archive), exist_ok=True)
+    tmp_base = f"{archive[:-len('.tar.gz')]}.{os.getpid()}.tmp"
+    try:
+        os.replace(shutil.make_archive(tmp_base, "gztar", root_dir=root_dir, base_dir=base_dir), archive)
+    except OSError as e:
+        print(f"⚠ {description} failed: {e}")
+        return False
+    print(f"✓ {description} ({time.perf_counter() - start:.1f} s): {archive}")
+    return True
+
+
+def restore_archive(archive, dest_dir, description):
+    """Unpack an archive written by save_archive into dest_dir; False when there is none"""
+    if not os.path.exists(archive):
+        return False
+    start = time.perf_counter()
+    try:
+        shutil.unpack_archive(archive, dest_dir)
+    except (OSError, ValueError, shutil.ReadError) as e:
+        print(f"⚠ {description} failed: {e}")
+        return False
+    print(f"✓ {description} ({time.perf_counter() - start:.1f} s)")
+    return True
+
+
+def install_packages(pip_cmd, packages, wheelhouse, description):
+    """pip install from the wheel cache when it is complete, else from the index"""
+    if os.path.exists(os.path.join(wheelhouse, ".complete")):
+        return run_command([pip_cmd, "install", "--quiet", "--no-index", "--find-links", wheelhouse, *packages],
+                           f"{description} (from cache)")
+    return run_command([pip_cmd, "install", "--quiet", *packages], description)
+
+
 def setup_environment():
     """Set up the complete test environment"""
     print("="*60)
@@ -60,55 +194,96 @@ def setup_environment():
     else:
         project_root = current_dir
     
-    print(f"Project root: {os.path.abspath(project_root)}")
+    project_root = os.path.abspath(project_root)
+    print(f"Project root: {project_root}")
     
-    # Create virtual environment
-    venv_path = os.path.join(project_root, 'venv')
-    if not os.path.exists(venv_path):
-        if not run_command(f"python -m venv {venv_path}", "Creating virtual environment"):
-            return False
-    else:
-        print("✓ Virtual environment already exists")
+    requirements_path = os.path.join(project_root, 'requirements.txt')
+    if not os.path.exists(requirements_path):
+        print(f"⚠ requirements.txt not found at {requirements_path}, using the default package list")
+    packages = read_packages(requirements_path)
+    browser = os.environ.get("PW_BROWSER", "firefox")
+    force = "--force" in sys.argv
+    key = bootstrap_key(packages, browser)
+    wheelhouse = os.path.join(CACHE_DIR, "wheels", key)
+    print(f"Bootstrap key: {key} (cache: {CACHE_DIR})")
     
-    # Determine activation command
+    venv_path = os.path.join(project_root, 'venv')
     if platform.system() == "Windows":
         pip_cmd = os.path.join(venv_path, 'Scripts', 'pip')
-        activate_cmd = os.path.join(venv_path, 'Scripts', 'activate')
+        playwright_cmd = os.path.join(venv_path, 'Scripts', 'playwright')
+        python_cmd = os.path.join(venv_path, 'Scripts', 'python')
     else:
         pip_cmd = os.path.join(venv_path, 'bin', 'pip')
-        activate_cmd = f"source {os.path.join(venv_path, 'bin', 'activate')}"
+        playwright_cmd = os.path.join(venv_path, 'bin', 'playwright')
+        python_cmd = os.path.join(venv_path, 'bin', 'python')
     
-    # Install requirements
-    requirements_path = os.path.join(project_root, 'requirements.txt')
-    if os.path.exists(requirements_path):
-        if not run_command(f"{pip_cmd} install -r {requirements_path}", "Installing Python packages"):
+    # A venv has its own path baked into its scripts, so its archive is only reused at the same path
+    archive_dir = os.path.join(CACHE_DIR, key)
+    venv_archive = os.path.join(archive_dir, f"venv-{hashlib.sha256(venv_path.encode('utf-8')).hexdigest()[:8]}.tar.gz")
+    browser_archive = os.path.join(archive_dir, f"{browser}.tar.gz")
+    browsers_path = default_browsers_path()
+    if not force and not os.path.exists(venv_path):
+        restore_archive(venv_archive, project_root, "Restoring virtual environment from cache")
+    
+    stamp = {} if force else read_stamp(venv_path)
+    packages_done = stamp.get("packages") == key
+    browser_done = stamp.get("browser") == key
+    
+    # Step 1: venv and wheel cache do not depend on each other
+    steps = []
+    if not os.path.exists(venv_path):
+        steps.append((run_command, ([sys.executable, "-m", "venv", venv_path], "Creating virtual environment")))
+    else:
+        print("✓ Virtual environment already exists")
+    if not packages_done:
+        steps.append((fill_wheelhouse, (wheelhouse, packages)))
+    if steps and not run_parallel(*steps):
+        # Without a wheel cache the installs below fall back to the package index
+        if not os.path.exists(venv_path):
+            return False
+    
+    # Step 2: Playwright itself first, its CLI downloads the browser
+    playwright_pkg = [p for p in packages if re.match(r"playwright==", p)] or ["playwright"]
+    if not packages_done:
+        if not install_packages(pip_cmd, playwright_pkg, wheelhouse, "Installing Playwright"):
             return False
+    
+    # The stamp alone is not enough: the browser cache may have been cleared since
+    if browser_done and not browser_executable(python_cmd, browser):
+        browser_done = False
+        print(f"⚠ {browser} is stamped as installed but its executable is missing")
+    if not browser_done and not force and browsers_path and restore_archive(
+            browser_archive, browsers_path, f"Restoring {browser} from cache"):
+        browser_done = browser_executable(python_cmd, browser) is not None
+    
+    # Step 3: the remaining packages and the browser download in parallel
+    steps = []
+    if not packages_done:
+        steps.append((install_packages, (pip_cmd, packages, wheelhouse, "Installing Python packages")))
     else:
-        print(f"⚠ requirements.txt not found at {requirements_path}")
-        print("Installing packages individually...")
-        packages = ["playwright==1.55.0", "pytest-playwright==0.7.1", "pytest==8.4.2", "pytest-html==4.1.1", "requests==2.31.0"]
-        for package in packages:
-            if not run_command(f"{pip_cmd} install {package}", f"Installing {package}"):
-                return False
-    
-    # Install Playwright browsers
-    if platform.system() == "Windows":
-        playwright_cmd = os.path.join(venv_path, 'Scripts', 'playwright')
+        print("✓ Python packages already installed for this key")
+    if not browser_done:
+        steps.append((run_command, ([playwright_cmd, "install", browser], f"Installing {browser} for Playwright")))
     else:
-        playwright_cmd = os.path.join(venv_path, 'bin', 'playwright')
-    
-    if not run_command(f"{playwright_cmd} install firefox", "Installing Firefox for Playwright"):
+        print(f"✓ {browser} already installed for this key")
+    if steps and not run_parallel(*steps):
         return False
+    write_stamp(venv_path, {"packages": key, "browser": key})
+    
+    # Archive what was installed so a fresh checkout or a cleared browser cache restores it
+    # One at a time: make_archive changes the working directory on older Pythons.
+    # A failed archive only costs the next run a reinstall.
+    save_archive(venv_archive, project_root, "venv", "Archiving virtual environment")
+    executable = browser_executable(python_cmd, browser)
+    if browsers_path and executable:
+        browser_dir = os.path.relpath(executable, browsers_path).split(os.sep)[0]
+        if browser_dir != os.pardir:
+            save_archive(browser_archive, browsers_path, browser_dir, f"Archiving {browser}")
     
     # Test Playwright installation
     test_dir = os.path.join(project_root, 'tests', 'playwright_tst')
-    if os.path.exists(test_dir):
+    if os.path.exists(test_dir) and not (packages_done and browser_done):
         os.chdir(test_dir)
-        if platform.system() == "Windows":
-            python_cmd = os.path.join(venv_path, 'Scripts', 'python')
-        else:
-            python_cmd = os.path.join(venv_path, 'bin', 'python')
-        
         test_command = f'{python_cmd} -c "from playwright.sync_api import sync_playwright; print(\'Playwright ready!\')"'
         if not run_command(test_command, "Testing Playwright installation"):
             return False
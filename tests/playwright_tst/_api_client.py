@@ -0,0 +1,160 @@
+# Shared client for the restful-booker API
+#
+# One pooled keep-alive Session for every API call in the suite, with bounded
+# retries on 5xx/connection errors, a cached auth token and per-call timings.
+
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from _cassette import get_cassette
+from _timing import span
+from _config import api_base_url, API_USERNAME, API_PASSWORD, API_TOKEN_TTL_S, API_RETRIES
+
+
+class BookingApiClient:
+    """Keep-alive restful-booker client with retries, token cache and call timings"""
+
+    def __init__(self, base_url=None, username=API_USERNAME, password=API_PASSWORD,
+                 token_ttl_s=API_TOKEN_TTL_S, retries=API_RETRIES, backoff=0.3,
+                 pool_size=10, timeout=10):
+        self.base_url = (base_url or api_base_url()).rstrip("/")
+        self.username = username
+        self.password = password
+        self.token_ttl_s = token_ttl_s
+        self.timeout = timeout
+
+        # Retry connection errors and 5xx with exponential backoff (0.3 s, 0.6 s, 1.2 s ...).
+        # POST is left out: a create that timed out or got a 5xx may still have made a booking,
+        # so it is only retried when the connection failed before anything was sent
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "PUT", "DELETE", "HEAD", "OPTIONS"}),
+            raise_on_status=False,
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        # With a cassette on, every call is recorded through or replayed instead of the real adapter
+        cassette = get_cassette()
+        transport = cassette.adapter(self.adapter) if cassette else self.adapter
+        self.session.mount("https://", transport)
+        self.session.mount("http://", transport)
+
+        self.calls = []  # {"method", "path", "status", "elapsed_ms", "new_connections"}
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = threading.Lock()
+
+    def _connections_opened(self):
+        """Total connections opened so far across the adapter's pools"""
+        pools = self.adapter.poolmanager.pools
+        total = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                total += pool.num_connections
+        return total
+
+    def request(self, method, path, **kwargs):
+        """Send a request relative to the API base URL and record its latency"""
+        kwargs.setdefault("timeout", self.timeout)
+        opened_before = self._connections_opened()
+        start = time.perf_counter()
+        status = None
+        try:
+            with span(f"{method} {path}", "network"):
+                response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            self.calls.append({
+                "method": method,
+                "path": path,
+                "status": status,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+                "new_connections": self._connections_opened() - opened_before,
+            })
+
+    def get_token(self, force_refresh=False):
+        """Return the cached auth token, fetching a new one when missing or expired"""
+        with self._token_lock:
+            if not force_refresh and self._token and time.monotonic() < self._token_expires:
+                return self._token
+
+            response = self.request("POST", "/auth", json={"username": self.username, "password": self.password})
+            # restful-booker answers bad credentials with 200 and a "reason" instead of a token
+            token = response.json().get("token") if response.status_code == 200 else None
+            if not token:
+                print(f"✗ Auth failed: {response.status_code}")
+                self._token = None
+                return None
+
+            self._token = token
+            self._token_expires = time.monotonic() + self.token_ttl_s
+            return token
+
+    def authed_request(self, method, path, **kwargs):
+        """
+        Send a request with the token cookie
+
+        If the API rejects the cached token, fetch a fresh one and try once more.
+        Returns None when no token can be obtained.
+        """
+        extra_headers = kwargs.pop("headers", {})
+        for force_refresh in (False, True):
+            token = self.get_token(force_refresh=force_refresh)
+            if not token:
+                return None
+            headers = {**extra_headers, "Cookie": f"token={token}"}
+            response = self.request(method, path, headers=headers, **kwargs)
+            if response.status_code not in (401, 403):
+                return response
+            print(f"⚠ Token rejected ({response.status_code}), refreshing")
+        return response
+
+    def list_bookings(self, **filters):
+        """GET /booking with optional firstname/lastname/checkin/checkout filters"""
+        return self.request("GET", "/booking", params=filters or None)
+
+    def create_booking(self, booking):
+        """POST /booking; the response JSON has the new bookingid"""
+        return self.request("POST", "/booking", json=booking, headers={"Accept": "application/json"})
+
+    def delete_booking(self, booking_id):
+        """DELETE /booking/{id}; None when no token could be obtained"""
+        return self.authed_request("DELETE", f"/booking/{booking_id}")
+
+    def latency_report_lines(self):
+        """Per-call latency table; new_conn=0 means a pooled connection was reused"""
+        lines = [f"{'METHOD':<7} {'PATH':<40} {'STATUS':>6} {'ms':>8} {'NEW_CONN':>8}"]
+        for call in self.calls:
+            lines.append(f"{call['method']:<7} {call['path'][:40]:<40} {str(call['status']):>6} "
+                         f"{call['elapsed_ms']:>8.1f} {call['new_connections']:>8}")
+        reused = [c["elapsed_ms"] for c in self.calls if c["new_connections"] == 0]
+        fresh = [c["elapsed_ms"] for c in self.calls if c["new_connections"] > 0]
+        if fresh:
+            lines.append(f"New connection calls: {len(fresh)}, avg {sum(fresh) / len(fresh):.1f} ms")
+        if reused:
+            lines.append(f"Reused connection calls: {len(reused)}, avg {sum(reused) / len(reused):.1f} ms")
+        return lines
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_api_client():
+    """Process-wide shared client (one per worker when run in parallel)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = BookingApiClient()
+        return _client
+
+
+def api_client_in_use():
+    """True once the shared client has been created"""
+    return _client is not None
@@ -0,0 +1,135 @@
+# Availability calendar for picking booking dates
+#
+# Booked nights for a room are fetched once per session and kept as a sorted
+# list of merged [start, end) day intervals. Finding the first free window is
+# a binary search plus a walk over the gaps, and every window handed out is
+# added to the index, so concurrent callers never get overlapping stays.
+# Windows can also be handed out without asking the site (fetch=False); they
+# go into the same index, and the site's bookings are merged in on first use.
+
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from _api_client import BookingApiClient
+from _config import site_base_url
+
+
+class RoomIntervals:
+    """Merged, sorted booked intervals [start, end) for one room, as day ordinals"""
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            self.add(start, end)
+
+    def add(self, start, end):
+        """Mark [start, end) as booked, merging with overlapping or touching intervals"""
+        if end <= start:
+            return
+        # Intervals whose end >= start and whose start <= end touch the new one
+        first = bisect_left(self.ends, start)
+        last = bisect_right(self.starts, end)
+        if first < last:
+            start = min(start, self.starts[first])
+            end = max(end, self.ends[last - 1])
+        self.starts[first:last] = [start]
+        self.ends[first:last] = [end]
+
+    def first_free(self, nights, after):
+        """First day >= after that starts `nights` consecutive free nights"""
+        day = after
+        i = bisect_right(self.ends, day)  # first interval ending after `day`
+        while i < len(self.starts):
+            if self.starts[i] - day >= nights:
+                return day
+            day = max(day, self.ends[i])
+            i += 1
+        return day
+
+    def __len__(self):
+        return len(self.starts)
+
+
+def _parse_day(value):
+    return datetime.strptime(value[:10], "%Y-%m-%d").date().toordinal()
+
+
+def fetch_room_intervals(room_id, client=None):
+    """
+    Booked intervals for a room from the booking site's room report
+
+    The report lists each booking as {"start", "end"}; the end day is blocked
+    too, which may hold back one free night but never offers a booked one.
+    """
+    client = client or BookingApiClient(base_url=site_base_url())
+    response = client.request("GET", f"/api/report/room/{room_id}", timeout=5)
+    if response.status_code != 200:
+        raise RuntimeError(f"room report failed with status {response.status_code}")
+    intervals = []
+    for entry in response.json().get("report", []):
+        intervals.append((_parse_day(entry["start"]), _parse_day(entry["end"]) + 1))
+    return intervals
+
+
+class AvailabilityCalendar:
+    """Session-wide calendar that hands out non-overlapping room windows"""
+
+    def __init__(self, fetch_intervals=fetch_room_intervals):
+        self.fetch_intervals = fetch_intervals
+        self.rooms = {}
+        self.fetched = set()  # rooms whose site bookings are in the index
+        self.lock = threading.Lock()
+
+    def room(self, room_id, fetch=True):
+        """Interval index for a room; the site's bookings are fetched on first use with fetch"""
+        with self.lock:
+            index = self.rooms.setdefault(room_id, RoomIntervals())
+            if fetch and room_id not in self.fetched:
+                self.fetched.add(room_id)
+                try:
+                    intervals = self.fetch_intervals(room_id)
+                    print(f"Loaded {len(intervals)} booking(s) for Room {room_id}")
+                except Exception as e:
+                    print(f"⚠ Could not load bookings for Room {room_id} ({e}), assuming none")
+                    intervals = []
+                for start, end in intervals:
+                    index.add(start, end)
+            return index
+
+    def first_free_window(self, room_id, nights=1, after=None):
+        """First free window of `nights` for the room on or after `after` (a date)"""
+        index = self.room(room_id)
+        after = after or date.today() + timedelta(days=1)
+        with self.lock:
+            day = index.first_free(nights, after.toordinal())
+        return date.fromordinal(day), date.fromordinal(day + nights)
+
+    def reserve(self, room_id, nights=1, after=None, before=None, fetch=True):
+        """
+        Claim the first free window so no later caller gets it
+
+        With before, the stay must check out by that date; RuntimeError when
+        no window fits. fetch=False skips the site's bookings (not loaded yet).
+        """
+        index = self.room(room_id, fetch)
+        after = after or date.today() + timedelta(days=1)
+        with self.lock:
+            day = index.first_free(nights, after.toordinal())
+            if before is not None and day + nights > before.toordinal():
+                raise RuntimeError(f"No free {nights}-night window for Room {room_id} between {after} and {before}")
+            index.add(day, day + nights)
+        return date.fromordinal(day), date.fromordinal(day + nights)
+
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+
+def get_availability_calendar():
+    """Process-wide calendar (one per worker when run in parallel)"""
+    global _calendar
+    with _calendar_lock:
+        if _calendar is None:
+            _calendar = AvailabilityCalendar()
+        return _calendar
@@ -0,0 +1,39 @@
+# Booking page selectors and helpers shared by the tests and the load generator
+#
+# Plain module (no pytest, no fixtures) so scripts such as vi_run_ui_load.py
+# can import it without loading conftest.py.
+
+import itertools
+import time
+from _config import worker_index, site_base_url
+
+# Booking page selectors (from the page analyzer)
+RESERVE_BUTTON = "button:has-text('Reserve Now')"
+FORM_FIELD = "input[name='{}']"
+SUBMIT_BUTTON = "button.btn.btn-primary.w-100.mb-3"
+CONFIRMATION_TEXT = "Booking Confirmed"
+
+# Rendered text (innerText skips hidden elements) of any scope element contains the needle
+TEXT_IN_SCOPE_JS = """
+([scope, needle]) => Array.from(document.querySelectorAll(scope))
+  .some((el) => (el.innerText || "").toLowerCase().includes(needle))
+"""
+
+_unique_counter = itertools.count()
+
+
+def reservation_url(room_type, checkin, checkout):
+    """Reservation page of a room with the stay preselected"""
+    return f"{site_base_url()}/reservation/{room_type}?checkin={checkin}&checkout={checkout}"
+
+
+def generate_unique_phone():
+    """
+    Generate unique phone number for test identification
+    
+    Worker number + millisecond timestamp + per-process counter, so parallel
+    workers and repeated calls within one worker never get the same value.
+    """
+    millis = str(int(time.time() * 1000))[-10:]
+    sequence = next(_unique_counter) % 1000
+    return f"TEST{worker_index():02d}{millis}{sequence:03d}"
@@ -0,0 +1,126 @@
+# Pre-provisioned bookings for tests that need one to work on
+#
+# Instead of downloading the whole /booking list and taking someone else's
+# booking, the session creates the bookings its tests asked for (bookings(n)
+# marker) in one concurrent batch, hands them out one test at a time and
+# deletes whatever is left at the end. Every booking is tagged with the run
+# id (additionalneeds) and only this pool's ids are ever deleted, so
+# bookings of parallel workers and other runs are never touched.
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+
+class BookingPool:
+    """Bookings created up front for this session, handed out and cleaned up"""
+
+    def __init__(self, client, tag, concurrency=8, days_ahead=400):
+        self.client = client
+        self.tag = tag
+        self.concurrency = concurrency
+        self.days_ahead = days_ahead
+        self.available = deque()
+        self.created = []     # every booking id this pool made
+        self.deleted = set()  # ids known to be gone (by a test or the cleanup)
+        self.handed_out = 0
+        self.provision_ms = 0.0
+        self.cleanup_ms = 0.0
+        self.failures = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _payload(self):
+        """Booking body tagged with the run; far enough ahead not to clash with UI tests"""
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        checkin = date.today() + timedelta(days=self.days_ahead + sequence)
+        return {
+            "firstname": "PoolTest",
+            "lastname": f"Pool{sequence}",
+            "totalprice": 100,
+            "depositpaid": True,
+            "bookingdates": {"checkin": checkin.isoformat(), "checkout": (checkin + timedelta(days=1)).isoformat()},
+            "additionalneeds": f"pool {self.tag}",
+        }
+
+    def _create_one(self):
+        """Create a booking; its id or None"""
+        try:
+            response = self.client.create_booking(self._payload())
+            if response.status_code == 200:
+                return response.json()["bookingid"]
+            self.failures.append(f"create: HTTP {response.status_code}")
+        except Exception as e:
+            self.failures.append(f"create: {e}")
+        return None
+
+    def provision(self, count):
+        """Create count bookings concurrently; returns how many were created"""
+        if count <= 0:
+            return 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, count)) as pool:
+            ids = [booking_id for booking_id in pool.map(lambda _: self._create_one(), range(count)) if booking_id]
+        with self._lock:
+            self.created.extend(ids)
+            self.available.extend(ids)
+        self.provision_ms += (time.perf_counter() - start) * 1000
+        print(f"✓ Provisioned {len(ids)}/{count} pooled bookings in {self.provision_ms:.0f} ms")
+        return len(ids)
+
+    def take(self, count=1):
+        """Hand out count bookings, creating more if the pool ran dry"""
+        with self._lock:
+            ids = [self.available.popleft() for _ in range(min(count, len(self.available)))]
+        while len(ids) < count:
+            booking_id = self._create_one()
+            if booking_id is None:
+                break
+            with self._lock:
+                self.created.append(booking_id)
+            ids.append(booking_id)
+        self.handed_out += len(ids)
+        return ids
+
+    def mark_deleted(self, booking_id):
+        """Tell the pool a test deleted one of its bookings"""
+        with self._lock:
+            self.deleted.add(booking_id)
+
+    def _delete_one(self, booking_id):
+        try:
+            response = self.client.delete_booking(booking_id)
+            # 404/405: already gone, e.g. deleted by the test without telling the pool
+            if response is not None and response.status_code in (200, 201, 404, 405):
+                return True
+            self.failures.append(f"delete {booking_id}: {'no token' if response is None else response.status_code}")
+        except Exception as e:
+            self.failures.append(f"delete {booking_id}: {e}")
+        return False
+
+    def cleanup(self):
+        """Delete every booking this pool created that is not known to be gone"""
+        with self._lock:
+            leftovers = [booking_id for booking_id in self.created if booking_id not in self.deleted]
+            self.available.clear()
+        if not leftovers:
+            return 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(leftovers))) as pool:
+            done = [booking_id for booking_id, ok in zip(leftovers, pool.map(self._delete_one, leftovers)) if ok]
+        self.deleted.update(done)
+        self.cleanup_ms = (time.perf_counter() - start) * 1000
+        return len(done)
+
+    def report_lines(self):
+        """What the pool created, handed out and cleaned up"""
+        lines = [
+            f"Created: {len(self.created)} (provisioned in {self.provision_ms:.0f} ms), handed out: {self.handed_out}",
+            f"Deleted: {len(self.deleted)} (cleanup {self.cleanup_ms:.0f} ms), tag: {self.tag}",
+        ]
+        lines.extend(f"⚠ {failure}" for failure in self.failures[:10])
+        return lines
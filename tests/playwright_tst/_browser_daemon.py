@@ -0,0 +1,464 @@
+# Long-lived local pool of Playwright browser servers
+#
+# Keeps warm `playwright launch-server` processes for firefox, chromium and
+# webkit, so pytest runs, the runner and the page analyzer connect to an
+# already running browser over its websocket instead of launching one:
+#   GET  /status      servers, leases and counters
+#   POST /acquire     {"browser", "headless", "pid"} -> {"lease", "ws_endpoint", "warm"}
+#   POST /release     {"lease", "contexts"}
+#   POST /shutdown    stop every browser and exit
+#
+# A server is health-checked (process alive, websocket port open), retired
+# once it has served RECYCLE_AFTER contexts, and stopped after IDLE_S
+# seconds unused unless it is one of the warm ones. Leases of processes
+# that died without releasing are dropped. Each server's output goes to
+# log/browser_daemon/<browser>-<number>.log.
+#
+# Run:   python _browser_daemon.py --warm firefox,chromium:headed
+# Use:   PW_BROWSER_DAEMON=http://127.0.0.1:9323 python iv_run_all_tests.py
+
+import argparse
+import itertools
+import json
+import os
+import queue
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from _config import DAEMON_PORT, DAEMON_WARM, DAEMON_RECYCLE_AFTER as RECYCLE_AFTER, DAEMON_IDLE_S as IDLE_S
+from _config import DAEMON_CLIENTS_PER_SERVER as CLIENTS_PER_SERVER, DAEMON_LAUNCH_TIMEOUT_S as LAUNCH_TIMEOUT_S
+from _config import HEADLESS, LOG_DIR
+
+BROWSERS = ("firefox", "chromium", "webkit")
+
+# Seconds between health, recycle and idle checks
+CHECK_INTERVAL_S = 5
+
+
+def pid_alive(pid):
+    """True while a local process id exists"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def parse_warm(entries, headless=HEADLESS):
+    """
+    (browser, headless) keys for --warm entries
+
+    "firefox:headed" and "firefox:headless" pick the setting; a plain
+    "firefox" follows PW_HEADLESS like the test runs that will connect.
+    """
+    keys = set()
+    for entry in entries:
+        browser, _, mode = entry.strip().partition(":")
+        if browser not in BROWSERS or mode not in ("", "headed", "headless"):
+            raise ValueError(f"Bad warm entry {entry!r}, expected <browser>[:headed|:headless]")
+        keys.add((browser, headless if not mode else mode == "headless"))
+    return keys
+
+
+class BrowserServer:
+    """One `playwright launch-server` process and what it has served"""
+
+    def __init__(self, browser, headless, number):
+        self.browser = browser
+        self.headless = headless
+        self.number = number
+        self.ws_endpoint = None
+        self.process = None
+        self.leases = {}        # lease id -> client pid
+        self.contexts = 0       # reported by clients on release
+        self.served = 0         # leases handed out in total
+        self.retiring = False
+        self.started = time.time()
+        self.last_used = time.time()
+        self.launch_ms = 0.0
+        self.log_path = os.path.join(LOG_DIR, "browser_daemon", f"{browser}-{number}.log")
+
+    def _drain(self, log):
+        """Copy the rest of stdout to the log so the server never blocks on a full pipe"""
+        for line in self.process.stdout:
+            log.write(line)
+            log.flush()
+        log.close()
+
+    def launch(self):
+        """Start the server and wait for it to print its websocket endpoint"""
+        start = time.perf_counter()
+        fd, config_path = tempfile.mkstemp(suffix=".json", prefix="pw-launch-")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"headless": self.headless}, f)
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        log = open(self.log_path, "w", encoding="utf-8")
+        # stderr straight into the log; stdout is read for the endpoint, then drained into it
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "playwright", "launch-server", "--browser", self.browser, "--config", config_path],
+            stdout=subprocess.PIPE, stderr=log, text=True,
+        )
+        # The endpoint is the first line on stdout; read it on a thread so a hung launch times out
+        lines = queue.Queue()
+        threading.Thread(target=lambda: lines.put(self.process.stdout.readline()), daemon=True).start()
+        try:
+            line = lines.get(timeout=LAUNCH_TIMEOUT_S).strip()
+        except queue.Empty:
+            line = ""
+        finally:
+            os.remove(config_path)
+        if not line.startswith("ws://"):
+            self.stop()
+            log.close()
+            if self.process.poll() is not None:
+                with open(self.log_path, encoding="utf-8", errors="replace") as f:
+                    error = f.read().strip()[-300:] or "exited"
+            else:
+                error = "timed out"
+            raise RuntimeError(f"{self.browser} server did not start: {line or error} (log: {self.log_path})")
+        threading.Thread(target=self._drain, args=(log,), name=f"drain-{self.browser}-{self.number}",
+                         daemon=True).start()
+        self.ws_endpoint = line
+        self.launch_ms = (time.perf_counter() - start) * 1000
+        return self
+
+    def healthy(self):
+        """Process running and websocket port accepting connections"""
+        if self.process is None or self.process.poll() is not None:
+            return False
+        url = urlparse(self.ws_endpoint)
+        try:
+            with socket.create_connection((url.hostname, url.port), timeout=2):
+                return True
+        except OSError:
+            return False
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def describe(self):
+        return {
+            "browser": self.browser, "headless": self.headless, "number": self.number,
+            "ws_endpoint": self.ws_endpoint, "leases": len(self.leases), "contexts": self.contexts,
+            "served": self.served, "retiring": self.retiring, "launch_ms": round(self.launch_ms, 1),
+            "idle_s": round(time.time() - self.last_used) if not self.leases else 0,
+        }
+
+
+class BrowserPool:
+    """Warm browser servers per (browser, headless), leased out to test processes"""
+
+    def __init__(self, warm=(), recycle_after=RECYCLE_AFTER, idle_s=IDLE_S, clients_per_server=CLIENTS_PER_SERVER,
+                 headless=HEADLESS):
+        self.warm = parse_warm(warm, headless)
+        self.recycle_after = recycle_after
+        self.idle_s = idle_s
+        self.clients_per_server = clients_per_server
+        self.servers = []
+        self.leases = {}  # lease id -> BrowserServer
+        self.counters = {"acquired": 0, "warm_hits": 0, "launched": 0, "recycled": 0, "idle_stopped": 0,
+                         "unhealthy": 0, "stale_leases": 0}
+        self._numbers = itertools.count(1)
+        self._lease_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._launch_locks = {}
+        self.stopped = threading.Event()
+
+    def _launch(self, browser, headless):
+        """Start a server for the key"""
+        server = BrowserServer(browser, headless, next(self._numbers)).launch()
+        with self._lock:
+            self.servers.append(server)
+            self.counters["launched"] += 1
+        print(f"✓ {browser} server #{server.number} ready in {server.launch_ms:.0f} ms at {server.ws_endpoint}")
+        return server
+
+    def _usable(self, browser, headless):
+        """Least-used server of the key that takes another client"""
+        with self._lock:
+            candidates = [s for s in self.servers if s.browser == browser and s.headless == headless
+                          and not s.retiring and len(s.leases) < self.clients_per_server]
+        return min(candidates, key=lambda s: (len(s.leases), s.contexts)) if candidates else None
+
+    def ensure(self, browser, headless):
+        """
+        A healthy server of the key that takes another client: (server, was running)
+
+        Launches are serialized per key, so clients arriving together share
+        one new server instead of starting one each.
+        """
+        server = self._usable(browser, headless)
+        if server is not None and server.healthy():
+            return server, True
+        with self._lock:
+            launch_lock = self._launch_locks.setdefault((browser, headless), threading.Lock())
+        with launch_lock:
+            server = self._usable(browser, headless)
+            if server is not None and not server.healthy():
+                self._drop(server, "unhealthy")
+                server = None
+            if server is not None:
+                return server, True
+            return self._launch(browser, headless), False
+
+    def acquire(self, browser, headless=True, pid=None):
+        """Lease a running server, launching one when none is free"""
+        if browser not in BROWSERS:
+            raise ValueError(f"Unknown browser {browser!r}, one of {', '.join(BROWSERS)}")
+        server, warm = self.ensure(browser, headless)
+        with self._lock:
+            lease = f"{server.browser}-{server.number}-{next(self._lease_ids)}"
+            server.leases[lease] = pid
+            server.served += 1
+            server.last_used = time.time()
+            self.leases[lease] = server
+            self.counters["acquired"] += 1
+            self.counters["warm_hits"] += warm
+        return {"lease": lease, "ws_endpoint": server.ws_endpoint, "warm": warm}
+
+    def release(self, lease, contexts=0):
+        """End a lease; the server retires once it has served recycle_after contexts"""
+        with self._lock:
+            server = self.leases.pop(lease, None)
+            if server is None:
+                return False
+            server.leases.pop(lease, None)
+            server.contexts += contexts
+            server.last_used = time.time()
+            if server.contexts >= self.recycle_after:
+                server.retiring = True
+        return True
+
+    def _drop(self, server, reason):
+        """Stop a server and forget it and its leases"""
+        with self._lock:
+            if server not in self.servers:
+                return
+            self.servers.remove(server)
+            for lease in server.leases:
+                self.leases.pop(lease, None)
+            self.counters[reason] += 1
+        server.stop()
+        print(f"- {server.browser} server #{server.number} stopped ({reason}, {server.contexts} contexts)")
+
+    def check(self):
+        """One round of housekeeping: health, stale leases, recycling, idle servers, warm pool"""
+        with self._lock:
+            servers = list(self.servers)
+            for server in servers:
+                for lease, pid in list(server.leases.items()):
+                    if pid and not pid_alive(pid):
+                        server.leases.pop(lease)
+                        self.leases.pop(lease, None)
+                        self.counters["stale_leases"] += 1
+        warm_keys = set()
+        for server in servers:
+            key = (server.browser, server.headless)
+            if not server.healthy():
+                self._drop(server, "unhealthy")
+            elif server.retiring and not server.leases:
+                self._drop(server, "recycled")
+            elif (not server.leases and time.time() - server.last_used > self.idle_s
+                  and (key not in self.warm or key in warm_keys)):
+                self._drop(server, "idle_stopped")
+            elif not server.retiring:
+                warm_keys.add(key)
+        # Warm keys with no usable server get one before anybody asks
+        for browser, headless in self.warm - warm_keys:
+            try:
+                self.ensure(browser, headless)
+            except Exception as e:
+                print(f"✗ Could not warm {browser} ({'headless' if headless else 'headed'}): {e}")
+
+    def run_checks(self):
+        while not self.stopped.wait(CHECK_INTERVAL_S):
+            self.check()
+
+    def status(self):
+        with self._lock:
+            return {"servers": [s.describe() for s in self.servers], "counters": dict(self.counters),
+                    "recycle_after": self.recycle_after, "idle_s": self.idle_s}
+
+    def shutdown(self):
+        """Stop housekeeping and every browser server"""
+        self.stopped.set()
+        for server in list(self.servers):
+            self._drop(server, "idle_stopped")
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """JSON control API of the daemon"""
+
+    pool = None  # set per server in start_daemon
+    quiet = True
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, status, body):
+        body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path in ("/status", "/health"):
+            return self._send(200, self.pool.status())
+        return self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send(400, {"error": "invalid JSON"})
+        try:
+            if self.path == "/acquire":
+                return self._send(200, self.pool.acquire(payload.get("browser", "firefox"),
+                                                         bool(payload.get("headless", True)), payload.get("pid")))
+            if self.path == "/release":
+                return self._send(200, {"released": self.pool.release(payload.get("lease"),
+                                                                      int(payload.get("contexts", 0)))})
+            if self.path == "/shutdown":
+                self._send(200, {"stopping": True})
+                threading.Thread(target=self.pool.shutdown, daemon=True).start()
+                return None
+        except (ValueError, RuntimeError) as e:
+            return self._send(503, {"error": str(e)})
+        return self._send(404, {"error": "not found"})
+
+
+def start_daemon(port=DAEMON_PORT, warm=DAEMON_WARM, host="127.0.0.1", quiet=True, **pool_options):
+    """Run the control API and housekeeping on background threads; returns (httpd, pool)"""
+    pool = BrowserPool(warm, **pool_options)
+    handler = type("BoundDaemonHandler", (DaemonHandler,), {"pool": pool, "quiet": quiet})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=pool.check, daemon=True).start()  # warm up right away
+    threading.Thread(target=pool.run_checks, name="browser-daemon-checks", daemon=True).start()
+    threading.Thread(target=httpd.serve_forever, name="browser-daemon", daemon=True).start()
+    return httpd, pool
+
+
+# --- client side ---
+
+def _call(daemon_url, path, payload=None, timeout=LAUNCH_TIMEOUT_S + 10):
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(f"{daemon_url.rstrip('/')}{path}", data=data,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+class BrowserLease:
+    """A browser server borrowed from the daemon; release it when done"""
+
+    def __init__(self, daemon_url, lease, ws_endpoint, warm):
+        self.daemon_url = daemon_url
+        self.lease = lease
+        self.ws_endpoint = ws_endpoint
+        self.warm = warm
+
+    def release(self, contexts=0):
+        try:
+            _call(self.daemon_url, "/release", {"lease": self.lease, "contexts": contexts}, timeout=5)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Could not release browser lease {self.lease}: {e}")
+
+
+def acquire_lease(daemon_url, browser, headless):
+    """Lease from the daemon, or None (with a warning) when it is not reachable"""
+    try:
+        result = _call(daemon_url, "/acquire", {"browser": browser, "headless": headless, "pid": os.getpid()})
+    except (OSError, ValueError) as e:
+        detail = e.read().decode("utf-8", "replace") if isinstance(e, urllib.error.HTTPError) else e
+        print(f"⚠ Browser daemon at {daemon_url} not usable ({detail}), launching locally")
+        return None
+    return BrowserLease(daemon_url, result["lease"], result["ws_endpoint"], result["warm"])
+
+
+def connect_browser(browser_type, daemon_url, headless, slow_mo=0):
+    """
+    Browser from the daemon over its websocket: (browser, lease), or (None, None)
+    when there is no daemon, so the caller launches one itself
+    """
+    lease = acquire_lease(daemon_url, browser_type.name, headless) if daemon_url else None
+    if lease is None:
+        return None, None
+    browser = browser_type.connect(lease.ws_endpoint, slow_mo=slow_mo)
+    print(f"Connected to {'warm' if lease.warm else 'new'} {browser_type.name} server {lease.lease}")
+    return browser, lease
+
+
+async def connect_browser_async(browser_type, daemon_url, headless, slow_mo=0):
+    """connect_browser for the async Playwright API"""
+    import asyncio
+
+    lease = await asyncio.to_thread(acquire_lease, daemon_url, browser_type.name, headless) if daemon_url else None
+    if lease is None:
+        return None, None
+    browser = await browser_type.connect(lease.ws_endpoint, slow_mo=slow_mo)
+    print(f"Connected to {'warm' if lease.warm else 'new'} {browser_type.name} server {lease.lease}")
+    return browser, lease
+
+
+def parse_args():
+    """Command line options for the daemon"""
+    parser = argparse.ArgumentParser(description="Keep warm Playwright browser servers for repeated local runs")
+    parser.add_argument("--port", type=int, default=DAEMON_PORT, help=f"Control API port (default: {DAEMON_PORT})")
+    parser.add_argument("--warm", default=",".join(DAEMON_WARM),
+                        help="Browsers kept running even when idle, comma-separated; <browser> follows PW_HEADLESS, "
+                             "<browser>:headed or <browser>:headless picks one (default: firefox)")
+    parser.add_argument("--recycle-after", type=int, default=RECYCLE_AFTER,
+                        help=f"Restart a browser after this many contexts (default: {RECYCLE_AFTER})")
+    parser.add_argument("--idle-timeout", type=int, default=IDLE_S,
+                        help=f"Stop browsers unused for this many seconds, warm ones excepted (default: {IDLE_S})")
+    parser.add_argument("--status", action="store_true", help="Print the status of a running daemon")
+    parser.add_argument("--stop", action="store_true", help="Stop a running daemon")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    url = f"http://127.0.0.1:{args.port}"
+    if args.status or args.stop:
+        try:
+            print(json.dumps(_call(url, "/shutdown" if args.stop else "/status", {} if args.stop else None,
+                                   timeout=5), indent=2))
+        except OSError as e:
+            print(f"✗ No browser daemon at {url}: {e}")
+            sys.exit(1)
+        sys.exit(0)
+
+    warm = [browser.strip() for browser in args.warm.split(",") if browser.strip()]
+    httpd, pool = start_daemon(args.port, warm, recycle_after=args.recycle_after, idle_s=args.idle_timeout)
+    print(f"Browser daemon on {url} (warm: {', '.join(warm) or 'none'}, recycle after {args.recycle_after} "
+          f"contexts, idle timeout {args.idle_timeout} s)")
+    print(f"Use it with: PW_BROWSER_DAEMON={url}")
+    try:
+        while not pool.stopped.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown()
+        httpd.shutdown()
+        httpd.server_close()
+        print("Browser daemon stopped")
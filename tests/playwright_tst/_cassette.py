@@ -0,0 +1,331 @@
+# Record/replay of HTTP traffic for the API client and browser contexts
+#
+# In record mode every exchange made through BookingApiClient (requests) and
+# every request a test browser context lets through routing is written to a
+# cassette: an index of JSON lines plus one file of response bodies, each
+# body stored once (zlib-compressed when that helps). In replay mode the
+# index is loaded into a dict keyed by normalized method, URL and body, and
+# responses are served from memory-mapped bodies without any network.
+# Requests with no recorded exchange are reported with the closest keys.
+#
+# Cassette layout: <dir>/<name>/index-<worker>-<pid>.jsonl and
+# bodies-<worker>-<pid>.bin, one pair per recording process; replay reads
+# all of them.
+
+import difflib
+import glob
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, parse_qsl, urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from _config import CASSETTE_MODE, CASSETTE_NAME, CASSETTE_DIR, CASSETTE_IGNORE, site_base_url, api_base_url
+from _config import worker_id
+
+# Response headers that no longer match once the body is replayed decoded
+DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+# Bodies shorter than this are stored as they are
+COMPRESS_MIN_BYTES = 256
+
+
+class CassetteMismatch(requests.exceptions.ConnectionError):
+    """A replayed request has no recorded exchange"""
+
+
+def _strip_fields(value, ignore):
+    """JSON value without the ignored keys, at any depth"""
+    if isinstance(value, dict):
+        return {k: _strip_fields(v, ignore) for k, v in value.items() if k not in ignore}
+    if isinstance(value, list):
+        return [_strip_fields(v, ignore) for v in value]
+    return value
+
+
+def normalize_url(url, ignore=()):
+    """Target base replaced by {base}, ignored query parameters dropped, the rest sorted"""
+    prefix = None
+    for base in {site_base_url(), api_base_url()}:
+        if url == base or url.startswith((base + "/", base + "?")):
+            prefix, url = "{base}", url[len(base):]
+            break
+    parts = urlsplit(url)
+    if prefix is None:
+        prefix = f"{parts.scheme}://{parts.netloc.lower()}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in ignore)
+    return f"{prefix}{parts.path or '/'}" + (f"?{urlencode(query)}" if query else "")
+
+
+def normalize_body(body, ignore=()):
+    """JSON bodies canonical and without ignored fields, form bodies sorted, anything else as is"""
+    if not body:
+        return b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    try:
+        value = json.loads(body)
+    except ValueError:
+        pass
+    else:
+        return json.dumps(_strip_fields(value, ignore), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    try:
+        text = body.decode("ascii")
+    except UnicodeDecodeError:
+        return body
+    if "=" in text and not any(c.isspace() for c in text):
+        return urlencode(sorted((k, v) for k, v in parse_qsl(text, keep_blank_values=True) if k not in ignore)).encode()
+    return body
+
+
+def request_key(method, url, body=None, ignore=()):
+    """Index key of a request: 'METHOD normalized-url [#body digest]'"""
+    key = f"{method.upper()} {normalize_url(url, ignore)}"
+    body = normalize_body(body, ignore)
+    if body:
+        key += f" #{hashlib.sha256(body).hexdigest()[:16]}"
+    return key
+
+
+class Cassette:
+    """One cassette folder, either being recorded or replayed"""
+
+    def __init__(self, path, mode, ignore=()):
+        self.path = path
+        self.mode = mode
+        self.ignore = set(ignore)
+        self.current_test = None
+        self.recorded = 0
+        self.served = 0
+        self.lookup_us = 0.0
+        self.mismatches = []  # {"test", "source", "key", "closest"}
+        self._lock = threading.Lock()
+        if mode == "record":
+            self._open_for_record()
+        elif mode == "replay":
+            self._load()
+        else:
+            raise ValueError(f"Unknown cassette mode {mode!r} (record or replay)")
+
+    # --- recording ---
+
+    def _open_for_record(self):
+        os.makedirs(self.path, exist_ok=True)
+        worker = f"{worker_id()}-{os.getpid()}"
+        self._index = open(os.path.join(self.path, f"index-{worker}.jsonl"), "w", encoding="utf-8")
+        self._bodies = open(os.path.join(self.path, f"bodies-{worker}.bin"), "wb")
+        self._body_refs = {}  # sha256 -> [offset, length, encoding]
+
+    def _write_body(self, body):
+        digest = hashlib.sha256(body).hexdigest()
+        ref = self._body_refs.get(digest)
+        if ref is None:
+            data, encoding = body, None
+            if len(body) >= COMPRESS_MIN_BYTES:
+                packed = zlib.compress(body, 6)
+                if len(packed) < len(body):
+                    data, encoding = packed, "zlib"
+            ref = [self._bodies.tell(), len(data), encoding]
+            self._bodies.write(data)
+            self._body_refs[digest] = ref
+        return ref
+
+    def record(self, source, method, url, body, status, headers, response_body):
+        """Append one exchange; body is the request body, response_body the decoded response"""
+        key = request_key(method, url, body, self.ignore)
+        headers = {k: v for k, v in headers.items() if k.lower() not in DROP_HEADERS}
+        with self._lock:
+            offset, length, encoding = self._write_body(response_body or b"")
+            self._bodies.flush()
+            self._index.write(json.dumps({
+                "key": key, "source": source, "test": self.current_test, "status": status, "headers": headers,
+                "body": [offset, length, encoding],
+            }) + "\n")
+            self._index.flush()
+            self.recorded += 1
+
+    # --- replay ---
+
+    def _load(self):
+        """Index every recorded exchange by key; several for one key are served in order"""
+        self.index = {}
+        self._maps = {}
+        self._next = {}
+        for index_path in sorted(glob.glob(os.path.join(self.path, "index-*.jsonl"))):
+            worker = os.path.basename(index_path)[len("index-"):-len(".jsonl")]
+            bodies_path = os.path.join(self.path, f"bodies-{worker}.bin")
+            if os.path.getsize(bodies_path):
+                with open(bodies_path, "rb") as f:
+                    self._maps[worker] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(index_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # half-written last line of an interrupted recording
+                    entry["worker"] = worker
+                    self.index.setdefault(entry["key"], []).append(entry)
+        if not self.index:
+            raise FileNotFoundError(f"Cassette {self.path} has no recorded exchanges; record it first")
+
+    def _body(self, entry):
+        offset, length, encoding = entry["body"]
+        data = self._maps[entry["worker"]][offset:offset + length] if length else b""
+        return zlib.decompress(data) if encoding == "zlib" else data
+
+    def lookup(self, source, method, url, body=None):
+        """(status, headers, body) recorded for the request, or None after noting the mismatch"""
+        start = time.perf_counter()
+        key = request_key(method, url, body, self.ignore)
+        with self._lock:
+            entries = self.index.get(key)
+            if entries:
+                # The same request recorded several times is answered in recorded order, the last one repeats
+                position = self._next.get(key, 0)
+                self._next[key] = position + 1
+                entry = entries[min(position, len(entries) - 1)]
+                self.served += 1
+            else:
+                entry = None
+                self.mismatches.append({"test": self.current_test, "source": source, "key": key,
+                                        "closest": self.closest_keys(key)})
+            self.lookup_us += (time.perf_counter() - start) * 1e6
+        if entry is None:
+            return None
+        return entry["status"], entry["headers"], self._body(entry)
+
+    def closest_keys(self, key, count=3):
+        """Recorded keys most like an unmatched one, for the mismatch report"""
+        method = key.split(" ", 1)[0]
+        candidates = [k for k in self.index if k.startswith(method + " ")] or list(self.index)
+        return difflib.get_close_matches(key, candidates, n=count, cutoff=0.0)
+
+    def unused_keys(self):
+        """Recorded requests this replay never asked for"""
+        return [key for key in self.index if key not in self._next]
+
+    # --- integrations ---
+
+    def adapter(self, real_adapter):
+        """requests adapter that records through real_adapter or replays without it"""
+        return CassetteAdapter(self, real_adapter)
+
+    def apply(self, context):
+        """Record or replay every request of a browser context that is not handled by a later route"""
+        context.route("**/*", self._handle_route)
+
+    def _handle_route(self, route, request):
+        if self.mode == "replay":
+            recorded = self.lookup("browser", request.method, request.url, request.post_data_buffer)
+            if recorded is None:
+                route.abort("internetdisconnected")
+                return
+            status, headers, body = recorded
+            route.fulfill(status=status, headers=headers, body=body)
+            return
+        response = route.fetch()
+        body = response.body()
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in DROP_HEADERS}
+        self.record("browser", request.method, request.url, request.post_data_buffer, response.status, headers, body)
+        route.fulfill(status=response.status, headers=headers, body=body)
+
+    # --- reporting ---
+
+    def report_lines(self):
+        """Recorded/served counts and every replay mismatch with the closest recorded keys"""
+        if self.mode == "record":
+            size = sum(os.path.getsize(p) for p in glob.glob(os.path.join(self.path, "*")))
+            return [f"Recorded {self.recorded} exchange(s) to {self.path} ({size / 1024:.0f} KB so far, all workers)"]
+        lookups = self.served + len(self.mismatches)
+        lines = [f"Replayed {self.served} of {lookups} request(s) from {self.path}, "
+                 f"avg lookup {self.lookup_us / max(lookups, 1):.1f} µs"]
+        for mismatch in self.mismatches:
+            lines.append(f"✗ MISMATCH [{mismatch['source']}] {mismatch['key']}  (test: {mismatch['test']})")
+            for key in mismatch["closest"]:
+                lines.append(f"    closest recorded: {key}")
+        unused = self.unused_keys()
+        if unused and self.mismatches:
+            lines.append(f"⚠ {len(unused)} recorded request(s) never asked for, e.g. {unused[0]}")
+        return lines
+
+    def close(self):
+        if self.mode == "record":
+            self._index.close()
+            self._bodies.close()
+        else:
+            for data in self._maps.values():
+                data.close()
+
+
+class CassetteAdapter(HTTPAdapter):
+    """Transport adapter in front of the client's real one"""
+
+    def __init__(self, cassette, real_adapter):
+        super().__init__()
+        self.cassette = cassette
+        self.real_adapter = real_adapter
+
+    def send(self, request, **kwargs):
+        cassette = self.cassette
+        if cassette.mode == "record":
+            response = self.real_adapter.send(request, **kwargs)
+            cassette.record("api", request.method, request.url, request.body, response.status_code,
+                            dict(response.headers), response.content)
+            return response
+
+        recorded = cassette.lookup("api", request.method, request.url, request.body)
+        if recorded is None:
+            mismatch = cassette.mismatches[-1]
+            raise CassetteMismatch(f"No recorded exchange for {mismatch['key']} in {cassette.path}; "
+                                   f"closest: {', '.join(mismatch['closest']) or 'none'}", request=request)
+        status, headers, body = recorded
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        return response
+
+    def close(self):
+        self.real_adapter.close()
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """Process-wide cassette from PW_CASSETTE_MODE/PW_CASSETTE, or None when off"""
+    global _cassette
+    if CASSETTE_MODE not in ("record", "replay"):
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(cassette_path(), CASSETTE_MODE, CASSETTE_IGNORE)
+        return _cassette
+
+
+def cassette_path():
+    """Folder of the configured cassette"""
+    return os.path.join(CASSETTE_DIR, CASSETTE_NAME)
+
+
+def reset_cassette():
+    """Remove an earlier recording before a run records the cassette again (call once per run)"""
+    if CASSETTE_MODE == "record" and os.path.isdir(cassette_path()):
+        shutil.rmtree(cassette_path())
+
+
+def cassette_in_use():
+    """True once the cassette has been opened"""
+    return _cassette is not None
@@ -0,0 +1,136 @@
+# Shared settings for the test suite, read from environment variables
+
+import os
+
+
+def env_flag(name, default=False):
+    """Read a true/false setting from the environment"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name, default):
+    """Read an integer setting from the environment"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+
+def worker_id():
+    """Name of the pytest-xdist worker ("gw0", "gw1", ...), or "main" when not parallel"""
+    return os.environ.get("PYTEST_XDIST_WORKER", "main")
+
+
+def worker_index():
+    """Number of the pytest-xdist worker, 0 when not parallel"""
+    name = worker_id()
+    return int(name[2:]) if name.startswith("gw") else 0
+
+
+def env_list(name, default=""):
+    """Read a comma-separated list from the environment"""
+    value = os.environ.get(name, default)
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def run_id():
+    """Id shared by every process of one test run (set by conftest on start-up)"""
+    return os.environ.get("PW_RUN_ID", "adhoc")
+
+
+# Repository log folder for traces, baselines and history
+LOG_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "log"))
+
+# CI runs headless with no artificial delay unless told otherwise
+RUNNING_IN_CI = env_flag("CI")
+
+# Browser settings
+BROWSER_NAME = os.environ.get("PW_BROWSER", "firefox")
+HEADLESS = env_flag("PW_HEADLESS", default=RUNNING_IN_CI)
+SLOW_MO = env_int("PW_SLOW_MO", 0 if RUNNING_IN_CI else 1000)
+VIEWPORT = {"width": 1920, "height": 1080}
+
+# Upper bounds (ms) for the event-driven waits in _waits.py
+NAVIGATION_TIMEOUT_MS = env_int("PW_NAVIGATION_TIMEOUT_MS", 15000)
+FORM_TIMEOUT_MS = env_int("PW_FORM_TIMEOUT_MS", 10000)
+SUBMIT_TIMEOUT_MS = env_int("PW_SUBMIT_TIMEOUT_MS", 10000)
+ASSERT_TIMEOUT_MS = env_int("PW_ASSERT_TIMEOUT_MS", 10000)
+# Also wait for the network to go idle after opening a page (slow on pages that keep polling)
+WAIT_FOR_NETWORK_IDLE = env_flag("PW_WAIT_NETWORK_IDLE", default=False)
+
+# Days of booking calendar reserved for each parallel worker
+WORKER_DATE_STRIDE = env_int("PW_WORKER_DATE_STRIDE", 60)
+
+# Targets under test; read at call time so the stand-in server can redirect them
+def site_base_url():
+    """Booking site base URL (BOOKING_SITE_URL overrides the public demo)"""
+    return os.environ.get("BOOKING_SITE_URL", "https://automationintesting.online").rstrip("/")
+
+
+def api_base_url():
+    """restful-booker base URL (BOOKING_API_URL overrides the public Heroku host)"""
+    return os.environ.get("BOOKING_API_URL", "https://restful-booker.herokuapp.com").rstrip("/")
+
+
+# Start the local stand-in (_stand_in_server.py) for the run and point both URLs at it
+USE_STAND_IN = env_flag("BOOKING_STAND_IN")
+
+# restful-booker API
+API_USERNAME = os.environ.get("BOOKING_API_USER", "admin")
+API_PASSWORD = os.environ.get("BOOKING_API_PASSWORD", "password123")
+API_TOKEN_TTL_S = env_int("BOOKING_API_TOKEN_TTL_S", 600)
+API_RETRIES = env_int("BOOKING_API_RETRIES", 3)
+
+# Bookings created at session start for tests marked bookings(n) (_booking_pool.py)
+BOOKING_POOL_CONCURRENCY = env_int("BOOKING_POOL_CONCURRENCY", 8)
+
+# Form-ready page cache (_page_cache.py); size 0 turns it off
+FORM_CACHE_SIZE = env_int("PW_FORM_CACHE_SIZE", 1)
+FORM_CACHE_MAX_AGE_S = env_int("PW_FORM_CACHE_MAX_AGE_S", 300)
+
+# Request routing profile for test contexts (_routing.py)
+ROUTING_ENABLED = env_flag("PW_ROUTING", default=True)
+BLOCKED_RESOURCE_TYPES = env_list("PW_BLOCK_TYPES", "image,media,font")
+BLOCKED_URL_PATTERNS = env_list(
+    "PW_BLOCK_URLS",
+    "*google-analytics.com/*,*googletagmanager.com/*,*doubleclick.net/*,*fonts.googleapis.com/*,*fonts.gstatic.com/*"
+)
+ASSET_CACHE_DIR = os.environ.get("PW_ASSET_CACHE_DIR") or None
+ASSET_CACHE_MAX_AGE_S = env_int("PW_ASSET_CACHE_MAX_AGE_S", 86400)  # then revalidated or fetched again
+
+# Span trace written by _timing.py, one JSON line per span
+TRACE_FILE = os.environ.get("PW_TRACE_FILE") or os.path.join(LOG_DIR, "spans.jsonl")
+
+# Per-test durations and outcomes used to order and pack later runs (_run_history.py)
+RUN_HISTORY_FILE = os.environ.get("PW_RUN_HISTORY") or os.path.join(LOG_DIR, "run_history.json")
+
+# Streamed results (one folder per run id) and the shared content-addressed artifact store
+RESULTS_DIR = os.environ.get("PW_RESULTS_DIR") or os.path.join(LOG_DIR, "results")
+ARTIFACT_DIR = os.environ.get("PW_ARTIFACT_DIR") or os.path.join(LOG_DIR, "artifacts")
+
+# Record/replay of API and browser traffic (_cassette.py): PW_CASSETTE_MODE is off, record or replay.
+# Ignored fields are left out of the request match (JSON body keys and query parameters).
+CASSETTE_MODE = os.environ.get("PW_CASSETTE_MODE", "off").strip().lower()
+CASSETTE_NAME = os.environ.get("PW_CASSETTE", "default")
+CASSETTE_DIR = os.environ.get("PW_CASSETTE_DIR") or os.path.join(LOG_DIR, "cassettes")
+CASSETTE_IGNORE = env_list("PW_CASSETTE_IGNORE", "checkin,checkout,phone,additionalneeds")
+
+# Warm browser servers shared across runs (_browser_daemon.py); PW_BROWSER_DAEMON is its URL
+BROWSER_DAEMON_URL = os.environ.get("PW_BROWSER_DAEMON") or None
+DAEMON_PORT = env_int("PW_DAEMON_PORT", 9323)
+DAEMON_WARM = env_list("PW_DAEMON_WARM", "firefox")
+DAEMON_RECYCLE_AFTER = env_int("PW_DAEMON_RECYCLE_AFTER", 50)  # contexts per browser server
+DAEMON_IDLE_S = env_int("PW_DAEMON_IDLE_S", 600)
+DAEMON_CLIENTS_PER_SERVER = env_int("PW_DAEMON_CLIENTS_PER_SERVER", 4)
+DAEMON_LAUNCH_TIMEOUT_S = env_int("PW_DAEMON_LAUNCH_TIMEOUT_S", 60)
+
+# Failure-only capture: trace, browser log ring buffer and screenshot (_failure_capture.py)
+CAPTURE_ENABLED = env_flag("PW_CAPTURE", default=True)
+CAPTURE_TRACE = env_flag("PW_CAPTURE_TRACE", default=True)
+CAPTURE_TRACE_STEPS = env_int("PW_CAPTURE_TRACE_STEPS", 2)
+CAPTURE_MAX_EVENTS = env_int("PW_CAPTURE_MAX_EVENTS", 500)
+CAPTURE_MAX_BUFFER_KB = env_int("PW_CAPTURE_MAX_BUFFER_KB", 256)
+CAPTURE_MAX_DISK_MB = env_int("PW_CAPTURE_MAX_DISK_MB", 200)
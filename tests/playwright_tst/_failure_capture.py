@@ -0,0 +1,187 @@
+# Failure-only capture of trace, browser log and screenshot
+#
+# Every test context records a Playwright trace and keeps its console
+# messages, page errors and network responses in a ring buffer bounded by
+# entry count and bytes. The trace is cut into one chunk per test step
+# (navigate, fill, submit, assert) and only the last few chunks are kept,
+# so a long test does not grow one trace without limit. When the test
+# fails, the kept chunks, the buffered log and a screenshot go to the
+# artifact store, within a disk budget for the whole session. Passing tests
+# throw the chunks away. The time spent in capture calls is kept per test.
+
+import json
+import os
+import tempfile
+import time
+from collections import deque
+
+
+def _temp_zip():
+    fd, path = tempfile.mkstemp(suffix=".zip")
+    os.close(fd)
+    return path
+
+
+class ContextCapture:
+    """Trace chunks and bounded browser log of one browser context"""
+
+    def __init__(self, context, max_events, max_buffer_bytes, trace, trace_steps=2):
+        self.context = context
+        self.max_buffer_bytes = max_buffer_bytes
+        self.events = deque(maxlen=max_events)
+        self.buffer_bytes = 0
+        self.dropped = 0
+        self.overhead_ms = 0.0
+        self.origin = time.perf_counter()
+        self.tracing = trace
+        self.trace_steps = max(trace_steps, 1)
+        self.step_name = "setup"
+        self.chunks = deque()  # (step name, zip path) of finished steps kept for a failure
+
+        start = time.perf_counter()
+        if trace:
+            context.tracing.start(screenshots=True, snapshots=True, title=self.step_name)
+        context.on("console", lambda message: self._add({
+            "type": "console", "level": message.type, "text": message.text[:2000]}))
+        context.on("weberror", lambda error: self._add({"type": "pageerror", "text": str(error.error)[:2000]}))
+        context.on("response", lambda response: self._add({
+            "type": "response", "status": response.status, "method": response.request.method,
+            "url": response.url[:500]}))
+        context.on("requestfailed", lambda request: self._add({
+            "type": "requestfailed", "method": request.method, "url": request.url[:500],
+            "failure": request.failure}))
+        self.overhead_ms += (time.perf_counter() - start) * 1000
+
+    def _add(self, event):
+        start = time.perf_counter()
+        event["t_ms"] = round((start - self.origin) * 1000, 1)
+        line = json.dumps(event)
+        if len(self.events) == self.events.maxlen:
+            self.buffer_bytes -= len(self.events[0][1])
+            self.dropped += 1
+        self.events.append((event, line))
+        self.buffer_bytes += len(line)
+        # Oldest entries go first once the byte budget is used up
+        while self.buffer_bytes > self.max_buffer_bytes and len(self.events) > 1:
+            self.buffer_bytes -= len(self.events.popleft()[1])
+            self.dropped += 1
+        self.overhead_ms += (time.perf_counter() - start) * 1000
+
+    def step(self, name):
+        """Close the current trace chunk and start one for the next step; keeps the last trace_steps"""
+        if not self.tracing:
+            return
+        start = time.perf_counter()
+        if self.trace_steps > 1:
+            path = _temp_zip()
+            self.context.tracing.stop_chunk(path=path)
+            self.chunks.append((self.step_name, path))
+            while len(self.chunks) > self.trace_steps - 1:
+                os.remove(self.chunks.popleft()[1])
+        else:
+            self.context.tracing.stop_chunk()
+        self.context.tracing.start_chunk(title=name)
+        self.step_name = name
+        self.overhead_ms += (time.perf_counter() - start) * 1000
+
+    def stop_trace(self, keep):
+        """Stop tracing; with keep, (step name, zip path) of the kept chunks, the current one last"""
+        if keep:
+            path = _temp_zip()
+            self.context.tracing.stop_chunk(path=path)
+            self.chunks.append((self.step_name, path))
+        self.context.tracing.stop()
+        kept = list(self.chunks) if keep else []
+        if not keep:
+            for _, path in self.chunks:
+                os.remove(path)
+        self.chunks.clear()
+        return kept
+
+    def log_bytes(self):
+        """Buffered events as JSONL"""
+        return "".join(line + "\n" for _, line in self.events).encode("utf-8")
+
+
+class FailureCapture:
+    """Attaches a ContextCapture to every test context and writes it out on failure"""
+
+    def __init__(self, store, max_events=500, max_buffer_kb=256, max_disk_mb=200, trace=True, trace_steps=2):
+        self.store = store
+        self.max_events = max_events
+        self.max_buffer_bytes = max_buffer_kb * 1024
+        self.max_disk_bytes = max_disk_mb * 1024 * 1024
+        self.trace = trace
+        self.trace_steps = trace_steps
+        self.disk_bytes = 0
+        self.captures = {}   # id(context) -> ContextCapture
+        self.per_test = {}   # test -> {"overhead_ms", "written_bytes", "skipped"}
+
+    def attach(self, context):
+        """Start tracing and buffering for a new context"""
+        self.captures[id(context)] = ContextCapture(context, self.max_events, self.max_buffer_bytes, self.trace,
+                                                    self.trace_steps)
+
+    def step(self, page, name):
+        """Start a new trace chunk for the page's context"""
+        capture = self.captures.get(id(page.context))
+        if capture is not None:
+            capture.step(name)
+
+    def _store(self, data_or_path, name, content_type, skipped):
+        """Store bytes or a file if the disk budget allows; returns a reference or None"""
+        size = os.path.getsize(data_or_path) if isinstance(data_or_path, str) else len(data_or_path)
+        if self.disk_bytes + size > self.max_disk_bytes:
+            skipped.append(f"{name} ({size / 1024:.0f} KB, disk cap)")
+            if isinstance(data_or_path, str):
+                os.remove(data_or_path)
+            return None
+        self.disk_bytes += size
+        if isinstance(data_or_path, str):
+            return self.store.put_file(data_or_path, name, content_type, move=True)
+        return self.store.put_bytes(data_or_path, name, content_type)
+
+    def finish(self, page, test, failed):
+        """
+        Stop capturing for the page's context before it closes
+
+        Returns artifact references (empty unless the test failed) and the
+        capture overhead the test paid in ms.
+        """
+        capture = self.captures.pop(id(page.context), None)
+        if capture is None:
+            return [], 0.0
+        start = time.perf_counter()
+        refs, skipped = [], []
+        if failed:
+            if not page.is_closed():
+                try:
+                    refs.append(self._store(page.screenshot(full_page=True), "failure.png", "image/png", skipped))
+                except Exception as e:  # page crashed or navigating
+                    skipped.append(f"screenshot ({e.__class__.__name__})")
+            refs.append(self._store(capture.log_bytes(), "browser-log.jsonl", "application/x-ndjson", skipped))
+        if capture.tracing:
+            chunks = capture.stop_trace(keep=failed)
+            for number, (step_name, trace_path) in enumerate(chunks, 1):
+                refs.append(self._store(trace_path, f"trace-{number}-{step_name}.zip", "application/zip", skipped))
+        overhead_ms = capture.overhead_ms + (time.perf_counter() - start) * 1000
+
+        refs = [ref for ref in refs if ref]
+        self.per_test[test] = {
+            "overhead_ms": round(overhead_ms, 1),
+            "written_bytes": sum(ref["size"] for ref in refs),
+            "dropped_events": capture.dropped,
+            "skipped": skipped,
+        }
+        return refs, overhead_ms
+
+    def report_lines(self):
+        """Per-test capture overhead and what was written for failures"""
+        lines = [f"{'TEST':<60} {'OVERHEAD ms':>11} {'WRITTEN KB':>10} {'DROPPED':>7}"]
+        for test, stats in self.per_test.items():
+            note = f"  (skipped: {', '.join(stats['skipped'])})" if stats["skipped"] else ""
+            lines.append(f"{(test or '<outside test>')[-60:]:<60} {stats['overhead_ms']:>11.0f} "
+                         f"{stats['written_bytes'] / 1024:>10.0f} {stats['dropped_events']:>7}{note}")
+        lines.append(f"Disk used by failure capture: {self.disk_bytes / 1024:.0f} KB "
+                     f"of {self.max_disk_bytes / 1024 / 1024:.0f} MB")
+        return lines
@@ -1,6 +1,85 @@
 # Page analyzer for UI automation
+#
+# Interactive:  python _page_analyzer.py
+# Batch:        python _page_analyzer.py --batch / /reservation/1 --click "Reserve Now" --out log/selectors
+# Diff:         python _page_analyzer.py --diff log/selectors_old log/selectors
+#
+# With PW_BROWSER_DAEMON set, both modes borrow a warm browser from _browser_daemon.py.
 
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+from urllib.parse import urlsplit
 from playwright.sync_api import sync_playwright
+from _browser_daemon import connect_browser, connect_browser_async
+from _config import BROWSER_NAME, BROWSER_DAEMON_URL, LOG_DIR, VIEWPORT, site_base_url
+
+# Runs inside the page and returns every interactive element in one round-trip:
+# attributes, visibility and a suggested stable selector
+EXTRACT_ELEMENTS_JS = """
+() => {
+  const KINDS = {BUTTON: "button", INPUT: "input", SELECT: "select", TEXTAREA: "textarea", A: "link"};
+  const nodes = Array.from(document.querySelectorAll(
+    "button, input, select, textarea, a[href], [role='button']"));
+  const esc = (value) => (window.CSS && CSS.escape) ? CSS.escape(value) : value.replace(/["\\\\]/g, "\\\\$&");
+  const count = (selector) => { try { return document.querySelectorAll(selector).length; } catch (e) { return 0; } };
+  const isVisible = (el) => {
+    const style = getComputedStyle(el);
+    const rect = el.getBoundingClientRect();
+    return style.visibility !== "hidden" && style.display !== "none" && rect.width > 0 && rect.height > 0;
+  };
+  const cssPath = (el) => {
+    const parts = [];
+    while (el && el.nodeType === 1 && el !== document.documentElement) {
+      if (el.id && count("#" + esc(el.id)) === 1) { parts.unshift("#" + esc(el.id)); break; }
+      const tag = el.tagName.toLowerCase();
+      const siblings = el.parentElement ? Array.from(el.parentElement.children).filter((s) => s.tagName === el.tagName) : [];
+      parts.unshift(siblings.length > 1 ? `${tag}:nth-of-type(${siblings.indexOf(el) + 1})` : tag);
+      el = el.parentElement;
+    }
+    return parts.join(" > ");
+  };
+  const suggest = (el, tag, text) => {
+    const testId = el.getAttribute("data-testid");
+    if (testId && count(`[data-testid="${esc(testId)}"]`) === 1) return `[data-testid='${testId}']`;
+    if (el.id && count("#" + esc(el.id)) === 1) return "#" + esc(el.id);
+    const name = el.getAttribute("name");
+    if (name && count(`${tag}[name="${esc(name)}"]`) === 1) return `${tag}[name='${name}']`;
+    if (text && text.length <= 40 && !text.includes("'")) {
+      const needle = text.toLowerCase();
+      const same = Array.from(document.querySelectorAll(tag))
+        .filter((other) => (other.textContent || "").toLowerCase().includes(needle));
+      if (same.length === 1) return `${tag}:has-text('${text}')`;
+    }
+    return cssPath(el);
+  };
+  return nodes.map((el) => {
+    const tag = el.tagName.toLowerCase();
+    const text = (el.textContent || "").trim().replace(/\\s+/g, " ");
+    return {
+      kind: KINDS[el.tagName] || "button",
+      tag: tag,
+      text: text.slice(0, 80),
+      type: el.getAttribute("type") || (tag === "input" ? "text" : ""),
+      id: el.id || "",
+      name: el.getAttribute("name") || "",
+      class: el.getAttribute("class") || "",
+      placeholder: el.getAttribute("placeholder") || "",
+      href: el.getAttribute("href") || "",
+      visible: isVisible(el),
+      selector: suggest(el, tag, text),
+    };
+  });
+}
+"""
+
+
+def extract_elements(page):
+    """All interactive elements of the page from a single in-page evaluation"""
+    return page.evaluate(EXTRACT_ELEMENTS_JS)
 
 
 def analyze_page(page):
@@ -8,67 +87,57 @@ def analyze_page(page):
     print(f"\n{'='*60}")
     print(f"URL: {page.url}")
     print("="*60)
-    
+
+    elements = extract_elements(page)
+
     # Show buttons
-    buttons = page.locator("button").all()
+    buttons = [e for e in elements if e["kind"] == "button"]
     if buttons:
         print(f"\nBUTTONS ({len(buttons)}):")
         for i, btn in enumerate(buttons):
-            try:
-                text = btn.text_content().strip() or "No text"
-                visible = btn.is_visible()
-                btn_id = btn.get_attribute("id") or ""
-                btn_class = btn.get_attribute("class") or ""
-                
-                print(f"  {i}: '{text}' (visible={visible})")
-                if btn_id: print(f"id='{btn_id}'")
-                if btn_class: print(f"class='{btn_class[:50]}...'")
-            except:
-                print(f"  {i}: Error reading button")
-    
+            print(f"  {i}: '{btn['text'] or 'No text'}' (visible={btn['visible']})")
+            if btn["id"]: print(f"id='{btn['id']}'")
+            if btn["class"]: print(f"class='{btn['class'][:50]}...'")
+            print(f"selector: {btn['selector']}")
+
     # Show inputs
-    inputs = page.locator("input").all()
+    inputs = [e for e in elements if e["kind"] == "input"]
     if inputs:
         print(f"\nINPUTS ({len(inputs)}):")
         for i, inp in enumerate(inputs):
-            try:
-                input_type = inp.get_attribute("type") or "text"
-                placeholder = inp.get_attribute("placeholder") or ""
-                name = inp.get_attribute("name") or ""
-                input_id = inp.get_attribute("id") or ""
-                visible = inp.is_visible()
-                
-                print(f"  {i}: type='{input_type}' (visible={visible})")
-                if placeholder: print(f"placeholder='{placeholder}'")
-                if name: print(f"name='{name}'")
-                if input_id: print(f"id='{input_id}'")
-            except:
-                print(f"  {i}: Error reading input")
+            print(f"  {i}: type='{inp['type']}' (visible={inp['visible']})")
+            if inp["placeholder"]: print(f"placeholder='{inp['placeholder']}'")
+            if inp["name"]: print(f"name='{inp['name']}'")
+            if inp["id"]: print(f"id='{inp['id']}'")
+            print(f"selector: {inp['selector']}")
 
 
 def run_analyzer():
     """Run page analyzer"""
     with sync_playwright() as p:
-        browser = p.firefox.launch(headless=False, slow_mo=1000)
+        # A warm headed browser from the daemon when PW_BROWSER_DAEMON is set
+        browser, lease = connect_browser(p.firefox, BROWSER_DAEMON_URL, headless=False, slow_mo=1000)
+        if browser is None:
+            browser = p.firefox.launch(headless=False, slow_mo=1000)
         page = browser.new_page()
-        
+
         print("PAGE ANALYZER")
-        
+
         # Start at booking site
-        page.goto("https://automationintesting.online")
+        page.goto(site_base_url())
         analyze_page(page)
-        
+
         while True:
             print(f"\nOPTIONS:")
             print("1. Analyze current page")
             print("2. Go to URL")
             print("3. Exit")
-            
+
             choice = input("\nEnter choice: ").strip()
-            
+
             if choice == "1":
                 analyze_page(page)
-                
+
             elif choice == "2":
                 url = input("Enter URL: ").strip()
                 try:
@@ -77,15 +146,182 @@ def run_analyzer():
                     print(f"Navigated to: {page.url}")
                 except Exception as e:
                     print(f"Error: {e}")
-                    
+
             elif choice == "3":
                 break
-                
+
             else:
                 print("Invalid choice")
-        
+
         browser.close()
+        if lease:
+            lease.release(1)
+
+
+# --- non-interactive batch mode ---
+
+def page_key(url, base_url=None):
+    """
+    Path and query of a URL relative to the crawl base URL
+
+    Inventories are named and diffed by this key, so runs against different
+    hosts or ports (local stand-in, staging) compare page by page.
+    """
+    base = (base_url or "").rstrip("/")
+    if base and url.startswith(base) and url[len(base):][:1] in ("", "/", "?", "#"):
+        rest = url[len(base):].split("#")[0]
+    else:
+        parts = urlsplit(url)
+        rest = parts.path + (f"?{parts.query}" if parts.query else "")
+    return rest if rest.startswith("/") else f"/{rest}"
+
+
+def inventory_filename(page):
+    """Stable file name for a page key's inventory"""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", page).strip("_")
+    return f"{slug or 'root'}.json"
+
+
+def build_inventory(url, elements, page=None):
+    """Diffable selector inventory: sorted, no timestamps or positions"""
+    entries = sorted(elements, key=lambda e: (e["kind"], e["selector"], e["text"]))
+    return {"page": page or page_key(url), "url": url, "elements": entries}
+
+
+async def _analyze_url(browser, url, click_text, timeout_ms):
+    context = await browser.new_context(viewport=VIEWPORT)
+    try:
+        page = await context.new_page()
+        await page.goto(url, wait_until="networkidle", timeout=timeout_ms)
+        if click_text:
+            button = page.locator(f"button:has-text('{click_text}')").first
+            if await button.count():
+                await button.click()
+                await page.wait_for_load_state("networkidle", timeout=timeout_ms)
+        return await page.evaluate(EXTRACT_ELEMENTS_JS)
+    finally:
+        await context.close()
+
+
+async def crawl(urls, out_dir, concurrency=4, click_text=None, timeout_ms=15000, base_url=None):
+    """
+    Analyze many URLs concurrently in one headless browser and write JSON inventories
+
+    Inventories are keyed on each URL's path and query relative to base_url
+    (default: the site base URL).
+
+    A URL that fails loses any inventory an earlier run left in out_dir, so a
+    later diff shows the page as gone instead of comparing stale selectors.
+    Returns (written paths, failed URLs).
+    """
+    from playwright.async_api import async_playwright
+
+    os.makedirs(out_dir, exist_ok=True)
+    semaphore = asyncio.Semaphore(concurrency)
+    written, failed = [], []
+
+    async with async_playwright() as p:
+        browser_type = getattr(p, BROWSER_NAME)
+        browser, lease = await connect_browser_async(browser_type, BROWSER_DAEMON_URL, headless=True)
+        if browser is None:
+            browser = await browser_type.launch(headless=True)
+
+        async def one(url):
+            page = page_key(url, base_url or site_base_url())
+            path = os.path.join(out_dir, inventory_filename(page))
+            async with semaphore:
+                try:
+                    elements = await _analyze_url(browser, url, click_text, timeout_ms)
+                except Exception as e:
+                    failed.append(url)
+                    stale = os.path.exists(path)
+                    if stale:
+                        os.remove(path)
+                    print(f"✗ {url}: {e}" + (f" (removed old {path})" if stale else ""))
+                    return
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(build_inventory(url, elements, page), f, indent=2, sort_keys=True)
+                f.write("\n")
+            print(f"✓ {url}: {len(elements)} elements -> {path}")
+            written.append(path)
+
+        await asyncio.gather(*(one(url) for url in urls))
+        await browser.close()
+        if lease:
+            await asyncio.to_thread(lease.release, len(urls))
+    return written, failed
+
+
+def _load_inventories(path):
+    """page key -> inventory for a folder of inventories or a single file"""
+    files = [path] if os.path.isfile(path) else [
+        os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".json")]
+    inventories = {}
+    for file_path in files:
+        with open(file_path, encoding="utf-8") as f:
+            inventory = json.load(f)
+        # Inventories written before page keys existed only have the full URL
+        inventories[inventory.get("page") or page_key(inventory["url"])] = inventory
+    return inventories
+
+
+def diff_inventories(old_path, new_path):
+    """Print selector drift between two inventory sets; returns the number of changes"""
+    old, new = _load_inventories(old_path), _load_inventories(new_path)
+    changes = 0
+    for url in sorted(set(old) | set(new)):
+        if url not in new:
+            print(f"- page gone: {url}")
+            changes += 1
+            continue
+        if url not in old:
+            print(f"+ new page: {url}")
+            changes += 1
+            continue
+        before = {e["selector"]: e for e in old[url]["elements"]}
+        after = {e["selector"]: e for e in new[url]["elements"]}
+        lines = []
+        for selector in sorted(set(before) - set(after)):
+            lines.append(f"  - {selector} ('{before[selector]['text']}')")
+        for selector in sorted(set(after) - set(before)):
+            lines.append(f"  + {selector} ('{after[selector]['text']}')")
+        for selector in sorted(set(before) & set(after)):
+            changed = [k for k in before[selector] if before[selector][k] != after[selector].get(k)]
+            if changed:
+                details = ", ".join(f"{k}: {before[selector][k]!r} -> {after[selector].get(k)!r}" for k in changed)
+                lines.append(f"  ~ {selector} ({details})")
+        if lines:
+            print(url)
+            print("\n".join(lines))
+            changes += len(lines)
+    print(f"{changes} selector change(s)" if changes else "✓ No selector drift")
+    return changes
+
+
+def parse_args():
+    """Command line options; no options starts the interactive analyzer"""
+    parser = argparse.ArgumentParser(description="Discover selectors on the booking site")
+    parser.add_argument("--batch", nargs="+", metavar="URL",
+                        help="Analyze these URLs headless (paths are relative to the site base URL)")
+    parser.add_argument("--out", default=os.path.join(LOG_DIR, "selectors"),
+                        help="Folder for the JSON inventories (default: log/selectors)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Pages analyzed at once (default: 4)")
+    parser.add_argument("--click", metavar="TEXT", help="Click the button with this text before analyzing")
+    parser.add_argument("--compare-to", metavar="DIR", help="After a batch, diff against these inventories")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="Diff two inventory folders or files")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    run_analyzer()
\ No newline at end of file
+    args = parse_args()
+    if args.diff:
+        sys.exit(1 if diff_inventories(*args.diff) else 0)
+    elif args.batch:
+        urls = [url if url.startswith("http") else f"{site_base_url()}{url}" for url in args.batch]
+        written, failed = asyncio.run(crawl(urls, args.out, args.concurrency, args.click))
+        changes = diff_inventories(args.compare_to, args.out) if args.compare_to else 0
+        if failed:
+            print(f"✗ {len(failed)} of {len(urls)} page(s) could not be analyzed")
+        sys.exit(1 if failed or changes else 0)
+    else:
+        run_analyzer()
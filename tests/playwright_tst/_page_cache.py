@@ -0,0 +1,145 @@
+# Cache of pages already sitting on the revealed booking form
+#
+# The site's storage state is captured once per session, then a small pool
+# of pages is pre-warmed (goto reservation page + Reserve Now) between tests.
+# custom_page hands a ready page to the next test and navigate_to_booking_page
+# skips straight to the form when it gets one for the same room/date strategy.
+#
+# The warm-up runs in the previous test's teardown, so in a serial run it is
+# still on the wall clock: the report sets the navigation skipped against the
+# warm-up time spent instead of calling the skipped part "saved".
+
+import time
+from collections import deque
+from datetime import date
+
+
+class FormPageEntry:
+    """One pre-warmed page and what it was prepared for"""
+
+    def __init__(self, page, key, dates, warm_ms):
+        self.page = page
+        self.key = key          # (room_type, check_api)
+        self.dates = dates      # (checkin, checkout) strings
+        self.warm_ms = warm_ms  # time the goto + Reserve Now took
+        self.created = time.monotonic()
+        self.errors = []
+        page.on("pageerror", lambda error: self.errors.append(str(error)))
+
+    def stale_reason(self, max_age_s):
+        """Why this entry can no longer be used, or None when it is still good"""
+        if self.page.is_closed():
+            return "page closed"
+        if self.errors:
+            return f"page error: {self.errors[0][:60]}"
+        if self.dates[0] <= date.today().isoformat():
+            return "check-in date has passed"
+        if time.monotonic() - self.created > max_age_s:
+            return "too old"
+        return None
+
+
+class FormPageCache:
+    """Small pool of form-ready pages with hit/miss accounting"""
+
+    def __init__(self, size=1, max_age_s=300):
+        self.size = size
+        self.max_age_s = max_age_s
+        self.storage_state = None
+        self.pool = deque()
+        self.handed_out = {}      # id(page) -> entry given to a test
+        self.last_key = (1, False)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.skipped_ms = {}      # test -> ms of navigation skipped
+        self.warmups = 0
+        self.warm_spent_ms = 0.0  # every warm-up, used or not, context creation included
+
+    def acquire(self):
+        """Ready page for the next test, or None when the pool has nothing fresh"""
+        while self.pool:
+            entry = self.pool.popleft()
+            reason = entry.stale_reason(self.max_age_s)
+            if reason is None:
+                self.handed_out[id(entry.page)] = entry
+                return entry.page
+            self._evict(entry, reason)
+        return None
+
+    def claim(self, page, key, test=None):
+        """
+        Entry for a page handed out ready for `key`, counting a hit or a miss
+
+        A ready page that went stale or was warmed for another key is a miss
+        and the caller navigates it as usual.
+        """
+        self.last_key = key
+        entry = self.handed_out.pop(id(page), None)
+        if entry is not None and entry.key == key and entry.stale_reason(self.max_age_s) is None:
+            self.hits += 1
+            self.skipped_ms[test] = self.skipped_ms.get(test, 0) + entry.warm_ms
+            return entry
+        if entry is not None:
+            self.evictions += 1
+        self.misses += 1
+        return None
+
+    def release(self, page):
+        """Forget a page when its test is done"""
+        self.handed_out.pop(id(page), None)
+
+    def refill(self, new_context, prepare):
+        """
+        Warm pages until the pool is full
+
+        new_context(storage_state) returns a fresh context; prepare(page, key)
+        opens the booking form and returns the (checkin, checkout) it used.
+        """
+        while self.size > 0 and len(self.pool) < self.size:
+            spent_start = time.perf_counter()
+            context = new_context(self.storage_state)
+            page = context.new_page()
+            start = time.perf_counter()
+            try:
+                dates = prepare(page, self.last_key)
+            except Exception as e:
+                print(f"⚠ Could not warm a booking form page ({e})")
+                context.close()
+                return
+            finally:
+                self.warmups += 1
+                self.warm_spent_ms += (time.perf_counter() - spent_start) * 1000
+            warm_ms = (time.perf_counter() - start) * 1000
+            if self.storage_state is None:
+                self.storage_state = context.storage_state()
+            self.pool.append(FormPageEntry(page, self.last_key, dates, warm_ms))
+
+    def clear(self):
+        """Close every pooled page"""
+        while self.pool:
+            entry = self.pool.popleft()
+            if not entry.page.is_closed():
+                entry.page.context.close()
+        self.handed_out.clear()
+
+    def _evict(self, entry, reason):
+        self.evictions += 1
+        print(f"Evicting cached booking form page ({reason})")
+        if not entry.page.is_closed():
+            entry.page.context.close()
+
+    def report_lines(self):
+        """Hit/miss rates, navigation skipped per test and the net wall-clock change"""
+        lookups = self.hits + self.misses
+        rate = (self.hits / lookups * 100) if lookups else 0.0
+        lines = [f"Hits: {self.hits}  Misses: {self.misses}  Hit rate: {rate:.0f}%  Evictions: {self.evictions}"]
+        for test, skipped in self.skipped_ms.items():
+            lines.append(f"  {(test or '<outside test>')[-60:]:<60} skipped {skipped:>8.0f} ms")
+        skipped = sum(self.skipped_ms.values())
+        net = self.warm_spent_ms - skipped
+        lines.append(f"Navigation skipped in tests: {skipped:.0f} ms")
+        lines.append(f"Warm-up between tests: {self.warm_spent_ms:.0f} ms for {self.warmups} page(s), "
+                     f"run in test teardown")
+        lines.append(f"Net wall-clock change: {net:+.0f} ms ({'slower' if net > 0 else 'faster'} than no cache)")
+        return lines
@@ -0,0 +1,158 @@
+# Streaming test results and a content-addressed artifact store
+#
+# Each finished test is appended to results.jsonl and junit.xml right away,
+# so a run that dies halfway still leaves every result up to that point.
+# junit.xml is closed after every test case and reopened before the next,
+# so it is valid XML at any moment. Artifacts (screenshots, traces, logs)
+# are stored once under their sha256, however many tests or runs attach
+# the same bytes; results only keep a reference.
+
+import hashlib
+import json
+import os
+import shutil
+import socket
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+# Longest failure text kept per test; the full text stays in the terminal output
+MAX_LONGREPR_CHARS = 20000
+
+JUNIT_CLOSE = "</testsuite>\n</testsuites>\n"
+
+
+class ArtifactStore:
+    """Files kept once per content under root/<2 hex>/<sha256><suffix>"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _ref(self, digest, suffix, name, size, content_type):
+        path = os.path.join(self.root, digest[:2], f"{digest}{suffix}")
+        return {"name": name, "sha256": digest, "size": size, "content_type": content_type, "path": path}
+
+    def _commit(self, tmp_path, path):
+        """Move a finished temp file in place unless the same content is already stored"""
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+
+    def put_bytes(self, data, name, content_type="application/octet-stream"):
+        """Store bytes; returns a reference dict for the results"""
+        digest = hashlib.sha256(data).hexdigest()
+        ref = self._ref(digest, os.path.splitext(name)[1], name, len(data), content_type)
+        if not os.path.exists(ref["path"]):
+            os.makedirs(os.path.dirname(ref["path"]), exist_ok=True)
+            tmp_path = f"{ref['path']}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            self._commit(tmp_path, ref["path"])
+        return ref
+
+    def put_file(self, source, name=None, content_type="application/octet-stream", move=False):
+        """Store a file without reading it into memory at once; returns a reference dict"""
+        name = name or os.path.basename(source)
+        sha = hashlib.sha256()
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        ref = self._ref(sha.hexdigest(), os.path.splitext(name)[1], name, os.path.getsize(source), content_type)
+        if os.path.exists(ref["path"]):
+            if move:
+                os.remove(source)
+            return ref
+        os.makedirs(os.path.dirname(ref["path"]), exist_ok=True)
+        tmp_path = f"{ref['path']}.{os.getpid()}.tmp"
+        if move:
+            shutil.move(source, tmp_path)
+        else:
+            shutil.copyfile(source, tmp_path)
+        self._commit(tmp_path, ref["path"])
+        return ref
+
+
+class ResultStream:
+    """Appends one JSON line and one JUnit test case per finished test"""
+
+    def __init__(self, out_dir, run_id, suite_name="booking"):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.run_id = run_id
+        self.jsonl_path = os.path.join(out_dir, "results.jsonl")
+        self.junit_path = os.path.join(out_dir, "junit.xml")
+        self.counts = {}
+
+        self._jsonl = open(self.jsonl_path, "a", encoding="utf-8")
+        self._junit = open(self.junit_path, "w", encoding="utf-8")
+        suite = ET.Element("testsuite", name=suite_name, hostname=socket.gethostname(),
+                           timestamp=datetime.now().isoformat(timespec="seconds"))
+        opening = ET.tostring(suite, encoding="unicode").replace(" />", ">")
+        self._junit.write(f'<?xml version="1.0" encoding="utf-8"?>\n<testsuites>\n{opening}\n')
+        self._close_junit()
+
+    def _close_junit(self):
+        """Write the closing tags, leaving the file position in front of them"""
+        self._junit_body_end = self._junit.tell()
+        self._junit.write(JUNIT_CLOSE)
+        self._junit.flush()
+        self._junit.seek(self._junit_body_end)
+
+    def write(self, result):
+        """Stream one finished test; result is a dict with at least nodeid, outcome and duration_ms"""
+        result = {"run_id": self.run_id, "finished": time.time(), **result}
+        self._jsonl.write(json.dumps(result) + "\n")
+        self._jsonl.flush()
+        self.counts[result["outcome"]] = self.counts.get(result["outcome"], 0) + 1
+
+        self._junit.seek(self._junit_body_end)
+        self._junit.truncate()
+        self._junit.write(ET.tostring(junit_testcase(result), encoding="unicode") + "\n")
+        self._close_junit()
+
+    def close(self):
+        self._jsonl.close()
+        self._junit.close()
+
+
+def junit_testcase(result):
+    """<testcase> element for a result dict"""
+    path, _, name = result["nodeid"].partition("::")
+    classname = os.path.splitext(path)[0].replace("/", ".").replace(os.sep, ".")
+    case = ET.Element("testcase", classname=classname, name=name or path,
+                      time=f"{result['duration_ms'] / 1000:.3f}")
+    outcome = result["outcome"]
+    text = result.get("longrepr") or ""
+    if outcome in ("failed", "error"):
+        element = ET.SubElement(case, "failure" if outcome == "failed" else "error",
+                                message=failure_message(text, outcome))
+        element.text = text
+    elif outcome == "skipped":
+        ET.SubElement(case, "skipped", message=text[:200])
+    if result.get("artifacts"):
+        properties = ET.SubElement(case, "properties")
+        for ref in result["artifacts"]:
+            ET.SubElement(properties, "property", name=f"artifact:{ref['name']}", value=ref["path"])
+    return case
+
+
+def failure_message(text, default):
+    """First "E   ..." line of a pytest failure, else its last line"""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    errors = [line[1:].strip() for line in lines if line.startswith("E ")]
+    if errors:
+        return errors[0][:200]
+    return (lines[-1] if lines else default)[:200]
+
+
+def read_results(path):
+    """Result dicts from a results.jsonl file; a half-written last line is skipped"""
+    results = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                results.append(json.loads(line))
+            except ValueError:
+                continue
+    return results
@@ -0,0 +1,191 @@
+# Request routing profile for test browser contexts
+#
+# Aborts requests none of the assertions need (images, fonts, media,
+# third-party trackers) and can serve static assets from an on-disk cache.
+# Cached assets older than the max age are revalidated with their ETag or
+# Last-Modified (a 304 keeps the stored copy) or fetched again. While a
+# cassette is recording or replaying the cache steps aside, so every asset
+# goes through the cassette route. Blocked and cached requests are counted
+# per test together with the bytes and time they saved.
+
+import hashlib
+import json
+import os
+import time
+from fnmatch import fnmatch
+
+# Resource types worth keeping on disk between runs
+CACHEABLE_TYPES = {"stylesheet", "script", "image", "font"}
+
+# Response headers that no longer match once the body is replayed decoded
+DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class RoutingProfile:
+    """Block lists plus an optional static asset cache, applied per context"""
+
+    def __init__(self, blocked_types=(), blocked_patterns=(), cache_dir=None, cache_max_age_s=86400,
+                 cassette_active=False):
+        self.blocked_types = set(blocked_types)
+        self.blocked_patterns = list(blocked_patterns)
+        self.cache_dir = cache_dir
+        self.cache_max_age_s = cache_max_age_s
+        # route.fetch() would skip the cassette route, so a cassette takes the assets instead
+        self.cassette_active = cassette_active
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.current_test = None
+        self.per_test = {}
+
+    def apply(self, context):
+        """Route every request of the context through this profile"""
+        context.route("**/*", self._handle)
+
+    def _stats(self):
+        return self.per_test.setdefault(self.current_test, {
+            "blocked": 0, "blocked_bytes": 0, "blocked_ms": 0.0,
+            "cache_hits": 0, "cache_bytes": 0, "cache_ms": 0.0, "revalidated": 0, "fetch_errors": 0,
+        })
+
+    def _is_blocked(self, request):
+        if request.resource_type in self.blocked_types:
+            return True
+        return any(fnmatch(request.url, pattern) for pattern in self.blocked_patterns)
+
+    def _handle(self, route, request):
+        if self._is_blocked(request):
+            stats = self._stats()
+            stats["blocked"] += 1
+            # Size and fetch time are only known if an earlier run cached the asset
+            meta = self._load_meta(request.url) if self.cache_dir else None
+            if meta:
+                stats["blocked_bytes"] += meta["size"]
+                stats["blocked_ms"] += meta["fetch_ms"]
+            route.abort("blockedbyclient")
+            return
+
+        if (self.cache_dir and not self.cassette_active and request.method == "GET"
+                and request.resource_type in CACHEABLE_TYPES):
+            self._serve_cached(route, request)
+            return
+
+        route.fallback()
+
+    # --- on-disk cache ---
+
+    def _path(self, url, suffix):
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}{suffix}")
+
+    def _load_meta(self, url):
+        try:
+            with open(self._path(url, ".json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _serve_cached(self, route, request):
+        meta = self._load_meta(request.url)
+        if meta:
+            try:
+                with open(self._path(request.url, ".bin"), "rb") as f:
+                    body = f.read()
+            except OSError:
+                meta = None
+        if meta and time.time() - meta.get("stored_at", 0) <= self.cache_max_age_s:
+            self._fulfill_from_cache(route, meta, body)
+            return
+
+        # Missing or too old: fetch, asking only for changes when the stored copy has validators
+        conditional = {}
+        if meta and meta.get("etag"):
+            conditional["if-none-match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            conditional["if-modified-since"] = meta["last_modified"]
+        start = time.perf_counter()
+        try:
+            response = route.fetch(headers={**request.headers, **conditional} if conditional else None)
+            fetched = response.body()
+        except Exception as e:  # network error, or the page went away while fetching
+            self._stats()["fetch_errors"] += 1
+            print(f"⚠ Asset fetch failed ({e.__class__.__name__}): {request.url[:100]}")
+            self._give_up(route)
+            return
+        fetch_ms = (time.perf_counter() - start) * 1000
+
+        if meta and response.status == 304:
+            meta["stored_at"] = time.time()
+            self._store(request.url, None, meta)
+            self._stats()["revalidated"] += 1
+            self._fulfill_from_cache(route, meta, body)
+            return
+
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in DROP_HEADERS}
+        if response.status == 200:
+            self._store(request.url, fetched, {
+                "url": request.url,
+                "status": response.status,
+                "headers": headers,
+                "size": len(fetched),
+                "fetch_ms": round(fetch_ms, 1),
+                "stored_at": time.time(),
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+            })
+        route.fulfill(status=response.status, headers=headers, body=fetched)
+
+    def _fulfill_from_cache(self, route, meta, body):
+        stats = self._stats()
+        stats["cache_hits"] += 1
+        stats["cache_bytes"] += meta["size"]
+        stats["cache_ms"] += meta["fetch_ms"]
+        route.fulfill(status=meta["status"], headers=meta["headers"], body=body)
+
+    def _give_up(self, route):
+        """
+        Let a request the cache could not fetch go on without the cache
+
+        fallback() hands it on to the network, like continue_(); a route that
+        can no longer be continued is aborted.
+        """
+        try:
+            route.fallback()
+        except Exception:
+            try:
+                route.abort("failed")
+            except Exception:
+                pass  # page or context already closed
+
+    def _store(self, url, body, meta):
+        """Write body (None keeps the stored one) then metadata, each atomically, so workers can share the cache"""
+        for suffix, data in ((".bin", body), (".json", json.dumps(meta).encode("utf-8"))):
+            if data is None:
+                continue
+            path = self._path(url, suffix)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    # --- reporting ---
+
+    def test_summary(self, test):
+        """One-line summary of what routing saved in a test"""
+        stats = self.per_test.get(test)
+        if not stats:
+            return None
+        errors = f", {stats['fetch_errors']} fetch error(s)" if stats["fetch_errors"] else ""
+        return (f"Routing: blocked {stats['blocked']} request(s) (~{stats['blocked_bytes'] / 1024:.0f} KB, "
+                f"~{stats['blocked_ms']:.0f} ms known), served {stats['cache_hits']} from cache "
+                f"({stats['cache_bytes'] / 1024:.0f} KB, ~{stats['cache_ms']:.0f} ms saved, "
+                f"{stats['revalidated']} revalidated){errors}")
+
+    def report_lines(self):
+        """Per-test table of blocked and cached requests"""
+        lines = [f"{'TEST':<60} {'BLOCKED':>7} {'KB':>7} {'CACHED':>6} {'KB':>7} {'SAVED ms':>9}"]
+        for test, stats in self.per_test.items():
+            saved_ms = stats["blocked_ms"] + stats["cache_ms"]
+            lines.append(f"{(test or '<outside test>')[-60:]:<60} {stats['blocked']:>7} "
+                         f"{stats['blocked_bytes'] / 1024:>7.0f} {stats['cache_hits']:>6} "
+                         f"{stats['cache_bytes'] / 1024:>7.0f} {saved_ms:>9.0f}")
+        return lines
@@ -0,0 +1,183 @@
+# Persisted run history for scheduling
+#
+# Keeps a smoothed duration and the last outcome of every test, plus the
+# hashes of the source files a test depended on when it last passed. Later
+# runs use it to put failed and long tests first, to pack tests into
+# balanced per-worker groups, and to pick only the tests whose code changed
+# since they last passed.
+
+import ast
+import hashlib
+import json
+import os
+import time
+
+# Weight of the newest duration in the smoothed value
+DURATION_SMOOTHING = 0.5
+
+# A lock file older than this is left over from a killed run
+STALE_LOCK_S = 30
+
+
+class RunHistory:
+    """Per-test durations and outcomes, stored as JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        self.tests = self._read()  # nodeid -> {"duration_ms", "outcome", "runs", "green_hashes"}
+        self.touched = set()       # node ids recorded by this run
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f).get("tests", {})
+        except (OSError, ValueError):
+            return {}
+
+    def duration_ms(self, nodeid, default=None):
+        entry = self.tests.get(nodeid)
+        return entry["duration_ms"] if entry else default
+
+    def failed_last(self, nodeid):
+        entry = self.tests.get(nodeid)
+        return bool(entry) and entry["outcome"] == "failed"
+
+    def typical_duration_ms(self):
+        """Median known duration, the estimate for tests without history"""
+        durations = sorted(entry["duration_ms"] for entry in self.tests.values())
+        return durations[len(durations) // 2] if durations else 1000.0
+
+    def record(self, nodeid, duration_ms, outcome, source_hashes=None):
+        """Store a finished test; source_hashes are kept as its last green state when it passed"""
+        entry = self.tests.get(nodeid) or {}
+        if entry:
+            duration_ms = DURATION_SMOOTHING * duration_ms + (1 - DURATION_SMOOTHING) * entry["duration_ms"]
+        self.tests[nodeid] = {
+            "duration_ms": round(duration_ms, 1),
+            "outcome": outcome,
+            "runs": entry.get("runs", 0) + 1,
+            "green_hashes": source_hashes if outcome == "passed" else entry.get("green_hashes"),
+        }
+        self.touched.add(nodeid)
+
+    def _lock(self, timeout_s=10):
+        """Exclusive lock file next to the history; True once held"""
+        lock_path = f"{self.path}.lock"
+        deadline = time.monotonic() + timeout_s
+        while True:
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_S:
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    continue
+                if time.monotonic() > deadline:
+                    return False
+                time.sleep(0.05)
+
+    def save(self):
+        """
+        Merge this run's tests into the file as it is now, then replace it atomically
+
+        Runs that finish at the same time (the api and ui lanes of --lane split)
+        each add their own tests instead of overwriting the other's.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        locked = self._lock()
+        try:
+            merged = self._read()
+            merged.update({nodeid: self.tests[nodeid] for nodeid in self.touched})
+            self.tests = merged
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"tests": self.tests}, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        finally:
+            if locked:
+                os.remove(f"{self.path}.lock")
+
+
+def order_items(items, history):
+    """Failed-last-time tests first, then longest first; unknown tests count as typical"""
+    typical = history.typical_duration_ms()
+    return sorted(items, key=lambda item: (
+        not history.failed_last(item.nodeid),
+        -history.duration_ms(item.nodeid, typical),
+    ))
+
+
+def pack_groups(items, history, workers):
+    """
+    Longest-processing-time packing of items into `workers` groups
+
+    Each item, longest first, goes to the group with the least work so far.
+    Returns {nodeid: group index}.
+    """
+    typical = history.typical_duration_ms()
+    loads = [0.0] * workers
+    groups = {}
+    for item in sorted(items, key=lambda i: -history.duration_ms(i.nodeid, typical)):
+        group = loads.index(min(loads))
+        loads[group] += history.duration_ms(item.nodeid, typical)
+        groups[item.nodeid] = group
+    return groups
+
+
+# --- change detection ---
+
+def source_hashes(directory):
+    """sha256 of every Python file directly in directory"""
+    hashes = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".py"):
+            with open(os.path.join(directory, name), "rb") as f:
+                hashes[name] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def _local_imports(directory, name):
+    """Modules of directory imported by the file name"""
+    try:
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError):
+        return set()
+    imported = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imported.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imported.add(node.module.split(".")[0])
+    return {f"{module}.py" for module in imported if os.path.exists(os.path.join(directory, f"{module}.py"))}
+
+
+def dependencies(directory, name):
+    """The file plus every local module it reaches through imports, and conftest.py"""
+    seen = set()
+    pending = [name, "conftest.py"]
+    while pending:
+        current = pending.pop()
+        if current in seen or not os.path.exists(os.path.join(directory, current)):
+            continue
+        seen.add(current)
+        pending.extend(_local_imports(directory, current))
+    return seen
+
+
+def dependency_hashes(directory, name, hashes):
+    """Hashes of the files a test file depends on, from a source_hashes() result"""
+    return {dep: hashes[dep] for dep in sorted(dependencies(directory, name)) if dep in hashes}
+
+
+def changed_since_green(history, nodeid, current):
+    """
+    True when the test did not pass last time, or a file it depends on changed since it last did
+
+    current is dependency_hashes() for the test's file as it is now.
+    """
+    entry = history.tests.get(nodeid)
+    return not entry or entry["outcome"] != "passed" or entry.get("green_hashes") != current
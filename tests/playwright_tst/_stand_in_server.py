@@ -0,0 +1,393 @@
+# Local stand-in for the booking site and the restful-booker API
+#
+# Serves the pieces of https://automationintesting.online and
+# https://restful-booker.herokuapp.com that the suite touches, backed by
+# in-memory state, so tests can run with no network:
+#   GET  /                          home page with room links
+#   GET  /reservation/<room>        reservation page (Reserve Now, booking form)
+#   POST /api/booking               booking form submission with validation
+#   GET  /api/report/room/<room>    booked date ranges for a room
+#   POST /auth                      restful-booker token
+#   GET  /booking, /booking/<id>    restful-booker search and read
+#   POST /booking                   restful-booker create
+#   DELETE /booking/<id>            restful-booker delete (token cookie)
+#
+# Run standalone:  python _stand_in_server.py --port 8000
+
+import argparse
+import base64
+import html
+import itertools
+import json
+import re
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+ADMIN_USERNAME = "admin"
+ADMIN_PASSWORD = "password123"
+
+# Validation rules of the real booking form: field -> (min length, max length)
+FIELD_RULES = {
+    "firstname": (3, 18),
+    "lastname": (3, 30),
+    "email": (1, 100),
+    "phone": (11, 21),
+}
+
+SEED_BOOKINGS = [
+    {"roomid": 1, "firstname": "James", "lastname": "Dean", "checkin": "2024-01-01", "checkout": "2024-01-03"},
+    {"roomid": 2, "firstname": "Sally", "lastname": "Brown", "checkin": "2024-02-10", "checkout": "2024-02-12"},
+    {"roomid": 3, "firstname": "Mark", "lastname": "Wilson", "checkin": "2024-03-05", "checkout": "2024-03-06"},
+]
+
+HOME_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Restful-booker-platform demo</title></head>
+<body>
+<div class="container">
+  <h1>Shady Meadows B&amp;B</h1>
+  <div class="rooms">
+    <div class="room-card"><h5>Single</h5><a class="btn btn-primary" href="/reservation/1">Book now</a></div>
+    <div class="room-card"><h5>Double</h5><a class="btn btn-primary" href="/reservation/2">Book now</a></div>
+    <div class="room-card"><h5>Suite</h5><a class="btn btn-primary" href="/reservation/3">Book now</a></div>
+  </div>
+</div>
+</body></html>
+"""
+
+RESERVATION_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Restful-booker-platform demo</title></head>
+<body>
+<div class="container">
+  <h1>Room __ROOM__</h1>
+  <p class="dates">__CHECKIN__ to __CHECKOUT__</p>
+  <div class="booking-card">
+    <button class="btn btn-primary w-100 mb-3" id="doReservation">Reserve Now</button>
+    <form id="booking-form" style="display:none" onsubmit="return false">
+      <input class="form-control room-firstname" name="firstname" placeholder="Firstname" type="text">
+      <input class="form-control room-lastname" name="lastname" placeholder="Lastname" type="text">
+      <input class="form-control room-email" name="email" placeholder="Email" type="email">
+      <input class="form-control room-phone" name="phone" placeholder="Phone" type="text">
+      <button type="button" class="btn btn-primary w-100 mb-3" id="submitBooking">Reserve Now</button>
+      <button type="button" class="btn btn-secondary w-100" id="cancelBooking">Cancel</button>
+    </form>
+    <div class="alert alert-danger" id="booking-errors" style="display:none"></div>
+    <div id="booking-confirmation" style="display:none">
+      <h2 class="card-title">Booking Confirmed</h2>
+      <p>Your booking has been confirmed for the following dates:</p>
+      <p><strong>__CHECKIN__ - __CHECKOUT__</strong></p>
+    </div>
+  </div>
+</div>
+<script>
+  const booking = {roomid: __ROOM__, checkin: "__CHECKIN__", checkout: "__CHECKOUT__"};
+  const form = document.getElementById("booking-form");
+  const errors = document.getElementById("booking-errors");
+
+  document.getElementById("doReservation").addEventListener("click", (event) => {
+    event.target.remove();
+    form.style.display = "block";
+  });
+
+  document.getElementById("submitBooking").addEventListener("click", async () => {
+    const value = (name) => form.querySelector(`input[name='${name}']`).value;
+    const response = await fetch("/api/booking", {
+      method: "POST",
+      headers: {"Content-Type": "application/json"},
+      body: JSON.stringify({
+        roomid: booking.roomid,
+        firstname: value("firstname"),
+        lastname: value("lastname"),
+        depositpaid: false,
+        email: value("email"),
+        phone: value("phone"),
+        bookingdates: {checkin: booking.checkin, checkout: booking.checkout}
+      })
+    });
+    const body = await response.json();
+    if (response.status === 201) {
+      form.style.display = "none";
+      errors.style.display = "none";
+      document.getElementById("booking-confirmation").style.display = "block";
+    } else {
+      errors.innerHTML = (body.errors || [body.error]).map((e) => `<p>${e}</p>`).join("");
+      errors.style.display = "block";
+    }
+  });
+</script>
+</body></html>
+"""
+
+
+class BookingStore:
+    """In-memory bookings and tokens shared by the site and the API"""
+
+    def __init__(self, seed=True):
+        self.lock = threading.Lock()
+        self.bookings = {}
+        self.tokens = set()
+        self._ids = itertools.count(1)
+        if seed:
+            for entry in SEED_BOOKINGS:
+                self.create({
+                    "roomid": entry["roomid"],
+                    "firstname": entry["firstname"],
+                    "lastname": entry["lastname"],
+                    "totalprice": 100,
+                    "depositpaid": True,
+                    "bookingdates": {"checkin": entry["checkin"], "checkout": entry["checkout"]},
+                    "additionalneeds": "Breakfast",
+                })
+
+    def create(self, booking):
+        """Store a booking and return its id"""
+        with self.lock:
+            booking_id = next(self._ids)
+            self.bookings[booking_id] = booking
+            return booking_id
+
+    def get(self, booking_id):
+        with self.lock:
+            return self.bookings.get(booking_id)
+
+    def delete(self, booking_id):
+        """Remove a booking; False when it does not exist"""
+        with self.lock:
+            return self.bookings.pop(booking_id, None) is not None
+
+    def search(self, firstname=None, lastname=None, checkin=None, checkout=None):
+        """Booking ids matching restful-booker's filter semantics"""
+        with self.lock:
+            matches = []
+            for booking_id, booking in self.bookings.items():
+                dates = booking.get("bookingdates", {})
+                if firstname and booking.get("firstname") != firstname:
+                    continue
+                if lastname and booking.get("lastname") != lastname:
+                    continue
+                if checkin and dates.get("checkin", "") < checkin:
+                    continue
+                if checkout and dates.get("checkout", "") > checkout:
+                    continue
+                matches.append(booking_id)
+            return matches
+
+    def room_report(self, roomid):
+        """Booked ranges for a room, shaped like the site's /api/report/room response"""
+        with self.lock:
+            report = []
+            for booking in self.bookings.values():
+                if booking.get("roomid") != roomid:
+                    continue
+                dates = booking.get("bookingdates", {})
+                report.append({"start": dates.get("checkin"), "end": dates.get("checkout"), "title": "Unavailable"})
+            return {"report": report}
+
+    def overlaps(self, roomid, checkin, checkout):
+        """True when the room is already booked for any night in [checkin, checkout)"""
+        with self.lock:
+            for booking in self.bookings.values():
+                dates = booking.get("bookingdates", {})
+                if booking.get("roomid") != roomid:
+                    continue
+                if dates.get("checkin", "") < checkout and checkin < dates.get("checkout", ""):
+                    return True
+            return False
+
+    def new_token(self):
+        token = secrets.token_hex(8)
+        with self.lock:
+            self.tokens.add(token)
+        return token
+
+    def token_valid(self, token):
+        with self.lock:
+            return token in self.tokens
+
+
+def validate_site_booking(payload):
+    """Validation messages the real booking form returns for a submission"""
+    errors = []
+    for field, (min_len, max_len) in FIELD_RULES.items():
+        value = (payload.get(field) or "").strip()
+        if not value:
+            errors.append("must not be empty")
+        elif not min_len <= len(value) <= max_len:
+            errors.append(f"size must be between {min_len} and {max_len}")
+    return errors
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Routes requests for both the site and the API"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients reuse connections
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    server_version = "StandIn/1.0"
+    store = None  # set per server in start_stand_in_server
+    quiet = True
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    # --- helpers ---
+
+    def _send(self, status, body, content_type="application/json"):
+        if not isinstance(body, (bytes, str)):
+            body = json.dumps(body)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(raw or b"{}")
+        except ValueError:
+            return None
+
+    def _authorized(self):
+        """Token cookie or the admin basic auth header, as restful-booker accepts"""
+        cookie = self.headers.get("Cookie") or ""
+        match = re.search(r"token=([^;\s]+)", cookie)
+        if match and self.store.token_valid(match.group(1)):
+            return True
+        auth = self.headers.get("Authorization") or ""
+        expected = base64.b64encode(f"{ADMIN_USERNAME}:{ADMIN_PASSWORD}".encode()).decode()
+        return auth == f"Basic {expected}"
+
+    def _booking_id(self, path):
+        match = re.fullmatch(r"/booking/(\d+)", path)
+        return int(match.group(1)) if match else None
+
+    # --- verbs ---
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path == "/":
+            return self._send(200, HOME_PAGE, "text/html; charset=utf-8")
+
+        match = re.fullmatch(r"/reservation/(\d+)", url.path)
+        if match:
+            page = (RESERVATION_PAGE
+                    .replace("__ROOM__", match.group(1))
+                    .replace("__CHECKIN__", html.escape(query.get("checkin", "")))
+                    .replace("__CHECKOUT__", html.escape(query.get("checkout", ""))))
+            return self._send(200, page, "text/html; charset=utf-8")
+
+        match = re.fullmatch(r"/api/report/room/(\d+)", url.path)
+        if match:
+            return self._send(200, self.store.room_report(int(match.group(1))))
+
+        if url.path == "/booking":
+            ids = self.store.search(
+                firstname=query.get("firstname"),
+                lastname=query.get("lastname"),
+                checkin=query.get("checkin"),
+                checkout=query.get("checkout"),
+            )
+            return self._send(200, [{"bookingid": booking_id} for booking_id in ids])
+
+        booking_id = self._booking_id(url.path)
+        if booking_id is not None:
+            booking = self.store.get(booking_id)
+            if booking is None:
+                return self._send(404, "Not Found", "text/plain")
+            return self._send(200, booking)
+
+        return self._send(404, "Not Found", "text/plain")
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        payload = self._read_json()
+        if payload is None:
+            return self._send(400, "Bad Request", "text/plain")
+
+        if url.path == "/auth":
+            if payload.get("username") == ADMIN_USERNAME and payload.get("password") == ADMIN_PASSWORD:
+                return self._send(200, {"token": self.store.new_token()})
+            return self._send(200, {"reason": "Bad credentials"})
+
+        if url.path == "/booking":
+            if "bookingdates" not in payload:
+                return self._send(500, "Internal Server Error", "text/plain")
+            booking_id = self.store.create(payload)
+            return self._send(200, {"bookingid": booking_id, "booking": payload})
+
+        if url.path == "/api/booking":
+            errors = validate_site_booking(payload)
+            if errors:
+                return self._send(400, {"errors": errors})
+            dates = payload.get("bookingdates") or {}
+            checkin, checkout = dates.get("checkin", ""), dates.get("checkout", "")
+            if not checkin or checkout <= checkin or self.store.overlaps(payload.get("roomid"), checkin, checkout):
+                return self._send(409, {"error": "The room dates are either invalid or are already booked "
+                                                 "for one or more of the dates that you have selected."})
+            booking_id = self.store.create(payload)
+            return self._send(201, {"bookingid": booking_id, "booking": payload})
+
+        return self._send(404, "Not Found", "text/plain")
+
+    def do_DELETE(self):
+        booking_id = self._booking_id(urlparse(self.path).path)
+        if booking_id is None:
+            return self._send(404, "Not Found", "text/plain")
+        if not self._authorized():
+            return self._send(403, "Forbidden", "text/plain")
+        if not self.store.delete(booking_id):
+            return self._send(405, "Method Not Allowed", "text/plain")
+        return self._send(201, "Created", "text/plain")
+
+
+class StandInServer:
+    """Running stand-in server; serves the site and the API from one base URL"""
+
+    def __init__(self, httpd, store):
+        self.httpd = httpd
+        self.store = store
+        host, port = httpd.server_address[:2]
+        self.base_url = f"http://{host}:{port}"
+        self._thread = threading.Thread(target=httpd.serve_forever, name="stand-in-server", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def start_stand_in_server(host="127.0.0.1", port=0, store=None, quiet=True):
+    """Start the stand-in on a background thread; port 0 picks a free port"""
+    store = store or BookingStore()
+    handler = type("BoundStandInHandler", (StandInHandler,), {"store": store, "quiet": quiet})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    return StandInServer(httpd, store).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the booking site and API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = start_stand_in_server(args.host, args.port, quiet=False)
+    print(f"Stand-in serving site and API at {server.base_url}")
+    print(f"  BOOKING_SITE_URL={server.base_url} BOOKING_API_URL={server.base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
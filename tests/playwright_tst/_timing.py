@@ -0,0 +1,138 @@
+# Low-overhead span recorder for per-step timings
+#
+# Spans are (test, name, phase, start, duration, self time) tuples kept in a
+# list until each test's teardown flushes them to the trace file, so memory
+# holds only the running test's spans; nesting is tracked per thread so each
+# span also knows its exclusive time and a phase breakdown never counts the
+# same nanosecond twice.
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Where test time goes
+PHASES = ("launch", "navigation", "sleep", "form_fill", "network", "assertion", "fixture", "other")
+
+
+class SpanRecorder:
+    """Collects timing spans for the running test"""
+
+    def __init__(self):
+        self.spans = []  # not yet flushed: the running test's, after each teardown flush
+        self.flushed = 0
+        self.current_test = None
+        self.origin_ns = time.perf_counter_ns()
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, name, phase):
+        """Time the enclosed block; nested spans are subtracted from its self time"""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        test = self.current_test
+        children_ns = [0]
+        stack.append(children_ns)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter_ns() - start
+            stack.pop()
+            if stack:
+                stack[-1][0] += duration
+            self.spans.append((test, name, phase, start, duration, duration - children_ns[0]))
+
+    def timed(self, phase, name=None):
+        """Decorator form of span()"""
+        def decorator(func):
+            span_name = name or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, phase):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def phase_breakdown(self, test):
+        """Exclusive ms per phase for a test"""
+        totals = {}
+        for span_test, _, phase, _, _, self_ns in self.spans:
+            if span_test == test:
+                totals[phase] = totals.get(phase, 0.0) + self_ns / 1e6
+        return {phase: round(totals[phase], 1) for phase in PHASES if phase in totals}
+
+    def flush(self, path, run_id, worker):
+        """Move the spans recorded since the last flush to a JSONL trace file"""
+        # Spans appended by other threads meanwhile stay for the next flush
+        count = len(self.spans)
+        if not count:
+            return
+        pending = self.spans[:count]
+        del self.spans[:count]
+        self.flushed += count
+        lines = []
+        for test, name, phase, start, duration, self_ns in pending:
+            lines.append(json.dumps({
+                "run_id": run_id,
+                "worker": worker,
+                "test": test,
+                "name": name,
+                "phase": phase,
+                "start_ms": round((start - self.origin_ns) / 1e6, 3),
+                "duration_ms": round(duration / 1e6, 3),
+                "self_ms": round(self_ns / 1e6, 3),
+            }))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # One O_APPEND write per batch keeps lines from parallel workers whole
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, ("\n".join(lines) + "\n").encode("utf-8"))
+        finally:
+            os.close(fd)
+
+
+def breakdown_html(breakdown):
+    """Small HTML table of a phase breakdown for the pytest-html report"""
+    total = sum(breakdown.values()) or 1.0
+    rows = "".join(
+        f"<tr><td>{phase}</td><td style='text-align:right'>{ms:.1f}</td>"
+        f"<td style='text-align:right'>{ms / total * 100:.0f}%</td></tr>"
+        for phase, ms in breakdown.items()
+    )
+    return ("<table><tr><th>Phase</th><th>ms</th><th>share</th></tr>"
+            f"{rows}<tr><td><b>total</b></td><td style='text-align:right'><b>{total:.1f}</b></td><td></td></tr></table>")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (0.0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def read_spans(path, run_ids=None):
+    """Spans from a JSONL trace file, optionally only for some run ids"""
+    spans = []
+    if not os.path.exists(path):
+        return spans
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if run_ids is None or entry["run_id"] in run_ids:
+                spans.append(entry)
+    return spans
+
+
+RECORDER = SpanRecorder()
+span = RECORDER.span
+timed = RECORDER.timed
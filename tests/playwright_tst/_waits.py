@@ -0,0 +1,156 @@
+# Event-driven waits for the booking flow
+#
+# Each wait returns as soon as its condition is met and records how long it
+# actually took next to the fixed sleep it replaced, so the run can report
+# the time saved.
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+from _config import NAVIGATION_TIMEOUT_MS, FORM_TIMEOUT_MS, SUBMIT_TIMEOUT_MS, WAIT_FOR_NETWORK_IDLE
+from _timing import span, timed
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
+
+# Fixed sleeps (ms) the waits replaced
+OLD_BUDGETS_MS = {
+    "navigation": 2000,
+    "form_reveal": 2000,
+    "form_fill": 1000,
+    "submit": 2000,
+    "result_text": 3000,
+}
+
+# Request made by the booking form when it is submitted
+BOOKING_POST_PATH = "/api/booking"
+
+# One entry per wait: {"test", "wait", "spent_ms", "budget_ms", "met"}
+WAIT_LOG = []
+current_test = None
+
+
+def record_wait(name, spent_ms, met=True):
+    """Store the time a wait took next to the sleep it replaced"""
+    WAIT_LOG.append({
+        "test": current_test,
+        "wait": name,
+        "spent_ms": round(spent_ms, 1),
+        "budget_ms": OLD_BUDGETS_MS.get(name, 0),
+        "met": met,
+    })
+
+
+def _elapsed_ms(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def goto_and_wait(page: Page, url, ready_selector=None, response_url=None, network_idle=WAIT_FOR_NETWORK_IDLE,
+                  timeout_ms=None):
+    """
+    Open url up to DOMContentLoaded, then wait for what the next step needs
+
+    ready_selector: until that element is visible (e.g. the Reserve Now button).
+    response_url: until a response whose URL contains it arrives.
+    network_idle: until the network is idle as well (PW_WAIT_NETWORK_IDLE);
+    off by default, pages that keep polling never go idle.
+    """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+    timeout_ms = timeout_ms or NAVIGATION_TIMEOUT_MS
+    if response_url:
+        start = time.perf_counter()
+        try:
+            with span("goto + response", "navigation"), \
+                    page.expect_response(lambda r: response_url in r.url, timeout=timeout_ms):
+                page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+            record_wait("navigation", _elapsed_ms(start))
+        except PlaywrightTimeoutError:
+            print(f"⚠ No response matching '{response_url}' within {timeout_ms} ms, continuing")
+            record_wait("navigation", _elapsed_ms(start), met=False)
+    else:
+        with span("goto", "navigation"):
+            page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+
+    start = time.perf_counter()
+    if ready_selector:
+        try:
+            with span("ready element", "sleep"):
+                page.locator(ready_selector).first.wait_for(state="visible", timeout=timeout_ms)
+        except PlaywrightTimeoutError:
+            record_wait("navigation", _elapsed_ms(start), met=False)
+            raise
+    if network_idle:
+        try:
+            with span("network idle", "sleep"):
+                page.wait_for_load_state("networkidle", timeout=timeout_ms)
+        except PlaywrightTimeoutError:
+            # The ready element, or the later waits, still guard the flow
+            print(f"⚠ Network not idle within {timeout_ms} ms, continuing")
+            record_wait("navigation", _elapsed_ms(start), met=False)
+            return
+    if ready_selector or network_idle:
+        record_wait("navigation", _elapsed_ms(start))
+
+
+@timed("sleep")
+def wait_for_visible(page: Page, selector, name="form_reveal", timeout_ms=None):
+    """Wait until selector is visible; raises if it never shows up"""
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+    timeout_ms = timeout_ms or FORM_TIMEOUT_MS
+    start = time.perf_counter()
+    try:
+        page.locator(selector).first.wait_for(state="visible", timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        record_wait(name, _elapsed_ms(start), met=False)
+        raise
+    record_wait(name, _elapsed_ms(start))
+
+
+@timed("network")
+def click_and_wait_for_booking_post(page: Page, button, timeout_ms=None):
+    """Click the submit button and wait for the booking POST response"""
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+    timeout_ms = timeout_ms or SUBMIT_TIMEOUT_MS
+    start = time.perf_counter()
+    try:
+        with page.expect_response(
+            lambda r: BOOKING_POST_PATH in r.url and r.request.method == "POST",
+            timeout=timeout_ms
+        ) as response_info:
+            button.click()
+        response = response_info.value
+        print(f"Booking POST answered with status {response.status}")
+        record_wait("submit", _elapsed_ms(start))
+        return response
+    except PlaywrightTimeoutError:
+        # Client-side validation may stop the request; the assertion decides
+        print(f"⚠ No booking POST response within {timeout_ms} ms, continuing")
+        record_wait("submit", _elapsed_ms(start), met=False)
+        return None
+
+
+def wait_report_lines():
+    """Per-test table of time spent waiting vs the old fixed sleeps"""
+    totals = {}
+    for entry in WAIT_LOG:
+        row = totals.setdefault(entry["test"], {"spent": 0.0, "budget": 0, "waits": 0, "missed": 0})
+        row["spent"] += entry["spent_ms"]
+        row["budget"] += entry["budget_ms"]
+        row["waits"] += 1
+        row["missed"] += 0 if entry["met"] else 1
+
+    lines = [f"{'TEST':<60} {'WAITS':>5} {'WAITED ms':>10} {'OLD SLEEP ms':>12} {'SAVED ms':>10}"]
+    all_spent = all_budget = 0
+    for test, row in totals.items():
+        name = (test or "<outside test>")[-60:]
+        saved = row["budget"] - row["spent"]
+        note = f"  ({row['missed']} timed out)" if row["missed"] else ""
+        lines.append(f"{name:<60} {row['waits']:>5} {row['spent']:>10.0f} {row['budget']:>12} {saved:>10.0f}{note}")
+        all_spent += row["spent"]
+        all_budget += row["budget"]
+    lines.append(f"{'TOTAL':<60} {len(WAIT_LOG):>5} {all_spent:>10.0f} {all_budget:>12} {all_budget - all_spent:>10.0f}")
+    return lines
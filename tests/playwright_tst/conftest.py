@@ -1,107 +1,580 @@
 # Base test config via pytest
+#
+# Playwright is imported only where a browser is needed, so an API-only run
+# (-m api -p no:playwright) never loads it.
 
+from __future__ import annotations
+
+import os
+import re
+import time
 import pytest
-from playwright.sync_api import Page, sync_playwright
-from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+try:
+    import pytest_html
+except ImportError:  # report extras are optional
+    pytest_html = None
+from datetime import date, datetime, timedelta
+from _config import BROWSER_NAME, HEADLESS, SLOW_MO, VIEWPORT, WORKER_DATE_STRIDE, USE_STAND_IN
+from _config import FORM_CACHE_SIZE, FORM_CACHE_MAX_AGE_S, worker_index
+from _config import ROUTING_ENABLED, BLOCKED_RESOURCE_TYPES, BLOCKED_URL_PATTERNS, ASSET_CACHE_DIR, ASSET_CACHE_MAX_AGE_S
+from _config import TRACE_FILE, ASSERT_TIMEOUT_MS, RUN_HISTORY_FILE, RESULTS_DIR, ARTIFACT_DIR, run_id, worker_id
+from _config import BOOKING_POOL_CONCURRENCY, BROWSER_DAEMON_URL
+from _config import CAPTURE_ENABLED, CAPTURE_TRACE, CAPTURE_TRACE_STEPS, CAPTURE_MAX_EVENTS, CAPTURE_MAX_BUFFER_KB
+from _config import CAPTURE_MAX_DISK_MB, CASSETTE_MODE
+import _waits
+from _api_client import get_api_client, api_client_in_use
+from _availability import get_availability_calendar
+from _booking_page import RESERVE_BUTTON, FORM_FIELD, SUBMIT_BUTTON, TEXT_IN_SCOPE_JS
+from _booking_page import reservation_url, generate_unique_phone
+from _booking_pool import BookingPool
+from _browser_daemon import connect_browser
+from _cassette import get_cassette, cassette_in_use, reset_cassette
+from _failure_capture import FailureCapture
+from _page_cache import FormPageCache
+from _result_stream import ArtifactStore, ResultStream, MAX_LONGREPR_CHARS
+from _routing import RoutingProfile
+from _run_history import RunHistory, order_items, pack_groups, source_hashes, dependency_hashes, changed_since_green
+from _timing import RECORDER, span, timed, breakdown_html
+from _waits import goto_and_wait, wait_for_visible, click_and_wait_for_booking_post, record_wait
 
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
 
-@pytest.fixture(scope="function")
-def custom_page():
-    """Custom page fixture that guarantees headed mode"""
+# Test lanes: "api" tests run without any browser, "ui" tests need one
+LANE_MARKERS = {
+    "api": "API-only test; gets the api_client fixture and never starts Playwright",
+    "ui": "Browser test; needs the shared browser",
+}
+BROWSER_FIXTURES = {"shared_browser", "custom_page"}
+BOOKINGS_MARKER = "bookings(n): number of pooled bookings the test gets from the pooled_bookings fixture (default 1)"
+
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Set up in pytest_configure
+RUN_HISTORY = None
+SOURCE_HASHES = {}
+BOOKING_POOL = None
+_test_results = {}  # nodeid -> result dict while the test's phases come in
+
+ARTIFACTS = ArtifactStore(ARTIFACT_DIR)
+_result_stream = None
+
+
+def pytest_addoption(parser):
+    """Scheduling options backed by the run history"""
+    group = parser.getgroup("booking scheduling")
+    group.addoption("--changed-only", action="store_true",
+                    help="Only run tests that failed last time or whose code changed since they last passed")
+    group.addoption("--no-history", action="store_true",
+                    help="Keep the collected order and do not update the run history")
+
+
+def pytest_configure(config):
+    """
+    Give the run an id, reset a cassette about to be recorded and start the
+    local stand-in server when BOOKING_STAND_IN is set
+    """
+    for lane, description in LANE_MARKERS.items():
+        config.addinivalue_line("markers", f"{lane}: {description}")
+    config.addinivalue_line("markers", BOOKINGS_MARKER)
+    
+    global RUN_HISTORY, SOURCE_HASHES
+    RUN_HISTORY = None if config.getoption("no_history") else RunHistory(RUN_HISTORY_FILE)
+    SOURCE_HASHES = source_hashes(TEST_DIR)
+    
+    # Parallel workers inherit the run id from the controller process
+    config._owns_run_id = "PW_RUN_ID" not in os.environ
+    os.environ.setdefault("PW_RUN_ID", f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}")
+    if config._owns_run_id:
+        reset_cassette()  # a run started through iv_run_all_tests is reset there
+    
+    config._stand_in_server = None
+    # Workers inherit the URLs too
+    if not USE_STAND_IN or "BOOKING_SITE_URL" in os.environ:
+        return
+    
+    from _stand_in_server import start_stand_in_server
+    server = start_stand_in_server()
+    os.environ["BOOKING_SITE_URL"] = server.base_url
+    os.environ["BOOKING_API_URL"] = server.base_url
+    config._stand_in_server = server
+    print(f"Using local stand-in server at {server.base_url}")
+
+
+def pytest_unconfigure(config):
+    """Stop the stand-in server and drop the run id if this process set them up"""
+    if getattr(config, "_owns_run_id", False):
+        os.environ.pop("PW_RUN_ID", None)
+    if cassette_in_use():
+        get_cassette().close()
+    server = getattr(config, "_stand_in_server", None)
+    if server:
+        server.stop()
+        os.environ.pop("BOOKING_SITE_URL", None)
+        os.environ.pop("BOOKING_API_URL", None)
+
+
+# Before xdist's own hook, which turns xdist_group markers into "@pack<N>" nodeid suffixes
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_modifyitems(config, items):
+    """
+    Assign lanes, then select and order the tests from the run history
+    
+    Every test that asks for a browser is put in the ui lane, even if it is not
+    marked. Tests that failed last time run first, then the longest ones; with
+    --dist loadgroup the tests are also packed into one balanced group per worker.
+    """
+    for item in items:
+        if BROWSER_FIXTURES & set(item.fixturenames) and not item.get_closest_marker("ui"):
+            item.add_marker(pytest.mark.ui)
+    
+    if RUN_HISTORY is not None:
+        order_from_history(config, items)
+
+
+def order_from_history(config, items):
+    """--changed-only selection, history order and worker packing"""
+    if config.getoption("changed_only"):
+        selected, deselected = [], []
+        for item in items:
+            current = dependency_hashes(TEST_DIR, os.path.basename(item.fspath), SOURCE_HASHES)
+            (selected if changed_since_green(RUN_HISTORY, item.nodeid, current) else deselected).append(item)
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = selected
+    
+    items[:] = order_items(items, RUN_HISTORY)
+    
+    # Every worker collects the same items and so computes the same groups
+    # (xdist resets "dist" on workers and keeps --dist loadgroup as option.loadgroup)
+    workers = getattr(config, "workerinput", {}).get("workercount", 1)
+    if workers > 1 and getattr(config.option, "loadgroup", False):
+        groups = pack_groups(items, RUN_HISTORY, workers)
+        for item in items:
+            item.add_marker(pytest.mark.xdist_group(f"pack{groups[item.nodeid]}"))
+
+
+def test_nodeid(nodeid):
+    """Node id without the "@pack<N>" suffix xdist adds under --dist loadgroup"""
+    return re.sub(r"@pack\d+$", "", nodeid)
+
+
+def result_stream():
+    """This run's result stream, opened on the first finished test"""
+    global _result_stream
+    if _result_stream is None:
+        _result_stream = ResultStream(os.path.join(RESULTS_DIR, run_id()), run_id())
+    return _result_stream
+
+
+def pytest_runtest_logreport(report):
+    """
+    Gather setup/call/teardown of a test into one result (in the controller when
+    run in parallel), then stream it and add it to the run history
+    """
+    if worker_id() != "main":
+        return
+    nodeid = test_nodeid(report.nodeid)
+    result = _test_results.setdefault(nodeid, {
+        "nodeid": nodeid, "outcome": "passed", "duration_ms": 0.0, "longrepr": None, "artifacts": [],
+    })
+    result["duration_ms"] += report.duration * 1000
+    if report.failed:
+        result["outcome"] = "failed" if report.when == "call" else "error"
+        result["longrepr"] = str(report.longrepr)[-MAX_LONGREPR_CHARS:]
+        output = "".join(f"--- {title} ---\n{content}\n" for title, content in report.sections)
+        if output:
+            result["artifacts"].append(ARTIFACTS.put_bytes(output.encode("utf-8"), f"{report.when}-output.txt", "text/plain"))
+    elif report.skipped and result["outcome"] == "passed":
+        result["outcome"] = "skipped"
+        result["longrepr"] = report.longrepr[2] if isinstance(report.longrepr, tuple) else str(report.longrepr)
+    for name, value in report.user_properties:
+        if name == "artifacts":
+            result["artifacts"].extend(ref for ref in value if ref not in result["artifacts"])
+        else:
+            result[name] = value
+    if report.when != "teardown":
+        return
+    
+    result = _test_results.pop(nodeid)
+    result["duration_ms"] = round(result["duration_ms"], 1)
+    result_stream().write(result)
+    if RUN_HISTORY is not None:
+        current = dependency_hashes(TEST_DIR, os.path.basename(report.fspath), SOURCE_HASHES)
+        outcome = "failed" if result["outcome"] == "error" else result["outcome"]
+        RUN_HISTORY.record(nodeid, result["duration_ms"], outcome, current)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Close the result stream and store the run history once per run"""
+    if worker_id() != "main":
+        return
+    if _result_stream is not None:
+        _result_stream.close()
+    if RUN_HISTORY is not None:
+        RUN_HISTORY.save()
+
+
+def set_current_test(name):
+    """Tag waits, routed requests and timing spans recorded from here on"""
+    _waits.current_test = name
+    RECORDER.current_test = name
+    if ROUTING:
+        ROUTING.current_test = name
+    if get_cassette():
+        get_cassette().current_test = name
+
+
+def pytest_runtest_setup(item):
+    """Tag everything recorded from here on with the running test"""
+    set_current_test(item.nodeid)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    """Time every fixture setup"""
+    with span(f"setup {fixturedef.argname}", "fixture"):
+        yield
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    """Time the test body; time not inside a nested span counts as phase 'other'"""
+    with span("test body", "other"):
+        yield
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    """Time fixture teardown, then append the test's spans to the trace file"""
+    # custom_page reads this to skip warming a page nobody will use
+    item.ui_tests_left = ui_tests_left(item.session, nextitem)
+    with span("teardown", "fixture"):
+        yield
+    RECORDER.flush(TRACE_FILE, run_id(), worker_id())
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """Attach the phase breakdown to the test report (and the HTML report)"""
+    outcome = yield
+    report = outcome.get_result()
+    # Fixtures read this in teardown to tell whether the test failed
+    setattr(item, f"rep_{report.when}", report)
+    if report.when != "call":
+        return
+    breakdown = RECORDER.phase_breakdown(item.nodeid)
+    report.user_properties.append(("phase_ms", breakdown))
+    report.user_properties.append(("worker", worker_id()))
+    if pytest_html and breakdown:
+        extras = getattr(report, "extras", [])
+        extras.append(pytest_html.extras.html(breakdown_html(breakdown)))
+        report.extras = extras
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Show wait time vs the old fixed sleeps, form cache, routing, cassette, booking pool, API call latency and where results went"""
+    if _waits.WAIT_LOG:
+        terminalreporter.section("wait time vs old fixed sleeps")
+        for line in _waits.wait_report_lines():
+            terminalreporter.write_line(line)
+    
+    if FORM_CACHE.hits or FORM_CACHE.misses:
+        terminalreporter.section("form page cache")
+        for line in FORM_CACHE.report_lines():
+            terminalreporter.write_line(line)
+    
+    if ROUTING and ROUTING.per_test:
+        terminalreporter.section("request routing")
+        for line in ROUTING.report_lines():
+            terminalreporter.write_line(line)
+    
+    if CAPTURE and CAPTURE.per_test:
+        terminalreporter.section("failure capture")
+        for line in CAPTURE.report_lines():
+            terminalreporter.write_line(line)
+    
+    if cassette_in_use():
+        terminalreporter.section("cassette")
+        for line in get_cassette().report_lines():
+            terminalreporter.write_line(line)
+    
+    if BOOKING_POOL is not None:
+        terminalreporter.section("booking pool")
+        for line in BOOKING_POOL.report_lines():
+            terminalreporter.write_line(line)
+    
+    if api_client_in_use() and get_api_client().calls:
+        terminalreporter.section("API call latency")
+        for line in get_api_client().latency_report_lines():
+            terminalreporter.write_line(line)
+    
+    if RECORDER.flushed:
+        terminalreporter.write_line(f"Timing spans (run {run_id()}): {TRACE_FILE}")
+    
+    if _result_stream is not None:
+        terminalreporter.write_line(f"Results: {_result_stream.jsonl_path} and junit.xml "
+                                    f"(render with: python viii_render_report.py {_result_stream.out_dir})")
+
+
+FORM_CACHE = FormPageCache(size=FORM_CACHE_SIZE, max_age_s=FORM_CACHE_MAX_AGE_S)
+ROUTING = RoutingProfile(BLOCKED_RESOURCE_TYPES, BLOCKED_URL_PATTERNS, ASSET_CACHE_DIR, ASSET_CACHE_MAX_AGE_S,
+                         cassette_active=CASSETTE_MODE in ("record", "replay")) if ROUTING_ENABLED else None
+CAPTURE = FailureCapture(ARTIFACTS, CAPTURE_MAX_EVENTS, CAPTURE_MAX_BUFFER_KB, CAPTURE_MAX_DISK_MB,
+                         trace=CAPTURE_TRACE, trace_steps=CAPTURE_TRACE_STEPS) if CAPTURE_ENABLED else None
+
+
+@pytest.fixture(scope="session")
+def shared_browser():
+    """
+    Browser launched once per session (once per worker when run in parallel)
+    
+    With PW_BROWSER_DAEMON set, the browser is borrowed from the warm pool of
+    _browser_daemon.py over its websocket instead, and handed back with the
+    number of contexts this session opened on it.
+    """
+    from playwright.sync_api import sync_playwright
+    
+    global _contexts_opened
     with sync_playwright() as p:
-        browser = p.firefox.launch(
-            headless=False,
-            slow_mo=1000
-        )
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080}
-        )
-        page = context.new_page()
-        yield page
+        browser_type = getattr(p, BROWSER_NAME)
+        with span(f"launch {BROWSER_NAME}", "launch"):
+            browser, lease = connect_browser(browser_type, BROWSER_DAEMON_URL, HEADLESS, SLOW_MO)
+            if browser is None:
+                print(f"Launching {BROWSER_NAME} (headless={HEADLESS}, slow_mo={SLOW_MO})")
+                browser = browser_type.launch(
+                    headless=HEADLESS,
+                    slow_mo=SLOW_MO
+                )
+        _contexts_opened = 0
+        yield browser
+        FORM_CACHE.clear()
         browser.close()
+        if lease:
+            lease.release(_contexts_opened)
+
+
+_contexts_opened = 0
 
 
-def generate_unique_phone():
-    """Generate unique phone number for test identification"""
-    timestamp = str(int(datetime.now().timestamp()))[-6:]  # Last 6 digits of timestamp
-    return f"TEST{timestamp}"
+def new_test_context(browser, storage_state=None):
+    """Fresh browser context with the suite's settings and routing profile"""
+    global _contexts_opened
+    _contexts_opened += 1
+    context = browser.new_context(
+        viewport=VIEWPORT,
+        storage_state=storage_state
+    )
+    # Routes registered later are asked first: routing blocks, and the cassette sees what it lets through
+    if get_cassette():
+        get_cassette().apply(context)
+    if ROUTING:
+        ROUTING.apply(context)
+    if CAPTURE:
+        CAPTURE.attach(context)
+    return context
 
 
-def find_available_room_dates(room_type=1, check_api=False):
+def trace_step(page, name):
+    """Start the failure trace chunk of the next test step"""
+    if CAPTURE:
+        CAPTURE.step(page, name)
+
+
+def ui_tests_left(session, nextitem):
+    """True when a test from nextitem on uses custom_page (no next item: the session is done)"""
+    if nextitem is None:
+        return False
+    items = session.items
+    start = items.index(nextitem) if nextitem in items else 0
+    return any("custom_page" in getattr(item, "fixturenames", ()) for item in items[start:])
+
+
+def setup_or_call_failed(node):
+    """True when a test's setup or body failed (fixture teardown runs after both)"""
+    return any(getattr(getattr(node, f"rep_{when}", None), "failed", False) for when in ("setup", "call"))
+
+
+@pytest.fixture(scope="function")
+def custom_page(request, shared_browser):
+    """
+    Fresh, isolated browser context and page for every test
+    
+    When the form page cache has a pre-warmed page ready, the test gets that
+    one (still its own context) and navigate_to_booking_page skips ahead.
     """
-    Simple function to find available dates for a room type
+    page = FORM_CACHE.acquire()
+    if page is None:
+        page = new_test_context(shared_browser).new_page()
+    yield page
+    FORM_CACHE.release(page)
+    if CAPTURE:
+        artifacts, overhead_ms = CAPTURE.finish(page, _waits.current_test, setup_or_call_failed(request.node))
+        request.node.user_properties.append(("capture_overhead_ms", round(overhead_ms, 1)))
+        if artifacts:
+            request.node.user_properties.append(("artifacts", artifacts))
+            print(f"Failure capture: {', '.join(ref['name'] for ref in artifacts)} saved to {ARTIFACT_DIR}")
+    page.context.close()
+    if ROUTING and ROUTING.test_summary(_waits.current_test):
+        print(ROUTING.test_summary(_waits.current_test))
+    
+    # Warm the next test's page while nothing else is running; this teardown
+    # time is still on the wall clock and is reported against the time skipped
+    if not getattr(request.node, "ui_tests_left", True):
+        return
+    set_current_test("<form cache warm-up>")
+    FORM_CACHE.refill(
+        lambda storage_state: new_test_context(shared_browser, storage_state),
+        lambda warm_page, key: open_booking_form(warm_page, key[0], *pick_booking_dates(*key))
+    )
+
+
+@pytest.fixture(scope="session")
+def api_client():
+    """Shared restful-booker client for API tests; no browser involved"""
+    return get_api_client()
+
+
+def bookings_wanted(item):
+    """Number of pooled bookings a test asks for with the bookings(n) marker"""
+    marker = item.get_closest_marker("bookings")
+    return marker.args[0] if marker and marker.args else 1
+
+
+@pytest.fixture(scope="session")
+def booking_pool(request, api_client):
+    """
+    Bookings for the whole session, created in one concurrent batch
+    
+    Sized from the bookings(n) markers of the selected tests (with parallel
+    workers every worker counts all of them; unused ones are cleaned up too).
+    Everything the pool created and no test deleted is deleted at the end.
+    """
+    global BOOKING_POOL
+    needed = sum(bookings_wanted(item) for item in request.session.items if "pooled_bookings" in item.fixturenames)
+    BOOKING_POOL = BookingPool(api_client, f"{run_id()}-{worker_id()}", BOOKING_POOL_CONCURRENCY)
+    BOOKING_POOL.provision(needed)
+    yield BOOKING_POOL
+    print(f"✓ Deleted {BOOKING_POOL.cleanup()} leftover pooled bookings")
+
+
+@pytest.fixture(scope="function")
+def pooled_bookings(request, booking_pool):
+    """Booking ids for this test only (bookings(n) marker, default 1)"""
+    return booking_pool.take(bookings_wanted(request.node))
+
+
+def reserve_worker_nights(room_type=1, nights=1, check_site=False):
+    """
+    First free stay for the room inside this worker's block of days
+    
+    Every worker owns days 1 .. WORKER_DATE_STRIDE-1 of its own block (day 0
+    is today for worker 0). Both date strategies claim from the same
+    availability calendar, so neither hands out a night the other already
+    gave away; check_site also skips nights the site has booked.
+    
+    Raises:
+        RuntimeError: when the block has no free window left for the room
+    """
+    first = date.today() + timedelta(days=worker_index() * WORKER_DATE_STRIDE + 1)
+    end = date.today() + timedelta(days=(worker_index() + 1) * WORKER_DATE_STRIDE)
+    try:
+        checkin, checkout = get_availability_calendar().reserve(room_type, nights, after=first, before=end,
+                                                                fetch=check_site)
+    except RuntimeError as e:
+        raise RuntimeError(f"Worker {worker_index()} ran out of its date block: {e}; "
+                           f"raise PW_WORKER_DATE_STRIDE") from e
+    return checkin.isoformat(), checkout.isoformat()
+
+
+def allocate_room_night(room_type=1):
+    """
+    Pick a one-night stay that no other worker, or earlier test, has been given
+    
+    Moves one night further into the worker's block per call for the same room.
     
     Returns:
         tuple: (checkin_date, checkout_date) as strings in YYYY-MM-DD format
     """
-    # Default fallback dates (current working approach)
-    base_date = datetime.now() + timedelta(days=1)  # Tomorrow
-    checkin = base_date.strftime("%Y-%m-%d")
-    checkout = (base_date + timedelta(days=1)).strftime("%Y-%m-%d")
+    return reserve_worker_nights(room_type)
+
+
+def find_available_room_dates(room_type=1, check_api=False, nights=1):
+    """
+    Find available dates for a room type
     
-    if check_api:
-        print(f"Checking API for Room {room_type} availability...")
-        try:
-            import requests
-            
-            # Simple API check - look for bookings on our proposed dates
-            api_url = f"https://restful-booker.herokuapp.com/booking?checkin={checkin}"
-            response = requests.get(api_url, timeout=5)
-            
-            if response.status_code == 200:
-                bookings = response.json()
-                if bookings:  # If bookings found, try next day
-                    print(f"Found {len(bookings)} booking(s) on {checkin}, trying next day...")
-                    base_date = base_date + timedelta(days=1)
-                    checkin = base_date.strftime("%Y-%m-%d")
-                    checkout = (base_date + timedelta(days=1)).strftime("%Y-%m-%d")
-                    print(f"Using {checkin} to {checkout} instead")
-                else:
-                    print(f"No conflicts found for {checkin}")
-            else:
-                print(f"API check failed (status {response.status_code}), using fallback dates")
-                
-        except Exception as e:
-            print(f"API check failed ({e}), using fallback dates")
+    With check_api the session's availability calendar (fetched once, then
+    indexed per room) hands out the first free window in this worker's block
+    of days that the site has not booked and no other test has been given.
+    
+    Returns:
+        tuple: (checkin_date, checkout_date) as strings in YYYY-MM-DD format
+    """
+    if not check_api:
+        # Default fallback dates, from tomorrow inside this worker's block of days
+        checkin, checkout = allocate_room_night(room_type)
+    else:
+        print(f"Checking availability calendar for Room {room_type}...")
+        checkin, checkout = reserve_worker_nights(room_type, nights, check_site=True)
     
     print(f"Selected dates for Room {room_type}: {checkin} to {checkout}")
     return checkin, checkout
 
 
-def navigate_to_booking_page(page: Page, room_type=1, check_api=False):
-    """
-    Navigate to reservation page with optional room availability checking
-    UNCHANGED behavior when called without parameters
-    """
+def pick_booking_dates(room_type=1, check_api=False):
+    """Dates navigate_to_booking_page books for: API-checked or fallback"""
     if check_api:
         # Using Room Availability Checker
         checkin, checkout = find_available_room_dates(room_type, check_api=True)
-        reservation_url = f"https://automationintesting.online/reservation/{room_type}?checkin={checkin}&checkout={checkout}"
-        print(f"Using API-checked dates for Room {room_type}: {reservation_url}")
+        print(f"Using API-checked dates for Room {room_type}: {checkin} to {checkout}")
     else:
         # Fallback Logic
         print("Using fallback date strategy...")
-        base_date = datetime.now() + timedelta(days=30)  # 30 days in future
-        checkin = base_date.strftime("%Y-%m-%d")
-        checkout = (base_date + timedelta(days=1)).strftime("%Y-%m-%d")
-        reservation_url = f"https://automationintesting.online/reservation/{room_type}?checkin={checkin}&checkout={checkout}"
-    
+        checkin, checkout = allocate_room_night(room_type)
+    return checkin, checkout
+
+
+def open_booking_form(page: Page, room_type, checkin, checkout):
+    """Open the reservation page and reveal the booking form; returns the dates"""
     print(f"Using dates: {checkin} to {checkout}")
     
-    #
-    page.goto(reservation_url)
-    page.wait_for_timeout(2000)
+    goto_and_wait(page, reservation_url(room_type, checkin, checkout), ready_selector=RESERVE_BUTTON)
     
     print("Clicking Reserve Now to reveal booking form...")
-    reserve_button = page.locator("button:has-text('Reserve Now')").first
+    reserve_button = page.locator(RESERVE_BUTTON).first
     reserve_button.click()
-    page.wait_for_timeout(2000)
+    wait_for_visible(page, FORM_FIELD.format("firstname"))
     
-    print("Booking form should now be visible")
+    print("Booking form is visible")
+    return checkin, checkout
 
 
+@timed("navigation")
+def navigate_to_booking_page(page: Page, room_type=1, check_api=False):
+    """
+    Navigate to reservation page with optional room availability checking
+    UNCHANGED behavior when called without parameters
+    
+    Pages handed out ready by the form page cache are already on the form,
+    so navigation is skipped for them. Returns the (checkin, checkout) used.
+    """
+    trace_step(page, "navigate")
+    entry = FORM_CACHE.claim(page, (room_type, check_api), test=_waits.current_test)
+    if entry:
+        print(f"Booking form already open from cache (Room {room_type}, {entry.dates[0]} to {entry.dates[1]}), "
+              f"skipped {entry.warm_ms:.0f} ms of navigation")
+        return entry.dates
+    
+    checkin, checkout = pick_booking_dates(room_type, check_api)
+    return open_booking_form(page, room_type, checkin, checkout)
+
+
+@timed("form_fill")
 def fill_booking_form(page: Page, firstname="John", lastname="Doe", email="john.doe@example.com", phone=None):
     """Fill booking form using exact selectors discovered from exploration"""
+    trace_step(page, "fill")
     # Generate unique phone if not provided
     if phone is None:
         phone = generate_unique_phone()
@@ -109,28 +582,76 @@ def fill_booking_form(page: Page, firstname="John", lastname="Doe", email="john.
     print(f"Filling booking form - Name: {firstname} {lastname}, Email: {email}, Phone: {phone}")
     
     # Use exact selectors from the exploration
-    page.locator("input[name='firstname']").fill(firstname)
-    page.locator("input[name='lastname']").fill(lastname)
+    page.locator(FORM_FIELD.format("firstname")).fill(firstname)
+    page.locator(FORM_FIELD.format("lastname")).fill(lastname)
     
     # Only fill email if provided (for missing email test)
     if email:
-        page.locator("input[name='email']").fill(email)
+        page.locator(FORM_FIELD.format("email")).fill(email)
     
-    page.locator("input[name='phone']").fill(phone)
+    page.locator(FORM_FIELD.format("phone")).fill(phone)
     
     print("Form filled successfully")
-    page.wait_for_timeout(1000)
+    # fill() returns once the value is set, so the old settle sleep is gone
+    record_wait("form_fill", 0)
     
     return phone  
 
 
+@timed("form_fill")
 def submit_booking_form(page: Page):
     """Submit the booking form"""
+    trace_step(page, "submit")
     print("Submitting booking form...")
     
     # Use the exact selector from page analyzer
-    submit_button = page.locator("button.btn.btn-primary.w-100.mb-3")
-    submit_button.click()
+    submit_button = page.locator(SUBMIT_BUTTON)
+    click_and_wait_for_booking_post(page, submit_button)
+    
+    print("Form submitted")
+
+# Assertions
+
+# Short whitespace-collapsed excerpt of the scope's rendered text for failure messages
+SCOPE_EXCERPT_JS = """
+([scope, limit]) => {
+  const nodes = Array.from(document.querySelectorAll(scope));
+  if (!nodes.length) return null;
+  const text = nodes.map((el) => el.innerText || "").join(" ").replace(/\\s+/g, " ").trim();
+  return text.length > limit ? text.slice(0, limit) + "..." : text;
+}
+"""
+
+
+def page_text_excerpt(page: Page, scope="body", limit=300):
+    """What the scope currently shows, trimmed for an assertion message"""
+    try:
+        excerpt = page.evaluate(SCOPE_EXCERPT_JS, [scope, limit])
+    except Exception as e:  # page closed or navigating
+        return f"<no excerpt: {e}>"
+    return f"<nothing matches '{scope}'>" if excerpt is None else excerpt
+
+
+@timed("assertion")
+def assert_text_visible(page: Page, text, scope="body", timeout_ms=None):
+    """
+    Assert that text (case-insensitive) shows up inside scope
+    
+    The check runs in the page and returns as soon as the text is rendered;
+    on timeout the assertion message carries an excerpt of what the scope
+    showed instead of the full HTML.
+    """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+    trace_step(page, "assert")
     
-    page.wait_for_timeout(2000)
-    print("Form submitted")
\ No newline at end of file
+    timeout_ms = timeout_ms or ASSERT_TIMEOUT_MS
+    start = time.perf_counter()
+    try:
+        page.wait_for_function(TEXT_IN_SCOPE_JS, arg=[scope, text.lower()], timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        record_wait("result_text", (time.perf_counter() - start) * 1000, met=False)
+        raise AssertionError(
+            f"Expected '{text}' in '{scope}' within {timeout_ms} ms; it shows: '{page_text_excerpt(page, scope)}'"
+        ) from None
+    record_wait("result_text", (time.perf_counter() - start) * 1000)
+    print(f"Found '{text}' in '{scope}'")
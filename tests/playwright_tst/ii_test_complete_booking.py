@@ -1,10 +1,15 @@
 # TEST 2: COMPLETE BOOKING
 
-from playwright.sync_api import Page
-from conftest import navigate_to_booking_page, fill_booking_form, submit_booking_form
+import pytest
+from typing import TYPE_CHECKING
+from conftest import navigate_to_booking_page, fill_booking_form, submit_booking_form, assert_text_visible
 
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
 
-def test_booking_with_complete_information_success(custom_page: Page):
+
+@pytest.mark.ui
+def test_booking_with_complete_information_success(custom_page: "Page"):
     """Test complete booking shows confirmation"""
     
     print("\n" + "="*60)
@@ -18,14 +23,8 @@ def test_booking_with_complete_information_success(custom_page: Page):
     submit_booking_form(custom_page)
     
     # Check for confirmation
-    custom_page.wait_for_timeout(3000)
-    page_content = custom_page.content().lower()
-    
-    booking_confirmed = "booking confirmed" in page_content
-    
-    print(f"Booking confirmation found: {booking_confirmed}")
+    assert_text_visible(custom_page, "Booking Confirmed")
     
-    assert booking_confirmed, "Expected 'Booking Confirmed' message but none found"
     print("✓ TEST PASSED: Booking confirmed successfully")
 
 
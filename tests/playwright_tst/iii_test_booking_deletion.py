@@ -1,62 +1,36 @@
 # TEST 3: BOOKING DELETION
 
-import requests
-from playwright.sync_api import Page
+import pytest
+from _api_client import get_api_client
+from _timing import timed
 
 
-def get_auth_token():
-    """Get authentication token for deletion"""
+@timed("network")
+def get_auth_token(client=None):
+    """Get authentication token for deletion (cached by the shared API client)"""
     try:
-        auth_url = "https://restful-booker.herokuapp.com/auth"
-        auth_data = {"username": "admin", "password": "password123"}
-        response = requests.post(auth_url, json=auth_data, timeout=10)
-        
-        if response.status_code == 200:
-            token = response.json().get("token")
+        token = (client or get_api_client()).get_token()
+        if token:
             print(f"✓ Got auth token: {token}")
-            return token
-        else:
-            print(f"✗ Auth failed: {response.status_code}")
-            return None
+        return token
     except Exception as e:
         print(f"✗ Auth error: {e}")
         return None
 
 
-def get_first_booking_id():
-    """Get the first booking ID from the API"""
-    try:
-        bookings_url = "https://restful-booker.herokuapp.com/booking"
-        response = requests.get(bookings_url, timeout=10)
-        
-        if response.status_code == 200:
-            bookings = response.json()
-            if bookings and len(bookings) > 0:
-                first_booking_id = bookings[0]["bookingid"]
-                print(f"✓ Found first booking ID: {first_booking_id}")
-                return first_booking_id
-            else:
-                print("✗ No bookings found in API")
-                return None
-        else:
-            print(f"✗ Failed to get bookings: {response.status_code}")
-            return None
-    except Exception as e:
-        print(f"✗ Error getting bookings: {e}")
-        return None
-
-
-def delete_booking_by_id(booking_id):
+@timed("network")
+def delete_booking_by_id(booking_id, client=None):
     """Delete a specific booking by ID"""
-    token = get_auth_token()
+    client = client or get_api_client()
+    token = get_auth_token(client)
     if not token:
         return False, "Could not get auth token"
     
     try:
-        delete_url = f"https://restful-booker.herokuapp.com/booking/{booking_id}"
-        headers = {"Cookie": f"token={token}"}
-        
-        response = requests.delete(delete_url, headers=headers, timeout=10)
+        # Re-authenticates once by itself if the cached token is rejected
+        response = client.delete_booking(booking_id)
+        if response is None:
+            return False, "Could not get auth token"
         
         if response.status_code in [200, 201]:
             print(f"✓ Successfully deleted booking {booking_id}")
@@ -70,34 +44,34 @@ def delete_booking_by_id(booking_id):
         return False, f"Delete error: {e}"
 
 
-def test_delete_booking(custom_page: Page):
-    """Test deleting a booking via API"""
+@pytest.mark.api
+@pytest.mark.bookings(1)
+def test_delete_booking(api_client, booking_pool, pooled_bookings):
+    """Test deleting a booking via API (no browser needed)"""
     
     print("\n" + "="*60)
     print("TEST 3: Testing booking deletion via API")
     print("="*60)
     
-    # Step 1: Get first booking ID from API
-    print("Step 1: Getting first booking ID from API...")
-    booking_id = get_first_booking_id()
+    # Step 1: Take a booking this session created for the test, never someone else's
+    print("Step 1: Taking a pre-provisioned booking from the pool...")
+    assert pooled_bookings, f"No pooled booking available: {booking_pool.failures[-1:]}"
+    booking_id = pooled_bookings[0]
+    print(f"✓ Got pooled booking ID: {booking_id}")
     
-    if booking_id:
-        # Step 2: Delete the booking
-        print(f"Step 2: Attempting to delete booking {booking_id}...")
-        deletion_success, deletion_message = delete_booking_by_id(booking_id)
-        
-        print(f"Deletion result: {deletion_message}")
-        
-        # Test assertion
-        if deletion_success:
-            print("✓ TEST PASSED: Booking deletion successful")
-            assert True, "Successfully deleted a booking via API"
-        else:
-            print("✗ TEST FAILED: Could not delete booking")
-            assert False, f"Deletion failed: {deletion_message}"
+    # Step 2: Delete the booking
+    print(f"Step 2: Attempting to delete booking {booking_id}...")
+    deletion_success, deletion_message = delete_booking_by_id(booking_id, api_client)
+    
+    print(f"Deletion result: {deletion_message}")
+    
+    # Test assertion
+    if deletion_success:
+        booking_pool.mark_deleted(booking_id)
+        print("✓ TEST PASSED: Booking deletion successful")
     else:
-        print("⚠ TEST SKIPPED: No bookings available to delete")
-        assert True, "Test skipped - no bookings found"
+        print("✗ TEST FAILED: Could not delete booking")
+    assert deletion_success, f"Deletion failed: {deletion_message}"
     
     print("="*60)
 
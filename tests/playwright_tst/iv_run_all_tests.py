@@ -1,55 +1,195 @@
 # RUNNING ALL TESTS
 
+import argparse
+import os
 import pytest
+import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from _cassette import reset_cassette
+from _config import LOG_DIR, RESULTS_DIR, CASSETTE_MODE
 
+# Test files to run
+TEST_FILES = [
+    "i_test_missing_email.py",
+    "ii_test_complete_booking.py",
+    "iii_test_booking_deletion.py",
+]
 
-def run_all_tests():
-    """Run all simplified UI automation tests"""
-    
-    print("="*60)
-    print("BOOKING AUTOMATION TEST SUITE")
-    print("="*60)
-    print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print()
-    
-    # Test files to run
-    test_files = [
-        "i_test_missing_email.py",
-        "ii_test_complete_booking.py", 
-        "iii_test_booking_deletion.py"
-    ]
-    
-    # Run the tests
+# Checks of the suite's own tooling; run with --self-test, never part of a suite run or benchmark
+SELF_TEST_FILES = ["ix_test_tooling.py"]
+
+# Extra pytest arguments per lane; the api lane never loads the Playwright plugin
+LANE_ARGS = {
+    "all": [],
+    "api": ["-m", "api", "-p", "no:playwright"],
+    "ui": ["-m", "ui"],
+}
+
+
+def lane_pytest_args(lane, workers=1, changed_only=False):
+    """pytest arguments for one lane"""
+    # Results stream to log/results/<run id>/ as each test finishes (conftest)
     pytest_args = [
-        *test_files,
+        *TEST_FILES,
+        *LANE_ARGS[lane],
         "-v",           # Verbose output
         "-s",           # Show print statements
         "--tb=short",   # Short traceback format
-        "--html=test_report.html",
-        "--self-contained-html"
     ]
-    
-    print("Running tests...")
+    # API tests are a handful of HTTP calls, only the browser lane is worth spreading out
+    if str(workers) != "1" and lane != "api":
+        # One browser per worker process; conftest packs the tests into one
+        # duration-balanced group per worker from the run history
+        pytest_args += ["-n", str(workers), "--dist", "loadgroup"]
+    if changed_only:
+        pytest_args.append("--changed-only")
+    return pytest_args
+
+
+def run_lane_subprocess(lane, workers, lane_run_id, changed_only=False):
+    """Run one lane in its own pytest process; returns (lane, exit code, seconds, log path)"""
+    pytest_args = lane_pytest_args(lane, workers, changed_only)
+    log_path = os.path.join(LOG_DIR, "lanes", f"{lane}.log")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        result = subprocess.run(
+            [sys.executable, "-m", "pytest", *pytest_args],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            env={**os.environ, "PW_RUN_ID": lane_run_id},
+        )
+    return lane, result.returncode, time.perf_counter() - start, log_path
+
+
+def run_split_lanes(workers, stamp, changed_only=False):
+    """Run the api and ui lanes at the same time in separate processes, run ids <stamp>-<lane>"""
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(lambda lane: run_lane_subprocess(lane, workers, f"{stamp}-{lane}", changed_only),
+                                ["api", "ui"]))
+
+    exit_code = 0
+    for lane, lane_exit, seconds, log_path in results:
+        # pytest exits with 5 when a lane has no tests, which is not a failure here
+        failed = lane_exit not in (0, 5)
+        status = f"FAILED (exit {lane_exit})" if failed else "ok"
+        print(f"{'✗' if failed else '✓'} {lane} lane: {status} in {seconds:.1f} s, "
+              f"results {os.path.join(RESULTS_DIR, f'{stamp}-{lane}')}, output {log_path}")
+        if failed:
+            with open(log_path, encoding="utf-8") as f:
+                print("".join(f.readlines()[-40:]))
+            exit_code = lane_exit
+    return exit_code
+
+
+def run_self_tests():
+    """Run the tooling self-tests against the stand-in, without Playwright and without touching the run history"""
+    print("="*60)
+    print("SUITE TOOLING SELF-TESTS")
+    print("="*60)
+    os.environ["BOOKING_STAND_IN"] = "1"
+    return pytest.main([*SELF_TEST_FILES, "-p", "no:playwright", "--no-history", "-v", "-s", "--tb=short"])
+
+
+def run_all_tests(workers=1, local=False, lane="all", changed_only=False, html=False):
+    """
+    Run all simplified UI automation tests
+
+    With workers > 1 (or "auto") the tests are spread over that many
+    pytest-xdist worker processes, each with its own browser. Results from
+    every worker are merged into the single HTML report.
+
+    With local=True the suite runs against the in-memory stand-in server
+    (_stand_in_server.py) instead of the public demo site and API.
+
+    lane picks the tests by marker: "api" runs only the API tests without
+    starting Playwright, "ui" only the browser tests, and "split" runs both
+    lanes side by side in separate processes with results each.
+
+    The order of TEST_FILES does not matter: conftest runs the tests that
+    failed last time first, then the longest ones (log/run_history.json).
+    With changed_only=True only tests that failed last time or whose code
+    changed since they last passed are run.
+
+    Results are streamed to log/results/<run id>/ (results.jsonl and
+    junit.xml) while the tests run; html=True renders report.html from them
+    afterwards, the same as viii_render_report.py does on demand.
+    """
+
+    print("="*60)
+    print("BOOKING AUTOMATION TEST SUITE")
+    print("="*60)
+    print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print()
+
+    if local:
+        os.environ["BOOKING_STAND_IN"] = "1"  # conftest starts the stand-in server
+
+    target = "local stand-in" if local else "public demo"
+    print(f"Running tests (workers: {workers}, target: {target}, lane: {lane})...")
     print("-" * 60)
+
+    if CASSETTE_MODE in ("record", "replay"):
+        print(f"Cassette: {CASSETTE_MODE} (PW_CASSETTE_MODE)")
+        reset_cassette()  # once for all lanes and workers; only does something when recording
     
-    exit_code = pytest.main(pytest_args)
-    
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    if lane == "split":
+        exit_code = run_split_lanes(workers, stamp, changed_only)
+        run_ids = [f"{stamp}-api", f"{stamp}-ui"]
+    else:
+        run_ids = [stamp if lane == "all" else f"{stamp}-{lane}"]
+        os.environ["PW_RUN_ID"] = run_ids[0]
+        exit_code = pytest.main(lane_pytest_args(lane, workers, changed_only))
+        if changed_only and exit_code == pytest.ExitCode.NO_TESTS_COLLECTED:
+            print("Nothing changed since the last passing run")
+            exit_code = 0
+
     print("-" * 60)
     print(f"Completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    
+
     if exit_code == 0:
         print("All tests passed!")
     else:
         print("Some tests failed or had issues")
-    
-    print("Report: test_report.html")
+
+    result_dirs = [os.path.join(RESULTS_DIR, run_id) for run_id in run_ids]
+    result_dirs = [path for path in result_dirs if os.path.exists(os.path.join(path, "results.jsonl"))]
+    for path in result_dirs:
+        print(f"Results: {path}")
+    if html and result_dirs:
+        from viii_render_report import render_report
+        print(f"Report: {render_report(result_dirs)}")
     print("="*60)
-    
+
     return exit_code
 
 
+def parse_args():
+    """Command line options for the runner"""
+    parser = argparse.ArgumentParser(description="Run the booking automation test suite")
+    parser.add_argument("-n", "--workers", default="1",
+                        help="Number of parallel worker processes, or 'auto' (default: 1)")
+    parser.add_argument("--local", action="store_true",
+                        help="Run against the local stand-in server instead of the public demo")
+    parser.add_argument("--lane", choices=["all", "api", "ui", "split"], default="all",
+                        help="Tests to run by marker; 'split' runs the api and ui lanes in parallel (default: all)")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="Only run tests that failed last time or whose code changed since they last passed")
+    parser.add_argument("--html", action="store_true", help="Render report.html from the results after the run")
+    parser.add_argument("--self-test", action="store_true",
+                        help="Only run the suite tooling self-tests (ix_test_tooling.py)")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    exit_code = run_all_tests()
+    args = parse_args()
+    if args.self_test:
+        sys.exit(run_self_tests())
+    exit_code = run_all_tests(workers=args.workers, local=args.local, lane=args.lane,
+                              changed_only=args.changed_only, html=args.html)
     sys.exit(exit_code)
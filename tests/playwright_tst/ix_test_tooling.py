@@ -0,0 +1,291 @@
+# TEST 9: SUITE TOOLING (no browser needed)
+#
+# Checks of the scheduling, availability, cassette, failure capture and
+# browser daemon plumbing against the local stand-in server, run in child pytest processes
+# or with stand-in browser servers so nothing here needs network or an
+# installed browser.
+
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import types
+import pytest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Settings a child run must not inherit from this run
+PARENT_ONLY_ENV = ("PW_RUN_ID", "PYTEST_XDIST_WORKER", "PYTEST_XDIST_WORKER_COUNT",
+                   "BOOKING_SITE_URL", "BOOKING_API_URL", "PW_CASSETTE_MODE", "PYTEST_ADDOPTS")
+
+
+def child_env(tmp_path, **extra):
+    """Environment for a child pytest run that writes only below tmp_path"""
+    env = {key: value for key, value in os.environ.items() if key not in PARENT_ONLY_ENV}
+    env.update({
+        "BOOKING_STAND_IN": "1",
+        "PW_RUN_HISTORY": str(tmp_path / "run_history.json"),
+        "PW_RESULTS_DIR": str(tmp_path / "results"),
+        "PW_ARTIFACT_DIR": str(tmp_path / "artifacts"),
+        "PW_TRACE_FILE": str(tmp_path / "spans.jsonl"),
+    }, **extra)
+    return env
+
+
+@pytest.mark.api
+def test_loadgroup_packs_tests_per_worker(tmp_path):
+    """With -n 2 --dist loadgroup every test lands in a pack<N> group; history keeps the plain node id"""
+    print("\n" + "="*60)
+    print("TEST 9a: Duration-balanced packing under --dist loadgroup")
+    print("="*60)
+
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "iii_test_booking_deletion.py", "-m", "api", "-p", "no:playwright",
+         "-n", "2", "--dist", "loadgroup", "-v", "-p", "no:cacheprovider"],
+        cwd=TEST_DIR, env=child_env(tmp_path), capture_output=True, text=True, timeout=180,
+    )
+    print(result.stdout[-2000:])
+    assert result.returncode == 0, result.stdout[-2000:] + result.stderr[-2000:]
+    assert re.search(r"iii_test_booking_deletion\.py::test_delete_booking@pack\d+", result.stdout), \
+        "No @pack<N> node id: packing groups were not applied"
+
+    with open(tmp_path / "run_history.json", encoding="utf-8") as f:
+        tests = json.load(f)["tests"]
+    assert any(nodeid.endswith("iii_test_booking_deletion.py::test_delete_booking") for nodeid in tests), list(tests)
+    assert not any("@" in nodeid for nodeid in tests), list(tests)
+    print("✓ TEST PASSED: tests packed into groups, history keyed by plain node id")
+
+
+@pytest.mark.api
+def test_run_history_merges_parallel_saves(tmp_path):
+    """Two runs loaded from the same history each keep their own tests when both save"""
+    print("\n" + "="*60)
+    print("TEST 9b: Run history merge on save")
+    print("="*60)
+    from _run_history import RunHistory
+
+    path = str(tmp_path / "run_history.json")
+    api_lane, ui_lane = RunHistory(path), RunHistory(path)
+    api_lane.record("api.py::test_a", 120.0, "passed")
+    ui_lane.record("ui.py::test_b", 4500.0, "failed")
+    api_lane.save()
+    ui_lane.save()
+
+    tests = RunHistory(path).tests
+    assert set(tests) == {"api.py::test_a", "ui.py::test_b"}, list(tests)
+    assert tests["ui.py::test_b"]["outcome"] == "failed"
+    assert not os.path.exists(path + ".lock")
+    print("✓ TEST PASSED: both lanes kept in the history")
+
+
+# Stand-in for `playwright launch-server`: listens on a port and prints a ws:// endpoint
+FAKE_SERVER = ("import socket, time; s = socket.socket(); s.bind(('127.0.0.1', 0)); s.listen(); "
+               "print(f'ws://127.0.0.1:{s.getsockname()[1]}/fake', flush=True); time.sleep(600)")
+
+
+def fake_launch(server):
+    server.process = subprocess.Popen([sys.executable, "-c", FAKE_SERVER], stdout=subprocess.PIPE, text=True)
+    server.ws_endpoint = server.process.stdout.readline().strip()
+    return server
+
+
+class FakeItem:
+    def __init__(self, nodeid):
+        self.nodeid = nodeid
+
+
+@pytest.mark.api
+def test_pack_groups_balances_known_durations(tmp_path):
+    """LPT packing: longest first, each to the least loaded group; unknown tests count as the median"""
+    print("\n" + "="*60)
+    print("TEST 9c: Duration-balanced packing")
+    print("="*60)
+    from _run_history import RunHistory, pack_groups, order_items
+
+    history = RunHistory(str(tmp_path / "run_history.json"))
+    for nodeid, duration_ms in {"a": 8000, "b": 7000, "c": 6000, "d": 5000, "e": 4000}.items():
+        history.record(nodeid, duration_ms, "passed")
+    history.record("f", 100, "failed")
+    items = [FakeItem(nodeid) for nodeid in "abcdefg"]  # g has no history: median 6000
+
+    groups = pack_groups(items, history, 2)
+    loads = [0, 0]
+    for item in items:
+        loads[groups[item.nodeid]] += history.duration_ms(item.nodeid, history.typical_duration_ms())
+    # a 8000, b 7000, c/g 6000, d 5000, e 4000, f 100 -> 18100 and 18000
+    assert sorted(loads) == [18000, 18100], loads
+    assert groups["a"] != groups["b"]
+    assert set(pack_groups(items, history, 1).values()) == {0}
+
+    order = [item.nodeid for item in order_items(items, history)]
+    assert order[0] == "f" and order[1] == "a", order
+    print(f"✓ TEST PASSED: group loads {loads}, order {order}")
+
+
+@pytest.mark.api
+def test_room_intervals_match_brute_force():
+    """Merged intervals and first_free agree with a plain set of booked days"""
+    print("\n" + "="*60)
+    print("TEST 9d: Availability interval index")
+    print("="*60)
+    from _availability import RoomIntervals
+
+    rng = random.Random(7)
+    for _ in range(500):
+        index, booked = RoomIntervals(), set()
+        for _ in range(rng.randint(0, 12)):
+            start = rng.randint(0, 80)
+            end = start + rng.randint(0, 6)
+            index.add(start, end)
+            booked.update(range(start, end))
+        assert all(a < b for a, b in zip(index.ends, index.starts[1:])), "intervals overlap or touch"
+        for _ in range(5):
+            nights, after = rng.randint(1, 4), rng.randint(0, 90)
+            expected = next(day for day in range(after, 200)
+                            if not booked.intersection(range(day, day + nights)))
+            assert index.first_free(nights, after) == expected, (sorted(booked), nights, after)
+    print("✓ TEST PASSED: 500 random calendars agree with brute force")
+
+
+@pytest.mark.api
+def test_calendar_shares_nights_and_respects_bounds():
+    """Windows handed out without the site and with it come from one index, inside the bound"""
+    print("\n" + "="*60)
+    print("TEST 9e: Availability calendar bounds")
+    print("="*60)
+    from datetime import date, timedelta
+    from _availability import AvailabilityCalendar
+
+    today = date.today()
+    day = lambda n: today + timedelta(days=n)
+    # The site has nights 3 and 4 booked
+    calendar = AvailabilityCalendar(fetch_intervals=lambda room: [(day(3).toordinal(), day(5).toordinal())])
+
+    assert calendar.reserve(1, after=day(1), before=day(6), fetch=False) == (day(1), day(2))
+    assert calendar.reserve(1, after=day(1), before=day(6), fetch=False) == (day(2), day(3))
+    assert calendar.reserve(1, after=day(1), before=day(6)) == (day(5), day(6))
+    with pytest.raises(RuntimeError):
+        calendar.reserve(1, after=day(1), before=day(6))
+    with pytest.raises(RuntimeError):
+        calendar.reserve(1, after=day(1), before=day(6), fetch=False)
+    assert calendar.reserve(2, nights=2, after=day(1)) == (day(1), day(3))
+    print("✓ TEST PASSED: no night handed out twice, none past the bound")
+
+
+@pytest.mark.api
+def test_daemon_default_acquire_is_warm(monkeypatch):
+    """A run with default settings gets the server the daemon warmed, whatever PW_HEADLESS says"""
+    print("\n" + "="*60)
+    print("TEST 9f: Browser daemon warms the headless setting clients use")
+    print("="*60)
+    import _browser_daemon
+    from _config import HEADLESS
+
+    monkeypatch.setattr(_browser_daemon.BrowserServer, "launch", fake_launch)
+    httpd, pool = _browser_daemon.start_daemon(port=0, warm=["firefox", "chromium:headed"])
+    try:
+        deadline = time.monotonic() + 20
+        while len(pool.status()["servers"]) < 2 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        keys = {(server["browser"], server["headless"]) for server in pool.status()["servers"]}
+        assert keys == {("firefox", HEADLESS), ("chromium", False)}, keys
+
+        lease = _browser_daemon.acquire_lease(f"http://127.0.0.1:{httpd.server_address[1]}", "firefox", HEADLESS)
+        assert lease is not None and lease.warm, "Default acquire launched a new server instead of the warm one"
+        lease.release()
+        print(f"✓ TEST PASSED: warm {'headless' if HEADLESS else 'headed'} firefox handed out ({lease.lease})")
+    finally:
+        httpd.shutdown()
+        pool.shutdown()
+
+
+@pytest.mark.api
+def test_cassette_keys_ignore_order_base_and_volatile_fields(monkeypatch):
+    """Requests that differ only in order, target base or ignored fields share one cassette key"""
+    print("\n" + "="*60)
+    print("TEST 9g: Cassette key normalisation")
+    print("="*60)
+    from _cassette import normalize_url, normalize_body, request_key
+
+    monkeypatch.setenv("BOOKING_SITE_URL", "http://127.0.0.1:8001")
+    monkeypatch.setenv("BOOKING_API_URL", "http://127.0.0.1:8002")
+    ignore = ("checkin", "phone")
+
+    # Either target base becomes {base}; query sorted, ignored parameters dropped
+    assert normalize_url("http://127.0.0.1:8001/reservation/1?b=2&checkin=2026-01-01&a=1", ignore) \
+        == "{base}/reservation/1?a=1&b=2"
+    assert normalize_url("http://127.0.0.1:8002/booking", ignore) == "{base}/booking"
+    assert normalize_url("http://127.0.0.1:8001", ignore) == "{base}/"
+    # Another host, or a port that only starts like the base, keeps its (lower-cased) origin
+    assert normalize_url("HTTPS://CDN.Example.com/app.js", ignore) == "https://cdn.example.com/app.js"
+    assert normalize_url("http://127.0.0.1:80010/x", ignore) == "http://127.0.0.1:80010/x"
+
+    # JSON: key order and ignored fields at any depth do not matter, other values do
+    first = normalize_body('{"firstname": "A", "bookingdates": {"checkin": "2026-01-01", "checkout": "x"}}', ignore)
+    second = normalize_body(b'{"bookingdates": {"checkout": "x", "checkin": "2027-05-05"}, "firstname": "A"}', ignore)
+    assert first == second == b'{"bookingdates":{"checkout":"x"},"firstname":"A"}'
+    assert normalize_body('{"firstname": "B"}', ignore) != normalize_body('{"firstname": "A"}', ignore)
+    # Form bodies sorted without ignored fields; other text and binary bodies untouched
+    assert normalize_body("phone=1&b=2&a=1", ignore) == b"a=1&b=2"
+    assert normalize_body("plain text, not a form", ignore) == b"plain text, not a form"
+    assert normalize_body(b"\xff\x00=", ignore) == b"\xff\x00="
+    assert normalize_body(None) == normalize_body("") == b""
+
+    key = request_key("post", "http://127.0.0.1:8002/booking?b=1&a=2", '{"x": 1, "phone": "555"}', ignore)
+    assert key == request_key("POST", "http://127.0.0.1:8002/booking?a=2&b=1", '{"phone": "777", "x": 1}', ignore)
+    assert key.startswith("POST {base}/booking?a=2&b=1 #")
+    assert key != request_key("POST", "http://127.0.0.1:8002/booking?a=2&b=1", '{"x": 2}', ignore)
+    assert request_key("get", "http://127.0.0.1:8001/") == "GET {base}/"
+    print(f"✓ TEST PASSED: {key}")
+
+
+class FakeContext:
+    """Browser context stand-in that lets a test fire context events"""
+
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def console(self, text):
+        self.handlers["console"](types.SimpleNamespace(type="log", text=text))
+
+
+@pytest.mark.api
+def test_capture_ring_buffer_bounds_entries_and_bytes():
+    """The capture log keeps the newest events within both the entry and the byte limit"""
+    print("\n" + "="*60)
+    print("TEST 9h: Failure capture ring buffer")
+    print("="*60)
+    from _failure_capture import ContextCapture
+
+    context = FakeContext()
+    capture = ContextCapture(context, max_events=5, max_buffer_bytes=10_000, trace=False)
+    for i in range(8):
+        context.console(f"message {i}")
+    texts = [json.loads(line)["text"] for line in capture.log_bytes().decode("utf-8").splitlines()]
+    assert texts == [f"message {i}" for i in range(3, 8)], texts
+    assert capture.dropped == 3
+    assert capture.buffer_bytes == sum(len(line) for _, line in capture.events)
+
+    # A large event pushes out older ones until the buffer fits the byte budget again
+    capture = ContextCapture(context, max_events=100, max_buffer_bytes=300, trace=False)
+    for i in range(4):
+        context.console(f"small {i}")
+    context.console("x" * 200)
+    assert capture.buffer_bytes <= 300 and capture.dropped > 0
+    assert capture.events[-1][0]["text"] == "x" * 200
+    assert capture.buffer_bytes == sum(len(line) for _, line in capture.events)
+    # One event over the whole budget is still kept, on its own
+    context.console("y" * 1000)
+    assert [event["text"] for event, _ in capture.events] == ["y" * 1000]
+    assert capture.dropped == 5
+    print(f"✓ TEST PASSED: newest events kept, {capture.dropped} dropped")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,259 @@
+# BENCHMARKING THE TEST SUITE
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from _config import LOG_DIR
+from _timing import percentile, read_spans
+from iv_run_all_tests import TEST_FILES
+
+SUITE = "(suite wall clock)"
+
+
+def run_suite_once(run_id, trace_file, env_overrides):
+    """
+    Run the suite in a fresh pytest process; returns (exit code, wall ms)
+
+    Run history, results and artifacts go to a throwaway folder, so benchmark
+    runs neither reorder each other nor touch the history of real runs.
+    """
+    env = dict(os.environ)
+    env.update(env_overrides)
+    env["PW_RUN_ID"] = run_id
+    env["PW_TRACE_FILE"] = trace_file
+    # Measure the real flow: no visible window and no artificial delay unless asked for
+    env.setdefault("PW_HEADLESS", "1")
+    env.setdefault("PW_SLOW_MO", "0")
+
+    with tempfile.TemporaryDirectory(prefix="pw-bench-") as scratch:
+        env["PW_RUN_HISTORY"] = os.path.join(scratch, "run_history.json")
+        env["PW_RESULTS_DIR"] = os.path.join(scratch, "results")
+        env["PW_ARTIFACT_DIR"] = os.path.join(scratch, "artifacts")
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-m", "pytest", *TEST_FILES, "-q", "-p", "no:cacheprovider"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        print(result.stdout[-2000:])
+    return result.returncode, wall_ms
+
+
+def summarize(spans, wall_times):
+    """p50/p95/max per test and per test phase across runs"""
+    per_run = {}  # (test, phase) -> {run_id: ms}
+    for entry in spans:
+        # Work between tests (e.g. "<form cache warm-up>") keeps its own row so its cost stays visible
+        test = entry["test"] or "<outside test>"
+        for key in ((test, "total"), (test, entry["phase"])):
+            runs = per_run.setdefault(key, {})
+            runs[entry["run_id"]] = runs.get(entry["run_id"], 0.0) + entry["self_ms"]
+    per_run[(SUITE, "total")] = dict(enumerate(wall_times))
+
+    stats = {}
+    for (test, phase), runs in sorted(per_run.items()):
+        values = list(runs.values())
+        stats.setdefault(test, {})[phase] = {
+            "p50": round(percentile(values, 50), 1),
+            "p95": round(percentile(values, 95), 1),
+            "max": round(max(values), 1),
+            "runs": len(values),
+        }
+    return stats
+
+
+def compare(stats, baseline, threshold_pct, min_delta_ms):
+    """Entries whose p50 grew by more than threshold_pct and min_delta_ms"""
+    regressions = []
+    for test, phases in stats.items():
+        for phase, current in phases.items():
+            before = baseline.get(test, {}).get(phase)
+            if not before:
+                continue
+            delta = current["p50"] - before["p50"]
+            limit = before["p50"] * threshold_pct / 100
+            if delta > limit and delta > min_delta_ms:
+                regressions.append((test, phase, before["p50"], current["p50"]))
+    return regressions
+
+
+def print_stats(stats, baseline):
+    print(f"{'TEST':<60} {'PHASE':<10} {'p50':>8} {'p95':>8} {'max':>8} {'base p50':>9}")
+    for test, phases in stats.items():
+        for phase, values in phases.items():
+            base = baseline.get(test, {}).get(phase, {}).get("p50")
+            base_text = f"{base:>9.0f}" if base is not None else f"{'-':>9}"
+            print(f"{test[-60:]:<60} {phase:<10} {values['p50']:>8.0f} {values['p95']:>8.0f} "
+                  f"{values['max']:>8.0f} {base_text}")
+
+
+def measure_capture_overhead(runs=5, local=False, target=None, api_target=None):
+    """
+    Suite wall clock and per-test p50 with the failure trace on and off
+
+    Runs alternate between PW_CAPTURE_TRACE=1 and =0 so drift on the target
+    hits both sides; the difference is what recording the trace costs,
+    including the browser-side work the per-test overhead numbers miss.
+    """
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    env_overrides = target_env(local, target, api_target)
+
+    print("="*60)
+    print("FAILURE TRACE OVERHEAD")
+    print("="*60)
+
+    stats = {}
+    for trace in ("1", "0"):
+        stats[trace] = {"trace_file": os.path.join(LOG_DIR, "benchmark", f"spans-{stamp}-trace{trace}.jsonl"),
+                        "run_ids": [], "wall_times": [], "failures": 0}
+    for i in range(runs):
+        for trace, side in stats.items():
+            run_id = f"bench-{stamp}-trace{trace}-{i + 1}"
+            exit_code, wall_ms = run_suite_once(run_id, side["trace_file"],
+                                                dict(env_overrides, PW_CAPTURE_TRACE=trace))
+            side["run_ids"].append(run_id)
+            side["wall_times"].append(wall_ms)
+            side["failures"] += exit_code != 0
+            print(f"Run {i + 1}/{runs} trace={trace}: {wall_ms:.0f} ms{'' if exit_code == 0 else ' FAILED'}")
+    for side in stats.values():
+        side["stats"] = summarize(read_spans(side["trace_file"], set(side["run_ids"])), side["wall_times"])
+
+    with_trace, without = stats["1"]["stats"], stats["0"]["stats"]
+    print("-" * 60)
+    print(f"{'TEST':<60} {'trace p50':>10} {'no trace':>10} {'overhead':>10}")
+    for test, phases in with_trace.items():
+        before = without.get(test, {}).get("total")
+        if not before:
+            continue
+        after = phases["total"]["p50"]
+        print(f"{test[-60:]:<60} {after:>10.0f} {before['p50']:>10.0f} {after - before['p50']:>+10.0f}")
+    print("-" * 60)
+    if stats["1"]["failures"] or stats["0"]["failures"]:
+        print("⚠ Some runs had failing tests (failed tests also write artifacts), compare with care")
+    return 0
+
+
+def target_env(local, target, api_target):
+    """Environment that points a suite run at the chosen target"""
+    env_overrides = {}
+    if local:
+        env_overrides["BOOKING_STAND_IN"] = "1"
+    if target:
+        env_overrides["BOOKING_SITE_URL"] = target
+        env_overrides["BOOKING_API_URL"] = api_target or target
+    return env_overrides
+
+
+def default_baseline_path(target_name):
+    """One baseline per target: log/benchmark_baseline-<target>.json"""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", re.sub(r"^https?://", "", target_name)).strip("_")
+    return os.path.join(LOG_DIR, f"benchmark_baseline-{slug}.json")
+
+
+def run_benchmark(runs=5, local=False, target=None, api_target=None, threshold_pct=20.0,
+                  min_delta_ms=100.0, baseline_path=None, update_baseline=False):
+    """Run the suite `runs` times and gate on regressions against the stored baseline"""
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    trace_file = os.path.join(LOG_DIR, "benchmark", f"spans-{stamp}.jsonl")
+
+    env_overrides = target_env(local, target, api_target)
+    target_name = "local stand-in" if local else (target or "public demo")
+    baseline_path = baseline_path or default_baseline_path(target_name)
+
+    print("="*60)
+    print("BOOKING SUITE BENCHMARK")
+    print("="*60)
+    print(f"Runs: {runs}  Target: {target_name}")
+
+    run_ids, wall_times, failures = [], [], 0
+    for i in range(runs):
+        run_id = f"bench-{stamp}-{i + 1}"
+        exit_code, wall_ms = run_suite_once(run_id, trace_file, env_overrides)
+        run_ids.append(run_id)
+        wall_times.append(wall_ms)
+        status = "ok" if exit_code == 0 else f"FAILED (exit {exit_code})"
+        print(f"Run {i + 1}/{runs}: {wall_ms:.0f} ms {status}")
+        failures += exit_code != 0
+
+    stats = summarize(read_spans(trace_file, set(run_ids)), wall_times)
+
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path, encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored.get("target") != target_name and not update_baseline:
+            print(f"✗ Baseline {baseline_path} was measured against {stored.get('target')}, not {target_name}; "
+                  f"timings are not comparable (use another --baseline or --update-baseline)")
+            return 2
+        baseline = stored.get("stats", {})
+
+    print("-" * 60)
+    print_stats(stats, baseline)
+    print("-" * 60)
+
+    if failures:
+        print(f"✗ {failures} run(s) had failing tests, timings are not comparable")
+        return 1
+
+    if not baseline or update_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump({"created": stamp, "target": target_name, "runs": runs, "stats": stats}, f, indent=2)
+        print(f"✓ Baseline saved: {baseline_path}")
+        return 0
+
+    regressions = compare(stats, baseline, threshold_pct, min_delta_ms)
+    if regressions:
+        print(f"✗ REGRESSIONS (p50 more than {threshold_pct:.0f}% and {min_delta_ms:.0f} ms slower than baseline):")
+        for test, phase, before, after in regressions:
+            growth = (after - before) / before * 100 if before else float("inf")
+            print(f"  {test[-60:]:<60} {phase:<10} {before:>8.0f} ms -> {after:>8.0f} ms (+{growth:.0f}%)")
+        return 1
+
+    print(f"✓ No regressions against baseline ({baseline_path})")
+    return 0
+
+
+def parse_args():
+    """Command line options for the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark the booking test suite against a stored baseline")
+    parser.add_argument("-k", "--runs", type=int, default=5, help="Number of suite runs (default: 5)")
+    parser.add_argument("--local", action="store_true", help="Run against the local stand-in server")
+    parser.add_argument("--target", help="Booking site base URL to run against")
+    parser.add_argument("--api-target", help="restful-booker base URL (defaults to --target)")
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="Allowed p50 growth in percent before failing (default: 20)")
+    parser.add_argument("--min-delta-ms", type=float, default=100.0,
+                        help="Ignore p50 changes smaller than this many ms (default: 100)")
+    parser.add_argument("--baseline", help="Baseline file (default: log/benchmark_baseline-<target>.json)")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--capture-overhead", action="store_true",
+                        help="Compare runs with and without the failure trace (PW_CAPTURE_TRACE) instead")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.capture_overhead:
+        sys.exit(measure_capture_overhead(args.runs, args.local, args.target, args.api_target))
+    exit_code = run_benchmark(
+        runs=args.runs,
+        local=args.local,
+        target=args.target,
+        api_target=args.api_target,
+        threshold_pct=args.threshold,
+        min_delta_ms=args.min_delta_ms,
+        baseline_path=args.baseline,
+        update_baseline=args.update_baseline,
+    )
+    sys.exit(exit_code)
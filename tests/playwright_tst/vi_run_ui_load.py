@@ -0,0 +1,216 @@
+# UI LOAD: VIRTUAL USERS DRIVING THE BOOKING FLOW
+#
+# Every virtual user repeats open reservation page -> reveal form -> fill ->
+# submit -> confirmation in its own browser context. Contexts share a few
+# browsers, users start spread over the ramp-up and stop at the end of the
+# duration. Stays come from the availability calendar, so bookings left by
+# earlier runs (the site has no API to delete them) are skipped instead of
+# being booked again.
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from _availability import get_availability_calendar
+from _config import BROWSER_NAME, LOG_DIR, VIEWPORT, NAVIGATION_TIMEOUT_MS, FORM_TIMEOUT_MS, ASSERT_TIMEOUT_MS
+from _timing import percentile
+from _booking_page import RESERVE_BUTTON, FORM_FIELD, SUBMIT_BUTTON, CONFIRMATION_TEXT, TEXT_IN_SCOPE_JS
+from _booking_page import reservation_url, generate_unique_phone
+
+# Timed steps of one booking, in flow order
+STEPS = ("page_load", "form_reveal", "submit_to_confirmation")
+
+
+class LoadStats:
+    """Step latencies, completed bookings and errors of one load run"""
+
+    def __init__(self):
+        self.latencies = {step: [] for step in STEPS}
+        self.iterations = 0
+        self.completed = 0
+        self.errors = {}  # (step, error type) -> count
+
+    def record(self, step, ms):
+        self.latencies[step].append(ms)
+
+    def record_error(self, step, error):
+        key = (step, type(error).__name__)
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    def summary(self, elapsed_s):
+        """Throughput, per-step completions per second and percentiles, and error rate as a dict"""
+        steps = {}
+        for step, values in self.latencies.items():
+            steps[step] = {
+                "count": len(values),
+                "per_s": round(len(values) / elapsed_s, 2) if elapsed_s else 0.0,
+                "p50": round(percentile(values, 50), 1),
+                "p90": round(percentile(values, 90), 1),
+                "p99": round(percentile(values, 99), 1),
+                "max": round(max(values), 1) if values else 0.0,
+            }
+        error_count = sum(self.errors.values())
+        return {
+            "elapsed_s": round(elapsed_s, 1),
+            "iterations": self.iterations,
+            "completed": self.completed,
+            "bookings_per_s": round(self.completed / elapsed_s, 2) if elapsed_s else 0.0,
+            "error_rate": round(error_count / self.iterations, 4) if self.iterations else 0.0,
+            "errors": {f"{step}: {name}": count for (step, name), count in sorted(self.errors.items())},
+            "steps": steps,
+        }
+
+
+# Bookings go round the rooms; the calendar gives each its own free night
+_room_counter = itertools.count()
+
+
+def next_stay(rooms):
+    """(room, checkin, checkout) of the next free night, rooms in turn"""
+    room = rooms[next(_room_counter) % len(rooms)]
+    checkin, checkout = get_availability_calendar().reserve(room)
+    return room, checkin.isoformat(), checkout.isoformat()
+
+
+async def book_once(browser, stats, rooms):
+    """One pass through the booking flow in a fresh context"""
+    context = await browser.new_context(viewport=VIEWPORT)
+    step = STEPS[0]
+    try:
+        page = await context.new_page()
+        room, checkin, checkout = next_stay(rooms)
+
+        start = time.perf_counter()
+        await page.goto(reservation_url(room, checkin, checkout), timeout=NAVIGATION_TIMEOUT_MS)
+        stats.record(step, (time.perf_counter() - start) * 1000)
+
+        step = "form_reveal"
+        start = time.perf_counter()
+        await page.locator(RESERVE_BUTTON).first.click()
+        await page.locator(FORM_FIELD.format("firstname")).wait_for(state="visible", timeout=FORM_TIMEOUT_MS)
+        stats.record(step, (time.perf_counter() - start) * 1000)
+
+        # Filling is local to the page and not timed
+        await page.locator(FORM_FIELD.format("firstname")).fill("Load")
+        await page.locator(FORM_FIELD.format("lastname")).fill("User")
+        await page.locator(FORM_FIELD.format("email")).fill("load.user@example.com")
+        await page.locator(FORM_FIELD.format("phone")).fill(generate_unique_phone())
+
+        step = "submit_to_confirmation"
+        start = time.perf_counter()
+        await page.locator(SUBMIT_BUTTON).click()
+        await page.wait_for_function(TEXT_IN_SCOPE_JS, arg=["body", CONFIRMATION_TEXT.lower()],
+                                     timeout=ASSERT_TIMEOUT_MS)
+        stats.record(step, (time.perf_counter() - start) * 1000)
+        stats.completed += 1
+    except Exception as e:
+        stats.record_error(step, e)
+    finally:
+        await context.close()
+
+
+async def virtual_user(browser, stats, rooms, start_delay_s, deadline, think_time_s):
+    """Repeat the booking flow from start_delay_s until the deadline"""
+    await asyncio.sleep(start_delay_s)
+    while time.monotonic() < deadline:
+        stats.iterations += 1
+        await book_once(browser, stats, rooms)
+        if think_time_s:
+            await asyncio.sleep(think_time_s)
+
+
+async def run_load(users, browsers, ramp_up_s, duration_s, rooms, think_time_s=0.0):
+    """Run the virtual users; returns (stats, elapsed seconds)"""
+    from playwright.async_api import async_playwright
+
+    stats = LoadStats()
+    # Load the booked nights of every room before the clock starts (blocking HTTP calls)
+    calendar = get_availability_calendar()
+    for room in rooms:
+        calendar.room(room)
+    async with async_playwright() as p:
+        browser_type = getattr(p, BROWSER_NAME)
+        pool = [await browser_type.launch(headless=True) for _ in range(max(1, min(browsers, users)))]
+        start = time.monotonic()
+        deadline = start + ramp_up_s + duration_s
+        await asyncio.gather(*(
+            virtual_user(pool[i % len(pool)], stats, rooms, ramp_up_s * i / users, deadline, think_time_s)
+            for i in range(users)
+        ))
+        elapsed = time.monotonic() - start
+        for browser in pool:
+            await browser.close()
+    return stats, elapsed
+
+
+def print_summary(summary):
+    print(f"Bookings: {summary['completed']}/{summary['iterations']} in {summary['elapsed_s']} s "
+          f"({summary['bookings_per_s']} per second), error rate {summary['error_rate'] * 100:.1f}%")
+    print(f"{'STEP':<24} {'COUNT':>6} {'PER s':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for step, values in summary["steps"].items():
+        print(f"{step:<24} {values['count']:>6} {values['per_s']:>7.2f} {values['p50']:>8.0f} {values['p90']:>8.0f} "
+              f"{values['p99']:>8.0f} {values['max']:>8.0f}")
+    for error, count in summary["errors"].items():
+        print(f"✗ {error}: {count}")
+
+
+def parse_args():
+    """Command line options for the UI load run"""
+    parser = argparse.ArgumentParser(description="Drive the booking flow with concurrent virtual users")
+    parser.add_argument("-u", "--users", type=int, default=10, help="Concurrent virtual users (default: 10)")
+    parser.add_argument("-b", "--browsers", type=int, default=2,
+                        help="Browsers shared by the users' contexts (default: 2)")
+    parser.add_argument("--ramp-up", type=float, default=10.0,
+                        help="Seconds over which the users start (default: 10)")
+    parser.add_argument("--duration", type=float, default=60.0,
+                        help="Seconds to keep going after the ramp-up (default: 60)")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="Seconds a user pauses between bookings (default: 0)")
+    parser.add_argument("--rooms", default="1,2,3", help="Room ids to book, comma separated (default: 1,2,3)")
+    parser.add_argument("--target", help="Booking site base URL to load")
+    parser.add_argument("--local", action="store_true", help="Load the local stand-in server (self-test)")
+    parser.add_argument("--max-error-rate", type=float, default=0.0,
+                        help="Fail when more than this share of bookings errored (default: 0)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    server = None
+    if args.local:
+        from _stand_in_server import start_stand_in_server
+        server = start_stand_in_server()
+        os.environ["BOOKING_SITE_URL"] = server.base_url
+    elif args.target:
+        os.environ["BOOKING_SITE_URL"] = args.target
+
+    print("="*60)
+    print("BOOKING UI LOAD")
+    print("="*60)
+    print(f"Users: {args.users}  Browsers: {args.browsers}  Ramp-up: {args.ramp_up:.0f} s  "
+          f"Duration: {args.duration:.0f} s  Target: {os.environ.get('BOOKING_SITE_URL', 'public demo')}")
+
+    rooms = [int(room) for room in args.rooms.split(",")]
+    try:
+        stats, elapsed = asyncio.run(run_load(args.users, args.browsers, args.ramp_up, args.duration,
+                                              rooms, args.think_time))
+    finally:
+        if server:
+            server.stop()
+
+    summary = stats.summary(elapsed)
+    print("-" * 60)
+    print_summary(summary)
+
+    summary_path = os.path.join(LOG_DIR, "load", f"ui-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(summary_path), exist_ok=True)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump({"users": args.users, "browsers": args.browsers, "ramp_up_s": args.ramp_up,
+                   "duration_s": args.duration, **summary}, f, indent=2)
+    print(f"Summary: {summary_path}")
+    sys.exit(1 if summary["error_rate"] > args.max_error_rate else 0)
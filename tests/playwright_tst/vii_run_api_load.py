@@ -0,0 +1,364 @@
+# API LOAD AND SOAK: THE RESTFUL-BOOKER ENDPOINTS THE TESTS USE
+#
+# Requests are started on an open-loop schedule at the target rate, whether
+# or not earlier ones have answered, over a bounded keep-alive connection
+# pool. Latency is measured from the scheduled send time, so a slow server
+# shows up as latency instead of quietly lowering the request rate. Bookings
+# the run created and did not delete are deleted at the end, even when the
+# run is interrupted.
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+try:
+    import aiohttp
+except ImportError:  # only needed for this command
+    aiohttp = None
+from _config import LOG_DIR, API_USERNAME, API_PASSWORD, api_base_url
+
+# Operations a mix can name
+OPERATIONS = ("auth", "list", "search", "create", "delete")
+DEFAULT_MIX = "search=70,create=20,delete=10"
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram, about 1% relative precision from 10 µs up"""
+
+    def __init__(self, precision=0.01, min_ms=0.01):
+        self.growth = math.log1p(precision)
+        self.min_ms = min_ms
+        self.buckets = {}
+        self.count = 0
+        self.max_ms = 0.0
+
+    def record(self, ms):
+        index = 0 if ms <= self.min_ms else int(math.log(ms / self.min_ms) / self.growth) + 1
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.max_ms = max(self.max_ms, ms)
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile (0.0 when empty)"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.min_ms * math.exp(index * self.growth), self.max_ms)
+        return self.max_ms
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "p50": round(self.percentile(50), 2),
+            "p99": round(self.percentile(99), 2),
+            "p999": round(self.percentile(99.9), 2),
+            "max": round(self.max_ms, 2),
+        }
+
+
+def parse_mix(text):
+    """'search=70,create=20,delete=10' -> {operation: weight}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}' in mix, expected one of {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError(f"Mix '{text}' has no positive weights")
+    return mix
+
+
+class ApiLoad:
+    """Runs the mix against one API base URL and keeps per-operation results"""
+
+    def __init__(self, session, base_url, seed=None):
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.random = random.Random(seed)
+        self.histograms = {name: LatencyHistogram() for name in OPERATIONS}
+        self.statuses = {name: {} for name in OPERATIONS}
+        self.skipped = {name: 0 for name in OPERATIONS}
+        self.created_ids = []  # created by this run and not deleted yet
+        self.token = None
+        self._night = 0
+
+    async def _call(self, method, path, **kwargs):
+        async with self.session.request(method, f"{self.base_url}{path}", **kwargs) as response:
+            body = await response.read()
+            return response.status, body
+
+    async def refresh_token(self):
+        status, body = await self._call("POST", "/auth", json={"username": API_USERNAME, "password": API_PASSWORD})
+        self.token = json.loads(body).get("token") if status == 200 else None
+        return status
+
+    def _next_stay(self):
+        """Distinct one-night stays far enough ahead not to touch the tests' dates"""
+        self._night += 1
+        checkin = date.today() + timedelta(days=400 + self._night)
+        return checkin.isoformat(), (checkin + timedelta(days=1)).isoformat()
+
+    async def run_operation(self, name):
+        """One request of the named operation; returns its status, or None when skipped"""
+        if name == "auth":
+            return await self.refresh_token()
+        if name == "list":
+            return (await self._call("GET", "/booking"))[0]
+        if name == "search":
+            checkin = (date.today() + timedelta(days=self.random.randint(0, 365))).isoformat()
+            return (await self._call("GET", "/booking", params={"checkin": checkin}))[0]
+        if name == "create":
+            checkin, checkout = self._next_stay()
+            status, body = await self._call("POST", "/booking", json={
+                "firstname": "Load",
+                "lastname": "Test",
+                "totalprice": 100,
+                "depositpaid": True,
+                "bookingdates": {"checkin": checkin, "checkout": checkout},
+                "additionalneeds": "none",
+            })
+            if status == 200:
+                self.created_ids.append(json.loads(body)["bookingid"])
+            return status
+        if name == "delete":
+            # Only bookings this run created are deleted
+            if not self.created_ids:
+                return None
+            booking_id = self.created_ids.pop(self.random.randrange(len(self.created_ids)))
+            return await self.delete_booking(booking_id)
+        raise ValueError(name)
+
+    async def delete_booking(self, booking_id):
+        """DELETE one booking, fetching a fresh token once when the old one is refused"""
+        if not self.token:
+            await self.refresh_token()
+        status, _ = await self._call("DELETE", f"/booking/{booking_id}", headers={"Cookie": f"token={self.token}"})
+        if status == 403:
+            await self.refresh_token()
+            status, _ = await self._call("DELETE", f"/booking/{booking_id}", headers={"Cookie": f"token={self.token}"})
+        return status
+
+    async def cleanup(self, concurrency):
+        """Delete every booking this run created and did not delete; returns (deleted, failed)"""
+        leftovers, self.created_ids = self.created_ids, []
+        if not leftovers:
+            return 0, 0
+        limit = asyncio.Semaphore(concurrency)
+
+        async def delete(booking_id):
+            async with limit:
+                return await self.delete_booking(booking_id)
+
+        results = await asyncio.gather(*(delete(booking_id) for booking_id in leftovers), return_exceptions=True)
+        # 404: already gone
+        deleted = sum(1 for result in results if result in (200, 201, 404))
+        return deleted, len(leftovers) - deleted
+
+    def record_exception(self, name, error):
+        self.statuses[name][type(error).__name__] = self.statuses[name].get(type(error).__name__, 0) + 1
+
+    async def timed_operation(self, name, scheduled):
+        try:
+            status = await self.run_operation(name)
+        except Exception as e:  # any failed request counts as an error, not only network ones
+            status = type(e).__name__
+        if status is None:
+            self.skipped[name] += 1
+            return
+        # Measured from when the request was due, not from when it could be sent
+        self.histograms[name].record((time.perf_counter() - scheduled) * 1000)
+        self.statuses[name][str(status)] = self.statuses[name].get(str(status), 0) + 1
+
+    def errors(self, name):
+        return sum(count for status, count in self.statuses[name].items()
+                   if not status.isdigit() or int(status) >= 400)
+
+
+async def run_load(base_url, mix, rps, duration_s, connections, max_in_flight, poisson=False,
+                   report_every_s=10.0, seed=None):
+    """Send requests at rps for duration_s; returns (load, elapsed seconds, dropped)"""
+    connector = aiohttp.TCPConnector(limit=connections, keepalive_timeout=60)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        load = ApiLoad(session, base_url, seed)
+        names, weights = list(mix), list(mix.values())
+        in_flight = {}  # task -> operation name
+        dropped = 0
+        try:
+            await load.refresh_token()
+            start = time.perf_counter()
+            deadline = start + duration_s
+            next_send = start
+            next_report = start + report_every_s
+            sent_at_report = 0
+            sent = 0
+            while next_send < deadline:
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if len(in_flight) >= max_in_flight:
+                    # The server is not keeping up; count it instead of queueing without bound
+                    dropped += 1
+                else:
+                    name = load.random.choices(names, weights)[0]
+                    task = asyncio.ensure_future(load.timed_operation(name, next_send))
+                    in_flight[task] = name
+                    task.add_done_callback(lambda done: in_flight.pop(done, None))
+                    sent += 1
+                next_send += load.random.expovariate(rps) if poisson else 1.0 / rps
+
+                now = time.perf_counter()
+                if report_every_s and now >= next_report:
+                    overall = LatencyHistogram()
+                    for histogram in load.histograms.values():
+                        overall.merge(histogram)
+                    print(f"[{now - start:6.0f} s] {(sent - sent_at_report) / report_every_s:7.1f} req/s  "
+                          f"in flight {len(in_flight):4}  p99 so far {overall.percentile(99):8.1f} ms  "
+                          f"dropped {dropped}")
+                    sent_at_report = sent
+                    next_report += report_every_s
+            await drain(load, in_flight)
+            return load, time.perf_counter() - start, dropped
+        finally:
+            # Also on Ctrl+C or an error: wait for what was sent, then delete what this run created
+            await drain(load, in_flight)
+            deleted, failed = await load.cleanup(connections)
+            if deleted or failed:
+                print(f"{'⚠' if failed else '✓'} Deleted {deleted} booking(s) left by this run"
+                      + (f", {failed} could not be deleted" if failed else ""))
+
+
+async def drain(load, in_flight):
+    """Wait for the requests in flight; one that raised counts as an error of its operation"""
+    tasks = list(in_flight.items())
+    results = await asyncio.gather(*(task for task, _ in tasks), return_exceptions=True)
+    for (_, name), result in zip(tasks, results):
+        if isinstance(result, BaseException):
+            load.record_exception(name, result)
+
+
+def build_summary(load, elapsed_s, dropped, settings):
+    """JSON-ready summary of a run"""
+    overall = LatencyHistogram()
+    operations = {}
+    for name in OPERATIONS:
+        histogram = load.histograms[name]
+        if not histogram.count and not load.skipped[name]:
+            continue
+        overall.merge(histogram)
+        operations[name] = {
+            **histogram.summary(),
+            "errors": load.errors(name),
+            "skipped": load.skipped[name],
+            "statuses": load.statuses[name],
+        }
+    total_errors = sum(op["errors"] for op in operations.values())
+    return {
+        **settings,
+        "elapsed_s": round(elapsed_s, 1),
+        "achieved_rps": round(overall.count / elapsed_s, 1) if elapsed_s else 0.0,
+        "dropped": dropped,
+        "error_rate": round(total_errors / overall.count, 4) if overall.count else 0.0,
+        "overall": overall.summary(),
+        "operations": operations,
+    }
+
+
+def print_summary(summary):
+    print(f"Requests: {summary['overall']['count']} in {summary['elapsed_s']} s "
+          f"({summary['achieved_rps']} req/s of {summary['rps']} target), "
+          f"error rate {summary['error_rate'] * 100:.2f}%, dropped {summary['dropped']}")
+    print(f"{'OPERATION':<10} {'COUNT':>7} {'p50 ms':>8} {'p99 ms':>8} {'p999 ms':>8} {'max ms':>8} {'ERRORS':>7}")
+    for name, op in summary["operations"].items():
+        print(f"{name:<10} {op['count']:>7} {op['p50']:>8.1f} {op['p99']:>8.1f} {op['p999']:>8.1f} "
+              f"{op['max']:>8.1f} {op['errors']:>7}" + (f"  ({op['skipped']} skipped)" if op["skipped"] else ""))
+    overall = summary["overall"]
+    print(f"{'all':<10} {overall['count']:>7} {overall['p50']:>8.1f} {overall['p99']:>8.1f} "
+          f"{overall['p999']:>8.1f} {overall['max']:>8.1f}")
+
+
+def parse_args():
+    """Command line options for the API load run"""
+    parser = argparse.ArgumentParser(description="Open-loop load and soak run against the booking API")
+    parser.add_argument("--rps", type=float, default=50.0, help="Target requests per second (default: 50)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run (default: 60)")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"Weighted operations from {', '.join(OPERATIONS)} (default: {DEFAULT_MIX})")
+    parser.add_argument("--connections", type=int, default=20, help="Keep-alive connection pool size (default: 20)")
+    parser.add_argument("--max-in-flight", type=int, default=1000,
+                        help="Requests allowed in flight before new ones are dropped (default: 1000)")
+    parser.add_argument("--poisson", action="store_true", help="Poisson arrivals instead of a fixed interval")
+    parser.add_argument("--report-every", type=float, default=10.0,
+                        help="Seconds between progress lines, 0 for none (default: 10)")
+    parser.add_argument("--seed", type=int, help="Seed for the operation mix and search dates")
+    parser.add_argument("--target", help="restful-booker base URL to load")
+    parser.add_argument("--local", action="store_true", help="Load the local stand-in server (self-test)")
+    parser.add_argument("--max-error-rate", type=float, default=0.0,
+                        help="Fail when more than this share of requests errored (default: 0)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if aiohttp is None:
+        print("✗ aiohttp is not installed: pip install -r requirements.txt")
+        sys.exit(2)
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(2)
+
+    server = None
+    if args.local:
+        from _stand_in_server import start_stand_in_server
+        server = start_stand_in_server()
+        base_url = server.base_url
+    else:
+        base_url = args.target or api_base_url()
+
+    print("="*60)
+    print("BOOKING API LOAD")
+    print("="*60)
+    print(f"Target: {base_url}  Rate: {args.rps:.0f} req/s  Duration: {args.duration:.0f} s  "
+          f"Connections: {args.connections}  Mix: {args.mix}")
+
+    try:
+        load, elapsed, dropped = asyncio.run(run_load(
+            base_url, mix, args.rps, args.duration, args.connections, args.max_in_flight,
+            poisson=args.poisson, report_every_s=args.report_every, seed=args.seed,
+        ))
+    finally:
+        if server:
+            server.stop()
+
+    summary = build_summary(load, elapsed, dropped, {
+        "target": base_url, "rps": args.rps, "duration_s": args.duration, "mix": mix,
+        "connections": args.connections, "poisson": args.poisson,
+    })
+    print("-" * 60)
+    print_summary(summary)
+
+    summary_path = os.path.join(LOG_DIR, "load", f"api-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(summary_path), exist_ok=True)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Summary: {summary_path}")
+    sys.exit(1 if summary["error_rate"] > args.max_error_rate else 0)
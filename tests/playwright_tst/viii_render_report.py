@@ -0,0 +1,121 @@
+# RENDERING THE HTML REPORT FROM STREAMED RESULTS
+#
+# Reads one or more results.jsonl files written during a run and renders a
+# small HTML page next to them. Artifacts are linked from the artifact
+# store, not inlined, so the page stays small however much a run captured.
+
+import argparse
+import html
+import os
+import sys
+from datetime import datetime
+from _config import RESULTS_DIR
+from _result_stream import read_results
+from _timing import breakdown_html
+
+OUTCOME_ORDER = {"error": 0, "failed": 1, "skipped": 2, "passed": 3}
+OUTCOME_COLORS = {"error": "#b00020", "failed": "#d32f2f", "skipped": "#f9a825", "passed": "#2e7d32"}
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 1.5em; }}
+table.results {{ border-collapse: collapse; width: 100%; }}
+table.results td, table.results th {{ border-bottom: 1px solid #ddd; padding: 4px 8px; text-align: left; vertical-align: top; }}
+.outcome {{ color: white; padding: 1px 6px; border-radius: 3px; font-size: 90%; }}
+pre {{ background: #f6f6f6; padding: 8px; overflow-x: auto; max-height: 30em; }}
+img {{ max-width: 480px; border: 1px solid #ccc; }}
+</style></head>
+<body>
+<h1>{title}</h1>
+<p>{summary}</p>
+<table class="results">
+<tr><th>Outcome</th><th>Test</th><th>ms</th><th>Worker</th><th>Details</th></tr>
+{rows}
+</table>
+</body></html>
+"""
+
+
+def results_file(path):
+    """results.jsonl for a run folder or a direct file path"""
+    return path if os.path.isfile(path) else os.path.join(path, "results.jsonl")
+
+
+def latest_run_dir(root=RESULTS_DIR):
+    """Most recently written run folder under the results root, or None"""
+    runs = [os.path.join(root, name) for name in os.listdir(root)] if os.path.isdir(root) else []
+    runs = [run for run in runs if os.path.isfile(results_file(run))]
+    return max(runs, key=lambda run: os.path.getmtime(results_file(run))) if runs else None
+
+
+def artifact_html(ref, report_dir):
+    """Link to a stored artifact; images are shown inline but only loaded when scrolled to"""
+    href = html.escape(os.path.relpath(ref["path"], report_dir))
+    label = f"{html.escape(ref['name'])} ({ref['size'] / 1024:.0f} KB)"
+    if ref.get("content_type", "").startswith("image/"):
+        return f'<div><a href="{href}">{label}</a><br><img loading="lazy" src="{href}" alt="{label}"></div>'
+    return f'<div><a href="{href}">{label}</a></div>'
+
+
+def result_row(result, report_dir):
+    outcome = result["outcome"]
+    details = []
+    if result.get("longrepr"):
+        open_attr = " open" if outcome in ("failed", "error") else ""
+        details.append(f"<details{open_attr}><summary>{'Failure' if open_attr else 'Reason'}</summary>"
+                       f"<pre>{html.escape(result['longrepr'])}</pre></details>")
+    if "capture_overhead_ms" in result:
+        details.append(f"<div>Failure capture overhead: {result['capture_overhead_ms']:.0f} ms</div>")
+    if result.get("phase_ms"):
+        details.append(f"<details><summary>Phases</summary>{breakdown_html(result['phase_ms'])}</details>")
+    details.extend(artifact_html(ref, report_dir) for ref in result.get("artifacts", []))
+    return (f"<tr><td><span class='outcome' style='background:{OUTCOME_COLORS.get(outcome, '#555')}'>"
+            f"{html.escape(outcome)}</span></td><td>{html.escape(result['nodeid'])}</td>"
+            f"<td>{result['duration_ms']:.0f}</td><td>{html.escape(str(result.get('worker', '')))}</td>"
+            f"<td>{''.join(details)}</td></tr>")
+
+
+def render_report(paths, out_path=None):
+    """Render results from one or more runs into an HTML file; returns its path"""
+    results = []
+    for path in paths:
+        results.extend(read_results(results_file(path)))
+    out_path = out_path or os.path.join(os.path.dirname(os.path.abspath(results_file(paths[0]))), "report.html")
+    report_dir = os.path.dirname(os.path.abspath(out_path))
+
+    counts = {}
+    for result in results:
+        counts[result["outcome"]] = counts.get(result["outcome"], 0) + 1
+    run_ids = sorted({result["run_id"] for result in results})
+    summary = (", ".join(f"{count} {outcome}" for outcome, count in sorted(counts.items())) or "no results")
+    summary += f" &middot; {sum(r['duration_ms'] for r in results) / 1000:.1f} s of test time"
+    summary += f" &middot; rendered {datetime.now():%Y-%m-%d %H:%M:%S}"
+
+    results.sort(key=lambda r: (OUTCOME_ORDER.get(r["outcome"], 9), r["nodeid"]))
+    page = PAGE.format(
+        title=html.escape(f"Booking test report: {', '.join(run_ids) or 'empty'}"),
+        summary=summary,
+        rows="\n".join(result_row(result, report_dir) for result in results),
+    )
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(page)
+    return out_path
+
+
+def parse_args():
+    """Command line options for rendering"""
+    parser = argparse.ArgumentParser(description="Render an HTML report from streamed test results")
+    parser.add_argument("results", nargs="*",
+                        help="Run folders or results.jsonl files (default: the latest run in log/results)")
+    parser.add_argument("-o", "--out", help="HTML file to write (default: report.html next to the first results)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    paths = args.results or [latest_run_dir()]
+    if not paths[0]:
+        print(f"✗ No results found under {RESULTS_DIR}")
+        sys.exit(1)
+    print(f"✓ Report: {render_report(paths, args.out)}")